@@ -0,0 +1,69 @@
+"""Migrate ISO-string timestamps to native BSON datetimes
+
+Older backends stored ``timestamp`` as ``datetime.isoformat()`` strings.
+This rewrites them in place, batch by batch, and is safe to re-run: only
+documents whose timestamp is still a string are touched.
+
+Usage:
+    python backend/migrate_timestamps.py [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+COLLECTIONS = ("status_checks", "interview_messages")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a stored ISO timestamp, treating naive values as UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_collection(collection, batch_size: int = 1000, dry_run: bool = False) -> int:
+    """Convert string timestamps in one collection; returns documents converted"""
+    converted = 0
+    query = {"timestamp": {"$type": "string"}}
+    while True:
+        docs = await collection.find(query, {"_id": 1, "timestamp": 1}).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return converted
+        if dry_run:
+            return await collection.count_documents(query)
+        await collection.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"timestamp": parse_timestamp(doc["timestamp"])}})
+            for doc in docs
+        ], ordered=False)
+        converted += len(docs)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="only count documents to convert")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    try:
+        for name in COLLECTIONS:
+            count = await migrate_collection(db[name], args.batch_size, args.dry_run)
+            action = "to convert" if args.dry_run else "converted"
+            print(f"{name}: {count} documents {action}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
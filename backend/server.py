@@ -1,12 +1,18 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
+import sys
+import json
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError, field_validator
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from typing_extensions import TypedDict
 import uuid
 from datetime import datetime, timezone
 
@@ -14,9 +20,34 @@ from datetime import datetime, timezone
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Share the Letta service layer with the Streamlit app
+sys.path.insert(0, str(ROOT_DIR.parent))
+from services.interview_engine import TECHNICAL_TURNS, InterviewEngine
+from services.idempotency import IdempotencyConflict, Submission, SubmissionTable, fingerprint
+from services.history_sync import HistorySyncer, load_history
+from services.letta_service import letta_service
+from services.message_coalescer import MessageCoalescer, PendingTurn, merge_parts
+from services.stream_buffer import CoalescingEventBuffer, coalesce_key
+from services.stream_hub import StreamHub, Subscriber
+from utils.constants import ConversationStage, Intent, REQUIRED_FIELDS
+from utils.helpers import normalize_key, validate_email
+from services.candidate_index import EXPERIENCE_BAND, CandidateIndex
+from services.evaluation import (
+    AgentPool,
+    EvaluationPipeline,
+    agent_reply,
+    grade_prompt,
+    job_progress,
+    new_job,
+    parse_grade,
+)
+from utils.extraction import technical_answers
+from utils.intents import classify_intent
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: timestamps are stored as BSON datetimes and read back as aware UTC
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -37,6 +68,27 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusCheckRow(TypedDict):
+    """Serialization-only shape of a stored status check (no validation)"""
+    id: str
+    client_name: str
+    timestamp: datetime
+
+# Pre-built serializer: a whole batch of rows is dumped in one call
+STATUS_ROWS_ADAPTER = TypeAdapter(List[StatusCheckRow])
+
+class InterviewMessage(BaseModel):
+    model_config = ConfigDict(extra="ignore")  # Ignore MongoDB's _id field
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str
+    role: str
+    content: str
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class InterviewMessageCreate(BaseModel):
+    content: str
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -47,24 +99,1069 @@ async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
+    # Timestamps are stored as native BSON datetimes
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     
     _ = await db.status_checks.insert_one(doc)
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
+STATUS_PAGE_SIZE = 100
+STATUS_PAGE_MAX = 1000
+STREAM_CHUNK_ROWS = 200  # rows serialized per chunk of a streamed response
+
+async def stream_json_array(cursor, adapter: TypeAdapter) -> AsyncIterator[bytes]:
+    """Serialize a Mongo cursor as a JSON array, chunk by chunk
+    
+    Rows are trusted documents from our own collection, so they are dumped
+    in bulk by a list ``adapter`` instead of being validated into models.
+    """
+    yield b"["
+    rows = []
+    first = True
+    async for doc in cursor:
+        # Rows written before the BSON datetime migration
+        if isinstance(doc.get('timestamp'), str):
+            doc['timestamp'] = datetime.fromisoformat(doc['timestamp'])
+        rows.append(doc)
+        if len(rows) >= STREAM_CHUNK_ROWS:
+            yield (b"" if first else b",") + adapter.dump_json(rows)[1:-1]
+            rows, first = [], False
+    if rows:
+        yield (b"" if first else b",") + adapter.dump_json(rows)[1:-1]
+    yield b"]"
+
+async def status_page_cursor(limit: int, after: Optional[str] = None):
+    """Cursor over one keyset page of status checks, after the given id"""
+    query = {}
+    if after:
+        anchor = await db.status_checks.find_one({"id": after}, {"_id": 0, "timestamp": 1})
+        if anchor is None:
+            raise HTTPException(status_code=400, detail=f"Unknown cursor: {after}")
+        query = {"$or": [
+            {"timestamp": {"$gt": anchor['timestamp']}},
+            {"timestamp": anchor['timestamp'], "id": {"$gt": after}}
+        ]}
+    
     # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+    return db.status_checks.find(query, {"_id": 0}).sort(
+        [("timestamp", 1), ("id", 1)]
+    ).limit(limit)
+
+@api_router.get("/status", response_model=List[StatusCheck])
+async def get_status_checks(
+    limit: int = Query(STATUS_PAGE_SIZE, ge=1, le=STATUS_PAGE_MAX),
+    after: Optional[str] = None
+):
+    """Status checks ordered by (timestamp, id), one keyset page at a time
+    
+    Pass the ``id`` of the last item received as ``after`` to fetch the next
+    page. Each page is an index range scan on (timestamp, id), so deep pages
+    cost the same as the first one.
+    """
+    cursor = await status_page_cursor(limit, after)
+    return StreamingResponse(stream_json_array(cursor, STATUS_ROWS_ADAPTER), media_type="application/json")
+
+# Bulk ingestion: records are validated and written batch by batch with
+# unordered insert_many, so one bad record never blocks the rest
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '1000'))
+BULK_BATCH_MAX = 10000
+BULK_MAX_ERRORS = 100  # per-record errors echoed back in the report
+
+STATUS_CREATE_ADAPTER = TypeAdapter(List[StatusCheckCreate])
+
+class BulkIngestError(BaseModel):
+    index: int
+    error: str
+
+class BulkIngestReport(BaseModel):
+    received: int = 0
+    inserted: int = 0
+    failed: int = 0
+    errors: List[BulkIngestError] = []
+    errors_truncated: bool = False
+
+    def fail(self, index: int, error: str):
+        self.failed += 1
+        if len(self.errors) < BULK_MAX_ERRORS:
+            self.errors.append(BulkIngestError(index=index, error=error))
+        else:
+            self.errors_truncated = True
+
+async def ingest_status_batch(entries: List[Tuple[int, Any]], report: BulkIngestReport):
+    """Validate and insert one batch of (request index, raw record) pairs"""
+    report.received += len(entries)
+    try:
+        valid = STATUS_CREATE_ADAPTER.validate_python([raw for _, raw in entries])
+    except ValidationError as e:
+        # Errors are located by list position; revalidate only the clean rows
+        invalid = {}
+        for err in e.errors():
+            invalid.setdefault(err['loc'][0], f"{'.'.join(map(str, err['loc'][1:])) or 'record'}: {err['msg']}")
+        for position, message in sorted(invalid.items()):
+            report.fail(entries[position][0], message)
+        entries = [entry for position, entry in enumerate(entries) if position not in invalid]
+        valid = STATUS_CREATE_ADAPTER.validate_python([raw for _, raw in entries])
+    if not valid:
+        return
+    
+    now = datetime.now(timezone.utc)
+    docs = [{"id": str(uuid.uuid4()), "client_name": item.client_name, "timestamp": now} for item in valid]
+    try:
+        result = await db.status_checks.insert_many(docs, ordered=False)
+        report.inserted += len(result.inserted_ids)
+    except BulkWriteError as e:
+        report.inserted += e.details.get('nInserted', 0)
+        for err in e.details.get('writeErrors', []):
+            report.fail(entries[err['index']][0], err.get('errmsg', 'write error'))
+
+async def iter_ndjson(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Parse an NDJSON request body line by line as it arrives
+    
+    Yields (index, record) pairs; lines that are not valid JSON yield a
+    ``ValueError`` as the record so the caller can report them.
+    """
+    index = 0
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    yield index, json.loads(line)
+                except ValueError as e:
+                    yield index, e
+                index += 1
+    if pending.strip():
+        try:
+            yield index, json.loads(pending)
+        except ValueError as e:
+            yield index, e
+
+@api_router.post("/status/bulk", response_model=BulkIngestReport)
+async def create_status_checks_bulk(
+    request: Request,
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=BULK_BATCH_MAX)
+):
+    """Create many status checks in one request
+    
+    The body is either a JSON array of ``StatusCheckCreate`` objects or, with
+    ``Content-Type: application/x-ndjson``, one object per line; NDJSON is
+    consumed as it streams in. Records are inserted ``batch_size`` at a time
+    and the report lists every record that failed validation or writing by
+    its position in the request.
+    """
+    report = BulkIngestReport()
+    batch = []
+    content_type = request.headers.get('content-type', '')
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        async for index, raw in iter_ndjson(request):
+            if isinstance(raw, ValueError):
+                report.received += 1
+                report.fail(index, f"invalid JSON: {raw}")
+                continue
+            batch.append((index, raw))
+            if len(batch) >= batch_size:
+                await ingest_status_batch(batch, report)
+                batch = []
+    else:
+        try:
+            records = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON body")
+        for offset in range(0, len(records), batch_size):
+            await ingest_status_batch(
+                list(enumerate(records[offset:offset + batch_size], start=offset)), report
+            )
+    if batch:
+        await ingest_status_batch(batch, report)
+    return report
+
+# Candidate profiles. Field names follow utils.constants.InfoFields; each
+# document also carries lowercased copies of its lookup fields so email
+# uniqueness and the facet filters are plain index matches.
+CANDIDATE_PAGE_SIZE = 50
+CANDIDATE_PAGE_MAX = 500
+CANDIDATE_FIELDS = ["id", *REQUIRED_FIELDS, "evaluation", "created_at", "updated_at"]
+CANDIDATE_INDEX_REFRESH_SECONDS = float(os.environ.get('CANDIDATE_INDEX_REFRESH_SECONDS', '30'))
+
+# Faceted search is served from memory; see sync_candidate_index
+candidate_index = CandidateIndex()
+candidate_index_watermark: Optional[datetime] = None
+
+def check_email(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = value.strip()
+    if not validate_email(value):
+        raise ValueError("invalid email address")
+    return value
+
+def reject_null(value):
+    """Fields a stored candidate always has may be left out of an update, not nulled"""
+    if value is None:
+        raise ValueError("may be omitted but not null")
+    return value
+
+def flatten_tech_stack(value):
+    """Accept extract_tech_stack()'s {category: [items]} shape as well as a list"""
+    if isinstance(value, dict):
+        return [item for items in value.values() for item in items]
+    return value
+
+class CandidateCreate(BaseModel):
+    full_name: Optional[str] = None
+    email: str
+    phone: Optional[str] = None
+    years_experience: float = Field(0, ge=0)
+    desired_positions: List[str] = []
+    current_location: Optional[str] = None
+    tech_stack: List[str] = []
+
+    check_email_field = field_validator('email')(check_email)
+    flatten_tech_stack_field = field_validator('tech_stack', mode='before')(flatten_tech_stack)
+
+class CandidateUpdate(BaseModel):
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    years_experience: Optional[float] = Field(None, ge=0)
+    desired_positions: Optional[List[str]] = None
+    current_location: Optional[str] = None
+    tech_stack: Optional[List[str]] = None
+
+    reject_null_fields = field_validator(
+        'email', 'years_experience', 'desired_positions', 'tech_stack', mode='before'
+    )(reject_null)
+    check_email_field = field_validator('email')(check_email)
+    flatten_tech_stack_field = field_validator('tech_stack', mode='before')(flatten_tech_stack)
+
+class Candidate(CandidateCreate):
+    model_config = ConfigDict(extra="ignore")  # Ignore _id and the normalized lookup fields
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    evaluation: Optional[Dict[str, Any]] = None  # set by the evaluation pipeline
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class CandidateRow(TypedDict, total=False):
+    """Serialization-only shape of a (possibly projected) stored candidate"""
+    id: str
+    full_name: Optional[str]
+    email: str
+    phone: Optional[str]
+    years_experience: float
+    desired_positions: List[str]
+    current_location: Optional[str]
+    tech_stack: List[str]
+    evaluation: Optional[Dict[str, Any]]
+    created_at: datetime
+    updated_at: datetime
+
+CANDIDATE_ROWS_ADAPTER = TypeAdapter(List[CandidateRow])
+
+def candidate_lookup_fields(doc: dict) -> dict:
+    """Normalized copies of the indexed fields present in ``doc``"""
+    lookup = {}
+    if doc.get('email') is not None:
+        lookup['email_normalized'] = doc['email'].strip().lower()
+    if 'current_location' in doc:
+        lookup['location_normalized'] = normalize_key(doc['current_location'] or "") or None
+    if doc.get('desired_positions') is not None:
+        lookup['positions_normalized'] = [normalize_key(p) for p in doc['desired_positions']]
+    if doc.get('tech_stack') is not None:
+        lookup['tech_stack_normalized'] = [normalize_key(t) for t in doc['tech_stack']]
+    return lookup
+
+def candidate_projection(fields: Optional[str]) -> dict:
+    """Mongo projection for a comma-separated ``fields`` parameter"""
+    if not fields:
+        return {name: 1 for name in CANDIDATE_FIELDS} | {"_id": 0}
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(CANDIDATE_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so it can be used as the next page's cursor
+    return {name: 1 for name in ["id", *requested]} | {"_id": 0}
+
+async def get_candidate_or_404(candidate_id: str, projection: dict) -> dict:
+    doc = await db.candidates.find_one({"id": candidate_id}, projection)
+    if doc is None:
+        raise HTTPException(status_code=404, detail=f"Unknown candidate: {candidate_id}")
+    return doc
+
+@api_router.post("/candidates", response_model=Candidate, status_code=201)
+async def create_candidate(input: CandidateCreate):
+    candidate = Candidate(**input.model_dump())
+    doc = candidate.model_dump()
+    try:
+        await db.candidates.insert_one(doc | candidate_lookup_fields(doc))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"A candidate with email {candidate.email} already exists")
+    candidate_index.upsert(doc)
+    return candidate
+
+@api_router.get("/candidates")
+async def list_candidates(
+    tech: List[str] = Query([]),
+    match: str = Query("all", pattern="^(all|any)$"),
+    location: Optional[str] = None,
+    position: Optional[str] = None,
+    min_experience: Optional[float] = Query(None, ge=0),
+    max_experience: Optional[float] = Query(None, ge=0),
+    fields: Optional[str] = None,
+    limit: int = Query(CANDIDATE_PAGE_SIZE, ge=1, le=CANDIDATE_PAGE_MAX),
+    after: Optional[str] = None
+):
+    """Filter candidates, ordered by (years_experience, id)
+    
+    ``tech`` may repeat; ``match`` chooses whether a candidate needs all of
+    the items or any of them. ``fields`` is a comma-separated projection so
+    list views only fetch the columns they show. Pass the last ``id`` as
+    ``after`` for the next page.
+    """
+    projection = candidate_projection(fields)
+    query = {}
+    if tech:
+        query['tech_stack_normalized'] = {"$all" if match == "all" else "$in": [normalize_key(t) for t in tech]}
+    if location:
+        query['location_normalized'] = normalize_key(location)
+    if position:
+        query['positions_normalized'] = normalize_key(position)
+    experience = {}
+    if min_experience is not None:
+        experience['$gte'] = min_experience
+    if max_experience is not None:
+        experience['$lte'] = max_experience
+    if experience:
+        query['years_experience'] = experience
+    if after:
+        anchor = await db.candidates.find_one({"id": after}, {"_id": 0, "years_experience": 1})
+        if anchor is None:
+            raise HTTPException(status_code=400, detail=f"Unknown cursor: {after}")
+        query['$or'] = [
+            {"years_experience": {"$gt": anchor['years_experience']}},
+            {"years_experience": anchor['years_experience'], "id": {"$gt": after}}
+        ]
+    
+    cursor = db.candidates.find(query, projection).sort(
+        [("years_experience", 1), ("id", 1)]
+    ).limit(limit)
+    return StreamingResponse(stream_json_array(cursor, CANDIDATE_ROWS_ADAPTER), media_type="application/json")
+
+@api_router.get("/candidates/search")
+async def search_candidates(
+    tech: List[str] = Query([]),
+    match: str = Query("all", pattern="^(all|any)$"),
+    location: List[str] = Query([]),
+    position: List[str] = Query([]),
+    experience: List[str] = Query([]),
+    fields: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(CANDIDATE_PAGE_SIZE, ge=0, le=CANDIDATE_PAGE_MAX)
+):
+    """Faceted search over the in-memory candidate index
+    
+    Repeated ``location``, ``position`` and ``experience`` (band label,
+    e.g. ``2-5``) values are ORed; ``tech`` follows ``match``. Different
+    facets are ANDed. ``counts`` gives, for every facet value, how many of
+    the matching candidates have it.
+    """
+    projection = candidate_projection(fields)
+    all_of, any_of = {}, {}
+    if tech:
+        (all_of if match == "all" else any_of)['tech_stack'] = tech
+    for facet, values in (('current_location', location), ('desired_positions', position), (EXPERIENCE_BAND, experience)):
+        if values:
+            any_of[facet] = values
+    results = candidate_index.search(all_of, any_of, offset=offset, limit=limit)
+    
+    docs = await db.candidates.find({"id": {"$in": results['ids']}}, projection).to_list(len(results['ids']))
+    by_id = {doc['id']: doc for doc in docs}
+    return {
+        "total": results['total'],
+        "counts": results['counts'],
+        "candidates": [by_id[i] for i in results['ids'] if i in by_id]
+    }
+
+@api_router.get("/candidates/{candidate_id}")
+async def get_candidate(candidate_id: str, fields: Optional[str] = None):
+    doc = await get_candidate_or_404(candidate_id, candidate_projection(fields))
+    return Response(CANDIDATE_ROWS_ADAPTER.dump_json([doc])[1:-1], media_type="application/json")
+
+@api_router.patch("/candidates/{candidate_id}", response_model=Candidate)
+async def update_candidate(candidate_id: str, input: CandidateUpdate):
+    changes = input.model_dump(exclude_unset=True)
+    changes['updated_at'] = datetime.now(timezone.utc)
+    try:
+        result = await db.candidates.update_one(
+            {"id": candidate_id}, {"$set": changes | candidate_lookup_fields(changes)}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"A candidate with email {changes.get('email')} already exists")
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail=f"Unknown candidate: {candidate_id}")
+    doc = await get_candidate_or_404(candidate_id, {"_id": 0})
+    candidate_index.upsert(doc)
+    return doc
+
+@api_router.delete("/candidates/{candidate_id}", status_code=204)
+async def delete_candidate(candidate_id: str):
+    result = await db.candidates.delete_one({"id": candidate_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail=f"Unknown candidate: {candidate_id}")
+    candidate_index.remove(candidate_id)
+    return Response(status_code=204)
+
+async def sync_candidate_index() -> int:
+    """Index candidates changed since the last sync; returns how many
+    
+    Writes through this process update the index directly. This catches
+    up with writes made by other workers or straight to the collection;
+    deletions made elsewhere are only picked up by a restart.
+    """
+    global candidate_index_watermark
+    started = datetime.now(timezone.utc)
+    query = {} if candidate_index_watermark is None else {"updated_at": {"$gte": candidate_index_watermark}}
+    projection = {"_id": 0, "id": 1, "years_experience": 1, "current_location": 1, "desired_positions": 1, "tech_stack": 1}
+    docs = [doc async for doc in db.candidates.find(query, projection)]
+    synced = candidate_index.upsert_many(docs)
+    candidate_index_watermark = started
+    return synced
+
+async def refresh_candidate_index():
+    while True:
+        await asyncio.sleep(CANDIDATE_INDEX_REFRESH_SECONDS)
+        try:
+            await sync_candidate_index()
+        except Exception as e:
+            logger.error(f"Candidate index refresh failed: {e}")
+
+# Interview gateway. Each turn reads the upstream agent stream exactly once
+# and publishes it on the session's stream in stream_hub; the candidate's
+# SSE response, WebSocket monitors and the persistence writer are all
+# subscribers. Slow subscribers fall back to snapshots instead of blocking.
+SSE_HEARTBEAT_SECONDS = 15.0
+SUBSCRIBER_BUFFER = int(os.environ.get('SUBSCRIBER_BUFFER', '256'))  # events per subscriber before snapshot fallback
+
+WS_HEARTBEAT_SECONDS = float(os.environ.get('WS_HEARTBEAT_SECONDS', '20'))
+WS_SEND_BUFFER = int(os.environ.get('WS_SEND_BUFFER', '256'))
+WS_OVERFLOW_POLICY = os.environ.get('WS_OVERFLOW_POLICY', 'block')
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '300'))
+# Messages sent in quick succession become one turn; 0 sends each on its own
+COALESCE_WINDOW_SECONDS = float(os.environ.get('COALESCE_WINDOW_SECONDS', '0'))
+COALESCE_MAX_WAIT_SECONDS = float(os.environ.get('COALESCE_MAX_WAIT_SECONDS', '3'))
+COALESCE_CANCEL_RUNNING = os.environ.get('COALESCE_CANCEL_RUNNING', 'false').lower() in ('1', 'true', 'yes')
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+stream_hub = StreamHub()
+background_tasks = set()  # strong references to running turn/persistence tasks
+
+# One turn at a time per interview session
+session_locks: Dict[str, asyncio.Lock] = {}
+
+# Turns by "<session id>:<Idempotency-Key>". A resubmitted message (double
+# submit, client retry) follows the recorded turn instead of starting one.
+turn_submissions = SubmissionTable(ttl=IDEMPOTENCY_TTL_SECONDS)
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def is_turn_end(event: dict) -> bool:
+    return event.get('type') == 'done' or (
+        event.get('type') == 'snapshot' and event.get('turn_complete')
+    )
+
+def format_sse(event: dict, event_id: Optional[int] = None) -> str:
+    """Encode an event dict as one Server-Sent Events frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event.get('type', 'message')}")
+    lines.append(f"data: {json.dumps(event, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+def encode_frame(frame: dict) -> str:
+    """Compact JSON encoding for WebSocket frames"""
+    return json.dumps(frame, separators=(',', ':'), default=str)
+
+def frame_coalesce_key(frame: dict):
+    if frame.get('t') != 'ev':
+        return None
+    key = coalesce_key(frame['ev'])
+    return None if key is None else (frame['sid'],) + key
+
+async def store_interview_message(message: InterviewMessage):
+    await db.interview_messages.insert_one(message.model_dump())
+
+async def persist_turn(session_id: str, subscriber: Subscriber):
+    """Persistence subscriber: store the assistant reply once the turn ends"""
+    assistant_parts = {}
+    while True:
+        delivered = await subscriber.get()
+        if delivered is None:
+            break
+        _, event = delivered
+        events = event.get('events', []) if event.get('type') == 'snapshot' else [event]
+        for item in events:
+            if item.get('type') == 'assistant':
+                assistant_parts[item.get('message_id', 'default')] = item.get('content', '')
+    
+    reply = ' '.join(assistant_parts.values()).strip()
+    if reply:
+        await store_interview_message(
+            InterviewMessage(session_id=session_id, role='assistant', content=reply)
+        )
+
+async def run_interview_turn(
+    session_id: str,
+    content: str,
+    lock: asyncio.Lock,
+    submission: Optional[Submission] = None,
+    turn: Optional[PendingTurn] = None
+):
+    """Read one upstream agent turn and publish it to all subscribers
+    
+    The caller has already acquired ``lock``; it is released here. The final
+    ``done`` event is published only after the reply has been persisted.
+    Events are also recorded in ``submission`` for duplicate submissions.
+    A coalesced ``turn`` is sent as one multi-part message and tags its
+    ``user`` event with the turn id; cancelling it publishes ``cancelled``.
+    """
+    stream = stream_hub.get(session_id)
+    persistence = None
+    failed = False
+    completed = False
+    submissions = list(turn.submissions) if turn else [submission] if submission else []
+    message = turn.parts if turn and len(turn.parts) > 1 else content
+    
+    def publish(event: dict):
+        nonlocal failed
+        failed = failed or bool(event.get('error'))
+        seq = stream.publish(event)
+        for item in submissions:
+            item.publish((seq, event))
+    
+    try:
+        try:
+            await store_interview_message(
+                InterviewMessage(session_id=session_id, role='user', content=content)
+            )
+            persistence = stream_hub.open_subscriber(
+                session_id, name='persistence', maxsize=SUBSCRIBER_BUFFER
+            )
+            persister = spawn(persist_turn(session_id, persistence))
+            publish({"type": "user", "content": content, **({"turn": turn.id} if turn else {})})
+            
+            agent_id = letta_service.assign_agent(session_id)
+            async for event in letta_service.send_message_stream_async(message, agent_id=agent_id):
+                publish(event)
+            completed = True
+        except asyncio.CancelledError:
+            # The candidate added to the message; a new turn answers the rest.
+            # Its submissions end as failed so a retry runs it again rather
+            # than replaying a turn that never finished.
+            failed = True
+            publish({"type": "cancelled", "content": ""})
+            raise
+        except Exception as e:
+            logger.error(f"Interview turn failed for session {session_id}: {e}")
+            publish({"type": "error", "content": f"Error: {str(e)}", "error": True})
+        finally:
+            if persistence is not None:
+                # Closing lets the persister drain what it has and finish
+                persistence.close()
+                try:
+                    await persister
+                except Exception as e:
+                    logger.error(f"Failed to persist turn for session {session_id}: {e}")
+            if completed and not failed:
+                spawn(evaluate_if_concluded(session_id, content))
+            publish({"type": "done", "content": ""})
+            for item in submissions:
+                turn_submissions.finish(item, failed=failed)
+    finally:
+        lock.release()
+        if not lock.locked():
+            session_locks.pop(session_id, None)
+
+async def start_interview_turn(
+    session_id: str,
+    content: str,
+    submission: Optional[Submission] = None
+) -> Optional[asyncio.Task]:
+    """Start a turn unless one is already running for the session
     
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+    A claimed ``submission`` is released when the turn cannot start.
+    """
+    lock = session_locks.setdefault(session_id, asyncio.Lock())
+    if lock.locked():
+        if submission is not None:
+            turn_submissions.release(submission)
+        return None
+    await lock.acquire()  # uncontended, so this completes without yielding
+    return spawn(run_interview_turn(session_id, content, lock, submission))
+
+async def run_coalesced_turn(session_id: str, turn: PendingTurn):
+    """MessageCoalescer dispatch: one turn for the messages of a burst"""
+    lock = session_locks.setdefault(session_id, asyncio.Lock())
+    await lock.acquire()
+    await run_interview_turn(session_id, merge_parts(turn.parts), lock, turn=turn)
+
+message_coalescer = MessageCoalescer(
+    run_coalesced_turn,
+    window=COALESCE_WINDOW_SECONDS,
+    max_wait=COALESCE_MAX_WAIT_SECONDS,
+    cancel_running=COALESCE_CANCEL_RUNNING
+) if COALESCE_WINDOW_SECONDS > 0 else None
+
+def claim_submission(session_id: str, key: Optional[str], content: str) -> Tuple[Optional[Submission], bool]:
+    """(submission, created) for a keyed message; (None, True) without a key"""
+    if not key:
+        return None, True
+    return turn_submissions.claim(f"{session_id}:{key}", fingerprint(content))
+
+async def stream_submission_events(submission: Submission) -> AsyncIterator[str]:
+    """SSE frames of an earlier submission's turn, from its first event"""
+    async for seq, event in submission.follow_async():
+        yield format_sse(event, seq)
+
+def starts_turn(event: dict, turn_id: str) -> bool:
+    """Whether ``event`` (or a snapshot containing it) opens coalesced turn ``turn_id``"""
+    events = event.get('events', []) if event.get('type') == 'snapshot' else [event]
+    return any(item.get('type') == 'user' and item.get('turn') == turn_id for item in events)
+
+async def stream_interview_events(subscriber: Subscriber, turn_id: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield a subscriber's events as SSE frames until the turn ends
     
-    return status_checks
+    With ``turn_id``, events of earlier turns still running are skipped.
+    """
+    waiting = turn_id is not None
+    try:
+        while True:
+            try:
+                delivered = await subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if delivered is None:
+                break
+            seq, event = delivered
+            if waiting:
+                waiting = not starts_turn(event, turn_id)
+                if waiting:
+                    continue
+            yield format_sse(event, seq)
+            if is_turn_end(event):
+                break
+    finally:
+        subscriber.close()
+
+@api_router.get("/interviews/{session_id}/messages", response_model=List[InterviewMessage])
+async def get_interview_messages(session_id: str):
+    messages = await db.interview_messages.find(
+        {"session_id": session_id}, {"_id": 0}
+    ).sort("timestamp", 1).to_list(1000)
+    
+    for message in messages:
+        if isinstance(message['timestamp'], str):
+            message['timestamp'] = datetime.fromisoformat(message['timestamp'])
+    
+    return messages
+
+@api_router.post("/interviews/{session_id}/messages")
+async def post_interview_message(
+    session_id: str,
+    input: InterviewMessageCreate,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Start an agent turn and stream it as SSE
+    
+    With an ``Idempotency-Key`` header, a repeat of a running or recently
+    finished turn streams that turn from its start instead of starting
+    another one. With coalescing enabled the message joins the session's
+    next turn and the response streams that turn.
+    """
+    if not letta_service.is_connected:
+        raise HTTPException(status_code=503, detail="Letta agent is not connected")
+    
+    try:
+        submission, created = claim_submission(session_id, idempotency_key, input.content)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not created:
+        return StreamingResponse(
+            stream_submission_events(submission), media_type="text/event-stream", headers=SSE_HEADERS
+        )
+    
+    # Subscribe before starting the turn so no event is missed
+    subscriber = stream_hub.open_subscriber(session_id, name='sse', maxsize=SUBSCRIBER_BUFFER)
+    turn_id = None
+    if message_coalescer is not None:
+        turn_id = (await message_coalescer.submit(session_id, input.content, submission)).id
+    elif await start_interview_turn(session_id, input.content, submission) is None:
+        subscriber.close()
+        raise HTTPException(status_code=409, detail="A turn is already in progress for this session")
+    
+    return StreamingResponse(
+        stream_interview_events(subscriber, turn_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@api_router.get("/streams/metrics")
+async def get_stream_metrics(session_id: Optional[str] = None):
+    """Subscriber lag, snapshot-fallback and duplicate-submission metrics"""
+    report = {**stream_hub.metrics(session_id), "submissions": turn_submissions.summary()}
+    if message_coalescer is not None:
+        report["coalescing"] = message_coalescer.summary()
+    return report
+
+@api_router.get("/agents/variants")
+async def get_agent_variants():
+    """Per-variant TTFT, turn time, tokens and completion rate of the A/B agents"""
+    return letta_service.router.report()
+
+# Post-interview evaluation. Answers are graded by a dedicated Letta agent
+# on a worker pool whose jobs live in db.evaluations; see
+# services/evaluation.py for leases and resuming after a restart.
+# Letta agents keep every message they are sent, so each grading call gets
+# an agent of its own (reset after use); more agents, more calls in flight.
+EVALUATION_AGENT_IDS = [
+    agent_id.strip() for agent_id in os.environ.get('EVALUATION_AGENT_ID', '').split(',') if agent_id.strip()
+]
+EVALUATION_WORKERS = int(os.environ.get('EVALUATION_WORKERS', '2'))  # jobs processed at once
+EVALUATION_LEASE_SECONDS = float(os.environ.get('EVALUATION_LEASE_SECONDS', '300'))
+# Technical answers after which an interview is concluded and graded automatically
+TECHNICAL_QUESTION_TURNS = int(os.environ.get('TECHNICAL_QUESTION_TURNS', str(TECHNICAL_TURNS)))
+
+SUMMARY_PROMPT = """Summarize this technical screening interview for the hiring team in three or four sentences, covering strengths, gaps and a recommendation.
+
+Candidate: {candidate}
+
+{answers}"""
+
+evaluation_pipeline: Optional[EvaluationPipeline] = None
+evaluation_agents = AgentPool(
+    EVALUATION_AGENT_IDS, reset=letta_service.reset_messages_async
+) if EVALUATION_AGENT_IDS else None
+
+class EvaluationAnswer(BaseModel):
+    question: str
+    answer: str
+
+class EvaluationCreate(BaseModel):
+    session_id: str
+    candidate_id: Optional[str] = None
+    candidate: Dict[str, Any] = {}  # interview record fields, used to create or find the candidate
+    answers: Optional[List[EvaluationAnswer]] = None  # taken from the stored transcript when omitted
+
+class EvaluationAnswerResult(EvaluationAnswer):
+    status: str
+    score: Optional[float] = None
+    feedback: Optional[str] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+class Evaluation(BaseModel):
+    model_config = ConfigDict(extra="ignore")  # Ignore _id and the lease
+    
+    id: str
+    session_id: str
+    candidate_id: Optional[str] = None
+    status: str
+    progress: Dict[str, int]
+    answers: List[EvaluationAnswerResult]
+    summary: Optional[str] = None
+    overall_score: Optional[float] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+def evaluation_view(job: dict) -> Evaluation:
+    return Evaluation(**job, progress=job_progress(job))
+
+async def grade_answer(question: str, answer: str, candidate: dict) -> Tuple[float, str]:
+    async with evaluation_agents.use() as agent_id:
+        reply = await agent_reply(letta_service, grade_prompt(question, answer, candidate), agent_id)
+    return parse_grade(reply)
+
+async def summarize_interview(job: dict) -> str:
+    answers = "\n\n".join(
+        f"Q: {item['question']}\nA: {item['answer']}\nScore: {item['score'] if item['score'] is not None else 'ungraded'}"
+        for item in job['answers']
+    )
+    candidate = ", ".join(f"{key}: {value}" for key, value in job['candidate'].items()) or "unknown"
+    async with evaluation_agents.use() as agent_id:
+        return await agent_reply(letta_service, SUMMARY_PROMPT.format(candidate=candidate, answers=answers), agent_id)
+
+async def finalize_evaluation(job: dict) -> Optional[str]:
+    """Store the results on the candidate, creating it from the interview record if needed"""
+    now = datetime.now(timezone.utc)
+    evaluation = {
+        "job_id": job["id"],
+        "overall_score": job["overall_score"],
+        "summary": job["summary"],
+        "completed_at": now,
+    }
+    update = {"$set": {"evaluation": evaluation, "updated_at": now}}
+    if job.get("candidate_id"):
+        result = await db.candidates.update_one({"id": job["candidate_id"]}, update)
+        return job["candidate_id"] if result.matched_count else None
+    
+    try:
+        input = CandidateCreate(**job["candidate"])
+    except ValidationError:
+        return None  # no usable email: the results stay on the job only
+    existing = await db.candidates.find_one({"email_normalized": input.email.lower()}, {"_id": 0, "id": 1})
+    if existing is None:
+        candidate = Candidate(**input.model_dump(), evaluation=evaluation)
+        doc = candidate.model_dump()
+        try:
+            await db.candidates.insert_one(doc | candidate_lookup_fields(doc))
+            candidate_index.upsert(doc)
+            return candidate.id
+        except DuplicateKeyError:
+            existing = await db.candidates.find_one({"email_normalized": input.email.lower()}, {"_id": 0, "id": 1})
+    await db.candidates.update_one({"id": existing["id"]}, update)
+    return existing["id"]
+
+async def load_transcript(session_id: str) -> List[dict]:
+    return await db.interview_messages.find(
+        {"session_id": session_id}, {"_id": 0, "role": 1, "content": 1}
+    ).sort("timestamp", 1).to_list(None)
+
+async def evaluate_if_concluded(session_id: str, content: str) -> Optional[dict]:
+    """Queue the session's evaluation once the interview reaches its conclusion
+    
+    That is when the candidate ends it ("bye") or the transcript reaches
+    ConversationStage.CONCLUSION as the interview engine counts technical
+    answers. The session also counts as completed for its A/B variant,
+    whether or not evaluation is configured. Sessions already evaluated are
+    left alone.
+    """
+    transcript = await load_transcript(session_id)
+    engine = InterviewEngine.from_messages(transcript, technical_turns=TECHNICAL_QUESTION_TURNS)
+    if engine.stage != ConversationStage.CONCLUSION and classify_intent(content) != Intent.EXIT:
+        return None
+    letta_service.router.record_completion(session_id)
+    if evaluation_agents is None or evaluation_pipeline is None:
+        return None
+    answers = technical_answers(transcript)
+    if not answers or await db.evaluations.find_one({"session_id": session_id}, {"_id": 0, "id": 1}):
+        return None
+    job = new_job(session_id, answers, engine.record.to_dict())
+    await evaluation_pipeline.submit(job)
+    logger.info(f"Queued evaluation {job['id']} for concluded session {session_id}")
+    return job
+
+@api_router.post("/evaluations", response_model=Evaluation, status_code=202)
+async def create_evaluation(input: EvaluationCreate):
+    if evaluation_agents is None:
+        raise HTTPException(status_code=503, detail="EVALUATION_AGENT_ID is not configured")
+    
+    if input.answers is None:
+        answers = technical_answers(await load_transcript(input.session_id))
+    else:
+        answers = [item.model_dump() for item in input.answers]
+    if not answers:
+        raise HTTPException(status_code=400, detail="No technical answers to evaluate")
+    
+    job = new_job(input.session_id, answers, input.candidate, input.candidate_id)
+    await evaluation_pipeline.submit(job)
+    return evaluation_view(job)
+
+@api_router.get("/evaluations/{evaluation_id}", response_model=Evaluation)
+async def get_evaluation(evaluation_id: str):
+    job = await db.evaluations.find_one({"id": evaluation_id}, {"_id": 0})
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown evaluation: {evaluation_id}")
+    return evaluation_view(job)
+
+# Copies of the agents' Letta message history, synced incrementally (see
+# services/history_sync.py) for history restore and server-side transcripts
+HISTORY_SYNC_PAGE_SIZE = int(os.environ.get('HISTORY_SYNC_PAGE_SIZE', '100'))
+HISTORY_SYNC_CONCURRENCY = int(os.environ.get('HISTORY_SYNC_CONCURRENCY', '4'))  # agents synced at once
+HISTORY_SYNC_RATE = float(os.environ.get('HISTORY_SYNC_RATE', '5'))  # Letta list calls per second
+HISTORY_SYNC_INTERVAL_SECONDS = float(os.environ.get('HISTORY_SYNC_INTERVAL_SECONDS', '0'))  # 0: on request only
+
+history_syncer: Optional[HistorySyncer] = None
+
+class HistorySyncRequest(BaseModel):
+    agent_ids: Optional[List[str]] = None  # defaults to every A/B variant's agent
+
+def variant_agent_ids() -> List[str]:
+    return [variant.agent_id for variant in letta_service.router.variants]
+
+@api_router.post("/history/sync")
+async def sync_history(input: HistorySyncRequest):
+    """Pull messages newer than each agent's stored cursor from Letta"""
+    if not letta_service.is_connected:
+        raise HTTPException(status_code=503, detail="Letta agent is not connected")
+    return await history_syncer.sync_all(letta_service.async_client, input.agent_ids or variant_agent_ids())
+
+@api_router.get("/history/{agent_id}")
+async def get_history(agent_id: str, limit: Optional[int] = Query(None, ge=1)):
+    """Synced chat history of an agent, oldest first, without calling Letta"""
+    state = await db.letta_history_cursors.find_one({"agent_id": agent_id}, {"_id": 0})
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"History of agent {agent_id} has not been synced")
+    return {
+        "agent_id": agent_id,
+        "synced_at": state.get("synced_at"),
+        "messages": await load_history(db.letta_messages, agent_id, limit),
+    }
+
+async def sync_history_periodically():
+    while True:
+        await asyncio.sleep(HISTORY_SYNC_INTERVAL_SECONDS)
+        if not letta_service.is_connected:
+            continue
+        try:
+            await history_syncer.sync_all(letta_service.async_client, variant_agent_ids())
+        except Exception as e:
+            logger.error(f"History sync failed: {e}")
+
+# Multiplexed WebSocket channel: several interview streams per connection.
+# Each subscription is a hub Subscriber forwarded into one bounded
+# per-connection send buffer; with the default ``block`` overflow policy a
+# slow connection makes its subscriptions fall back to snapshots.
+
+@app.websocket("/api/ws")
+async def interview_channel(websocket: WebSocket):
+    """Multiplexed interview channel
+    
+    Client frames (JSON): ``{"op": "sub", "sid": ..., "since": seq}``,
+    ``{"op": "unsub", "sid": ...}``, ``{"op": "send", "sid": ..., "content": ..., "key": ...}``
+    and ``{"op": "ping"}``. Server frames: ``{"t": "ev", "sid", "seq", "ev"}``
+    for stream events, ``gap`` when a resume point has been evicted, ``err``,
+    ``pong`` and ``hb`` heartbeats. A ``send`` repeating an earlier ``key``
+    replays that turn's events instead of starting another. Outgoing frames go through a bounded
+    per-connection buffer governed by WS_OVERFLOW_POLICY.
+    """
+    await websocket.accept()
+    outbox = CoalescingEventBuffer(
+        maxsize=WS_SEND_BUFFER, overflow=WS_OVERFLOW_POLICY, key=frame_coalesce_key
+    )
+    subscriptions: Dict[str, tuple] = {}
+    replays: Set[asyncio.Task] = set()
+    
+    async def forward(session_id: str, subscriber: Subscriber):
+        while True:
+            delivered = await subscriber.get()
+            if delivered is None:
+                break
+            seq, event = delivered
+            await outbox.put({"t": "ev", "sid": session_id, "seq": seq, "ev": event})
+    
+    async def replay(session_id: str, submission: Submission):
+        # Frames keep their stream seq, so a client already subscribed to
+        # the running turn can drop the ones it has seen
+        async for seq, event in submission.follow_async():
+            await outbox.put({"t": "ev", "sid": session_id, "seq": seq, "ev": event})
+    
+    def subscribe(session_id: str, since: Optional[int]):
+        if session_id in subscriptions:
+            return
+        stream = stream_hub.get(session_id)
+        if since is not None and since + 1 < stream.oldest_seq:
+            # Resume point evicted: the subscriber starts with a snapshot
+            outbox.offer({"t": "gap", "sid": session_id, "seq": stream.oldest_seq})
+        subscriber = stream_hub.open_subscriber(
+            session_id, name='ws', since=since, maxsize=SUBSCRIBER_BUFFER
+        )
+        subscriptions[session_id] = (subscriber, asyncio.create_task(forward(session_id, subscriber)))
+    
+    def unsubscribe(session_id: str):
+        entry = subscriptions.pop(session_id, None)
+        if entry:
+            subscriber, forwarder = entry
+            subscriber.close()
+            forwarder.cancel()
+    
+    async def writer():
+        while True:
+            try:
+                frame = await outbox.get(timeout=WS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                frame = {"t": "hb"}
+            if frame is None:
+                break
+            await websocket.send_text(encode_frame(frame))
+        if outbox.overflowed:
+            # 1013 "try again later": the client reconnects and resumes by seq
+            await websocket.close(code=1013)
+    
+    writer_task = asyncio.create_task(writer())
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                outbox.offer({"t": "err", "msg": "Invalid JSON frame"})
+                continue
+            
+            # A bad frame is answered with an error; it must not end the
+            # connection for every session multiplexed on it
+            if not isinstance(message, dict):
+                outbox.offer({"t": "err", "msg": "Frames must be JSON objects"})
+                continue
+            op = message.get('op')
+            session_id = message.get('sid')
+            if session_id is not None and not isinstance(session_id, str):
+                outbox.offer({"t": "err", "msg": "sid must be a string"})
+                continue
+            
+            if op == 'ping':
+                outbox.offer({"t": "pong"})
+            elif op == 'sub' and session_id:
+                since = message.get('since')
+                try:
+                    since = None if since is None else int(since)
+                except (TypeError, ValueError):
+                    outbox.offer({"t": "err", "sid": session_id, "msg": "since must be an integer"})
+                    continue
+                subscribe(session_id, since)
+            elif op == 'unsub' and session_id:
+                unsubscribe(session_id)
+            elif op == 'send' and session_id and isinstance(message.get('content'), str) and message['content']:
+                if not letta_service.is_connected:
+                    outbox.offer({"t": "err", "sid": session_id, "msg": "Letta agent is not connected"})
+                    continue
+                try:
+                    submission, created = claim_submission(session_id, message.get('key'), message['content'])
+                except IdempotencyConflict as e:
+                    outbox.offer({"t": "err", "sid": session_id, "msg": str(e)})
+                    continue
+                if not created:
+                    # Duplicate (e.g. a retry after reconnecting): replay the
+                    # recorded turn, which may have finished long ago
+                    task = asyncio.create_task(replay(session_id, submission))
+                    replays.add(task)
+                    task.add_done_callback(replays.discard)
+                    continue
+                subscribe(session_id, None)
+                if message_coalescer is not None:
+                    await message_coalescer.submit(session_id, message['content'], submission)
+                elif await start_interview_turn(session_id, message['content'], submission) is None:
+                    outbox.offer({"t": "err", "sid": session_id, "msg": "A turn is already in progress for this session"})
+            else:
+                outbox.offer({"t": "err", "sid": session_id, "msg": f"Unsupported frame: {op}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for session_id in list(subscriptions):
+            unsubscribe(session_id)
+        for task in list(replays):
+            task.cancel()
+        outbox.close()
+        writer_task.cancel()
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -84,6 +1181,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    await db.status_checks.create_index([("timestamp", 1), ("id", 1)])
+    await db.status_checks.create_index("id", unique=True)
+    await db.candidates.create_index("id", unique=True)
+    await db.candidates.create_index("email_normalized", unique=True)
+    # Equality filters first, then the experience range, then the page order
+    await db.candidates.create_index([("years_experience", 1), ("id", 1)])
+    await db.candidates.create_index([("location_normalized", 1), ("years_experience", 1), ("id", 1)])
+    await db.candidates.create_index([("positions_normalized", 1), ("years_experience", 1), ("id", 1)])
+    # Multikey: one index entry per tech stack item
+    await db.candidates.create_index([("tech_stack_normalized", 1), ("years_experience", 1), ("id", 1)])
+    await db.interview_messages.create_index([("session_id", 1), ("timestamp", 1)])
+    await db.evaluations.create_index("id", unique=True)
+    # The sweeper looks for queued jobs and running jobs with an expired lease
+    await db.evaluations.create_index([("status", 1), ("lease_until", 1)])
+    await db.evaluations.create_index("session_id")
+    await db.letta_messages.create_index([("agent_id", 1), ("id", 1), ("message_type", 1)], unique=True)
+    await db.letta_messages.create_index([("agent_id", 1), ("date", 1)])
+    await db.letta_history_cursors.create_index("agent_id", unique=True)
+
+@app.on_event("startup")
+async def load_candidate_index():
+    global candidate_index, candidate_index_watermark
+    candidate_index, candidate_index_watermark = CandidateIndex(), None
+    synced = await sync_candidate_index()
+    logger.info(f"Indexed {synced} candidates for search")
+    if CANDIDATE_INDEX_REFRESH_SECONDS > 0:
+        spawn(refresh_candidate_index())
+
+@app.on_event("startup")
+async def start_evaluation_pipeline():
+    global evaluation_pipeline
+    evaluation_pipeline = EvaluationPipeline(
+        db.evaluations,
+        grade_answer,
+        summarize_interview,
+        finalize_evaluation,
+        workers=EVALUATION_WORKERS,
+        concurrency=max(1, len(EVALUATION_AGENT_IDS)),
+        lease_seconds=EVALUATION_LEASE_SECONDS
+    )
+    resumed = await evaluation_pipeline.start()
+    if resumed:
+        logger.info(f"Resumed {resumed} interrupted evaluation jobs")
+
+@app.on_event("startup")
+async def start_history_sync():
+    global history_syncer
+    history_syncer = HistorySyncer(
+        db.letta_messages,
+        db.letta_history_cursors,
+        page_size=HISTORY_SYNC_PAGE_SIZE,
+        concurrency=HISTORY_SYNC_CONCURRENCY,
+        rate=HISTORY_SYNC_RATE
+    )
+    if HISTORY_SYNC_INTERVAL_SECONDS > 0:
+        spawn(sync_history_periodically())
+
+@app.on_event("startup")
+async def start_letta_warmup():
+    letta_service.start_warmup()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in list(background_tasks):
+        task.cancel()
+    if evaluation_pipeline is not None:
+        await evaluation_pipeline.stop()
     client.close()
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""Benchmark faceted candidate search on the in-memory bitmap index
+
+Builds ``--candidates`` synthetic profiles from TECH_STACK_CATEGORIES
+(default one million), then times typical recruiter queries, each
+returning a first page plus counts for every facet, against a linear
+scan over the same dicts.
+
+Usage:
+    python benchmarks/candidate_search_benchmark.py [--candidates 1000000] [--seed 7]
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from services.candidate_index import CandidateIndex, experience_band
+from utils.constants import TECH_STACK_CATEGORIES
+
+LOCATIONS = ["Bengaluru", "Pune", "Hyderabad", "Delhi", "Mumbai", "Chennai", "London", "Berlin",
+             "New York", "San Francisco", "Toronto", "Singapore", "Remote"]
+POSITIONS = ["Backend Engineer", "Frontend Engineer", "Full Stack Engineer", "Data Engineer",
+             "DevOps Engineer", "ML Engineer", "Mobile Engineer", "SRE"]
+TECH_ITEMS = [item for items in TECH_STACK_CATEGORIES.values() for item in items]
+
+QUERIES = [
+    ("python AND aws", {"tech_stack": ["Python", "AWS"]}, {}),
+    ("react OR vue, in pune", {}, {"tech_stack": ["React", "Vue"], "current_location": ["Pune"]}),
+    ("go AND kubernetes, 5-10 yrs", {"tech_stack": ["Go", "Kubernetes"]}, {"experience_band": ["5-10"]}),
+    ("java, backend, london OR berlin", {"tech_stack": ["Java"]},
+     {"desired_positions": ["Backend Engineer"], "current_location": ["London", "Berlin"]}),
+]
+
+
+def make_candidates(count: int, rng: random.Random):
+    for _ in range(count):
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "tech_stack": rng.sample(TECH_ITEMS, rng.randint(2, 7)),
+            "current_location": rng.choice(LOCATIONS),
+            "desired_positions": rng.sample(POSITIONS, rng.randint(1, 2)),
+            "years_experience": round(rng.uniform(0, 20), 1),
+        }
+
+
+def linear_scan(candidates, all_of, any_of, limit=50):
+    """Reference implementation: test every candidate, then count facets"""
+    def values(c, facet):
+        if facet == "experience_band":
+            return {experience_band(c["years_experience"])}
+        raw = c[facet]
+        return {v.lower() for v in (raw if isinstance(raw, list) else [raw])}
+
+    matches = [
+        c for c in candidates
+        if all(all(v.lower() in values(c, f) for v in vs) for f, vs in all_of.items())
+        and all(values(c, f) & {v.lower() for v in vs} for f, vs in any_of.items())
+    ]
+    counts = {}
+    for c in matches:
+        for facet in ("tech_stack", "current_location", "desired_positions", "experience_band"):
+            for v in values(c, facet):
+                counts[(facet, v)] = counts.get((facet, v), 0) + 1
+    return len(matches), [c["id"] for c in matches[:limit]]
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-scan", action="store_true", help="skip the linear-scan baseline")
+    args = parser.parse_args()
+
+    print(f"Generating {args.candidates:,} candidates...")
+    candidates = list(make_candidates(args.candidates, random.Random(args.seed)))
+
+    index = CandidateIndex()
+    started = time.perf_counter()
+    index.upsert_many(candidates)
+    elapsed = time.perf_counter() - started
+    postings = sum(len(p) for p in index.postings.values())
+    print(f"  indexed in {elapsed:.1f} s ({args.candidates / elapsed:,.0f} candidates/s), {postings} posting bitmaps\n")
+
+    print(f"Query latency, first page of 50 + all facet counts (best of {args.repeat})")
+    print(f"  {'query':<36} {'matches':>9} {'index':>10} {'scan':>10}")
+    for label, all_of, any_of in QUERIES:
+        index_time, result = best_of(lambda: index.search(all_of, any_of), args.repeat)
+        scan = "-"
+        if not args.skip_scan:
+            scan_time, (total, ids) = best_of(lambda: linear_scan(candidates, all_of, any_of), 1)
+            assert (total, ids) == (result["total"], result["ids"]), label
+            scan = f"{scan_time * 1000:8.0f}ms"
+        print(f"  {label:<36} {result['total']:>9,} {index_time * 1000:8.2f}ms {scan:>10}")
+
+    sample = candidates[: min(10000, len(candidates))]
+    started = time.perf_counter()
+    for c in sample:
+        index.upsert(dict(c, current_location="Remote"))
+    per_update = (time.perf_counter() - started) / len(sample)
+    print(f"\nIncremental update: {per_update * 1e6:.1f} µs per re-upsert")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Estimate agent turns and tokens saved by local field extraction
+
+Replays scripted candidates through an information-collection loop: each
+turn the "agent" asks for the first required field still missing and the
+candidate answers in their own words (sometimes volunteering more than
+was asked). Two runs are compared:
+
+- agent only: every required field costs its own question turn
+- local extraction: after each reply the CandidateRecord is updated and
+  only fields it still lacks are asked for
+
+Tokens are estimated as ``--tokens-per-turn`` per agent turn plus the
+known-details notes sent ahead of messages (4 characters per token).
+Extraction latency per reply is reported too.
+
+Usage:
+    python benchmarks/field_extraction_benchmark.py [--tokens-per-turn 1800]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from utils.constants import FIELD_QUESTIONS, InfoFields, REQUIRED_FIELDS
+from utils.extraction import CandidateRecord
+
+# Each persona: opening message, then answers by field
+PERSONAS = [
+    ("Hi! I'm Priya Sharma, priya.s@example.com, +91 98765 43210. I have 5 years of experience "
+     "with Python, Django and AWS, based in Pune, applying for backend engineer roles.", {}),
+    ("Hello, my name is Tom Becker and I'm looking for a DevOps Engineer position.", {
+        InfoFields.EMAIL: "tom.becker@example.de",
+        InfoFields.PHONE: "+49 151 2345 6789",
+        InfoFields.YEARS_EXPERIENCE: "about 8 years",
+        InfoFields.CURRENT_LOCATION: "Berlin",
+        InfoFields.TECH_STACK: "Docker, Kubernetes, Terraform and Go",
+    }),
+    ("hi", {
+        InfoFields.FULL_NAME: "ana lima",
+        InfoFields.EMAIL: "ana@example.com",
+        InfoFields.PHONE: "(555) 123-4567",
+        InfoFields.YEARS_EXPERIENCE: "2",
+        InfoFields.DESIRED_POSITIONS: "Frontend developer",
+        InfoFields.CURRENT_LOCATION: "Toronto",
+        InfoFields.TECH_STACK: "React, TypeScript, some Node",
+    }),
+    ("Good morning. I'm Wei Chen, 12 years in Java and Spring, I live in Singapore.", {
+        InfoFields.EMAIL: "my email is wei.chen@example.sg and phone +65 9123 4567",
+        InfoFields.PHONE: "+65 9123 4567",
+        InfoFields.DESIRED_POSITIONS: "Staff engineer or engineering manager",
+    }),
+]
+
+
+def run_interview(opening, answers, use_record):
+    record = CandidateRecord()
+    record.update(opening)
+    asked = []
+    note_chars = 0
+    extract_seconds = 0.0
+    for field in REQUIRED_FIELDS:
+        if use_record and field in record.fields:
+            continue
+        asked.append(field)
+        reply = answers.get(field, "")
+        started = time.perf_counter()
+        record.update(reply, FIELD_QUESTIONS[field])
+        extract_seconds += time.perf_counter() - started
+        note = record.pending_context() if use_record else None
+        note_chars += len(note or "")
+    return record, len(asked), note_chars, extract_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens-per-turn", type=int, default=1800,
+                        help="mean prompt+completion tokens of one agent turn")
+    args = parser.parse_args()
+
+    totals = {"baseline_turns": 0, "local_turns": 0, "note_tokens": 0}
+    replies = 0
+    extract_seconds = 0.0
+    print(f"{'persona':<12} {'agent only':>10} {'local':>6} {'captured':>9}")
+    for n, (opening, answers) in enumerate(PERSONAS, 1):
+        _, baseline_turns, _, _ = run_interview(opening, answers, use_record=False)
+        record, turns, note_chars, seconds = run_interview(opening, answers, use_record=True)
+        totals["baseline_turns"] += baseline_turns
+        totals["local_turns"] += turns
+        totals["note_tokens"] += note_chars // 4
+        replies += turns
+        extract_seconds += seconds
+        print(f"  #{n:<9} {baseline_turns:>10} {turns:>6} {len(record.fields):>7}/7")
+
+    saved_turns = totals["baseline_turns"] - totals["local_turns"]
+    saved_tokens = saved_turns * args.tokens_per_turn - totals["note_tokens"]
+    print(f"\nInformation-collection turns: {totals['baseline_turns']} -> {totals['local_turns']} "
+          f"({saved_turns / totals['baseline_turns']:.0%} fewer)")
+    print(f"Estimated tokens saved: {saved_tokens:,} "
+          f"({args.tokens_per_turn} per turn, minus {totals['note_tokens']} for notes)")
+    print(f"Extraction latency: {extract_seconds / max(replies, 1) * 1e6:.0f} µs per reply")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Turn-one TTFT benchmark: live agent call vs the cached opening turn
+
+Measures how long a new session waits before the first assistant text is
+on screen:
+
+- uncached: the first message is streamed from the agent and the clock
+  stops at the first assistant event (what every session used to wait)
+- cached: the opening is served from LettaService's first-turn cache
+
+By default the agent is simulated with a fixed time to first token, so no
+credentials are needed. ``--live`` talks to the agent configured in
+.env.streamlit instead (note that each uncached run adds a turn to the
+agent's history).
+
+Usage:
+    python benchmarks/first_turn_benchmark.py [--runs 5] [--ttft 1.5] [--live]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from dotenv import load_dotenv
+
+from services.letta_service import LettaService
+
+OPENING = "Hi, I'm TalentScout's screening assistant. Could you please tell me your full name?"
+
+
+class SimulatedMessages:
+    """Streams a fixed opening after ``ttft`` seconds, then tokens at ``tps``"""
+
+    def __init__(self, ttft: float, tps: float):
+        self.ttft = ttft
+        self.tps = tps
+
+    def create_stream(self, **kwargs):
+        time.sleep(self.ttft)
+        for word in OPENING.split(" "):
+            yield SimpleNamespace(message_type="assistant_message", id="opening", content=word + " ")
+            time.sleep(1 / self.tps)
+
+
+def simulated_service(ttft: float, tps: float) -> LettaService:
+    service = LettaService()
+    service.client = SimpleNamespace(agents=SimpleNamespace(messages=SimulatedMessages(ttft, tps)))
+    service.is_connected = True
+    service.agent_info = {"id": service.agent_id, "version": "benchmark"}
+    return service
+
+
+def live_service() -> LettaService:
+    load_dotenv(ROOT_DIR / ".env.streamlit")
+    service = LettaService()
+    if not service.refresh():
+        sys.exit(f"Could not reach the Letta agent: {service.last_error}")
+    return service
+
+
+def uncached_turn_one(service: LettaService) -> float:
+    started = time.perf_counter()
+    stream = service.send_message_stream("Hello", stream_tokens=True)
+    try:
+        for chunk in stream:
+            if chunk.get("type") == "assistant":
+                return time.perf_counter() - started
+            if chunk.get("type") == "error":
+                sys.exit(chunk["content"])
+    finally:
+        stream.close()
+    sys.exit("The agent sent no assistant text")
+
+
+def cached_turn_one(service: LettaService) -> float:
+    started = time.perf_counter()
+    if service.get_opening() is None:
+        sys.exit("Opening was not cached")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=1.5, help="simulated time to first token, seconds")
+    parser.add_argument("--tps", type=float, default=50.0, help="simulated tokens per second")
+    parser.add_argument("--live", action="store_true", help="use the configured Letta agent")
+    args = parser.parse_args()
+
+    service = live_service() if args.live else simulated_service(args.ttft, args.tps)
+    uncached = [uncached_turn_one(service) for _ in range(args.runs)]
+
+    key = service.opening_key()
+    if not service.opening_cache.ensure(key):
+        sys.exit("Could not generate the opening turn")
+    cached = [cached_turn_one(service) for _ in range(args.runs)]
+
+    source = "live agent" if args.live else f"simulated agent, {args.ttft:g}s TTFT"
+    print(f"Turn-one time to first assistant text ({source}, {args.runs} runs)")
+    print(f"  uncached agent call   median {statistics.median(uncached) * 1000:>10.1f} ms")
+    print(f"  cached opening        median {statistics.median(cached) * 1000:>10.3f} ms")
+    print(f"  cache summary: {service.opening_cache.summary()}")
+
+
+if __name__ == "__main__":
+    main()
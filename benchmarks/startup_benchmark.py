@@ -0,0 +1,112 @@
+"""Cold-start benchmark: time-to-first-paint for the Streamlit entry points
+
+Each run executes the app in a fresh interpreter through Streamlit's AppTest
+harness, so module imports, settings construction and the Letta connection
+are all paid from scratch, exactly like a cold Space / Cloud container.
+
+Time-to-first-paint is measured from script start to the ``first_paint``
+mark recorded by ``utils.profiling`` right after the header and chat input
+are emitted.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--profile-imports]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+
+APPS = {
+    "streamlit_app.py": ROOT_DIR / "streamlit_app.py",
+    "hf_deployment/streamlit_app.py": ROOT_DIR / "hf_deployment" / "streamlit_app.py",
+}
+
+# Executed in the child interpreter. Streamlit itself is imported before the
+# clock starts because the Streamlit server has always loaded it already.
+_CHILD = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file({path!r}, default_timeout={timeout})
+started = time.perf_counter()
+app.run()
+finished = time.perf_counter()
+
+profiling = sys.modules.get("utils.profiling")
+marks = profiling.get_marks(since=started) if profiling else {{}}
+print(json.dumps({{
+    "first_paint_ms": marks.get("first_paint"),
+    "script_ms": (finished - started) * 1000,
+    "exception": [str(e.value) for e in app.exception],
+}}))
+"""
+
+
+def run_once(app_path: Path, timeout: float) -> dict:
+    """Run a single cold start and return its timings"""
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(path=str(app_path), timeout=timeout)],
+        capture_output=True,
+        text=True,
+        cwd=str(app_path.parent)
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "benchmark child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(name: str, samples: list) -> str:
+    """Format median/min/max for a list of run results"""
+    paints = [s["first_paint_ms"] for s in samples if s["first_paint_ms"] is not None]
+    scripts = [s["script_ms"] for s in samples]
+    lines = [f"{name} ({len(samples)} runs)"]
+    if paints:
+        lines.append(
+            f"  time-to-first-paint  median {statistics.median(paints):8.1f} ms"
+            f"  min {min(paints):8.1f} ms  max {max(paints):8.1f} ms"
+        )
+    else:
+        lines.append("  time-to-first-paint  n/a (first_paint mark not reached)")
+    lines.append(
+        f"  full script run      median {statistics.median(scripts):8.1f} ms"
+        f"  min {min(scripts):8.1f} ms  max {max(scripts):8.1f} ms"
+    )
+    errors = {e for s in samples for e in s["exception"]}
+    for error in sorted(errors):
+        lines.append(f"  exception: {error}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per app")
+    parser.add_argument("--timeout", type=float, default=60.0, help="AppTest timeout in seconds")
+    parser.add_argument("--profile-imports", action="store_true",
+                        help="also print an import-time report for each app's modules")
+    args = parser.parse_args()
+
+    for name, path in APPS.items():
+        samples = [run_once(path, args.timeout) for _ in range(args.runs)]
+        print(summarize(name, samples))
+        print()
+
+    if args.profile_imports:
+        sys.path.insert(0, str(ROOT_DIR))
+        from utils.profiling import import_time_report
+
+        statement = (
+            "import streamlit; import config.settings; import utils.helpers; "
+            "import services.letta_service"
+        )
+        for name, path in APPS.items():
+            print(f"[{name}]")
+            print(import_time_report(statement, cwd=str(path.parent)))
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark GET /api/status: legacy to_list(1000) vs keyset pages
+
+Seeds a status_checks collection with synthetic documents (BSON datetime
+timestamps, as written by POST /api/status) and times:
+
+- legacy: ``find({}).to_list(1000)``, the unpaginated query it replaced
+- keyset: one page of ``--page`` rows at the start, middle and end of the
+  collection, through the same cursor and serializer the endpoint uses
+
+By default an in-memory mongomock stand-in is used. It has no query planner,
+so every keyset page is a full scan there; point ``--mongo-url`` at a local
+mongod (e.g. ``docker run -p 27017:27017 mongo``) to see indexed behaviour
+at a few million documents.
+
+Usage:
+    python benchmarks/status_pagination_benchmark.py --docs 3000000 --mongo-url mongodb://localhost:27017
+    python benchmarks/status_pagination_benchmark.py --docs 200000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "talentscout_benchmark")
+
+
+async def seed(collection, docs: int, batch: int = 10000):
+    """Insert ``docs`` synthetic status checks in timestamp order"""
+    await collection.drop()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for offset in range(0, docs, batch):
+        await collection.insert_many([
+            {
+                "id": str(uuid.uuid4()),
+                "client_name": f"client-{n % 500}",
+                "timestamp": start + timedelta(seconds=n)
+            }
+            for n in range(offset, min(offset + batch, docs))
+        ], ordered=False)
+
+
+async def drain(stream) -> int:
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+    return size
+
+
+async def timed(label: str, coro_factory, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await coro_factory()
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<34} {best * 1000:10.1f} ms  ({result})")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mongo-url", help="real MongoDB to use instead of mongomock")
+    args = parser.parse_args()
+
+    import server
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        server.db = AsyncIOMotorClient(args.mongo_url)[os.environ["DB_NAME"]]
+        backend = args.mongo_url
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+        backend = "mongomock (in-memory, no indexes)"
+
+    collection = server.db.status_checks
+    print(f"Seeding {args.docs:,} documents into {backend}...")
+    started = time.perf_counter()
+    await seed(collection, args.docs)
+    await server.create_indexes()
+    print(f"  seeded in {time.perf_counter() - started:.1f} s\n")
+
+    async def legacy():
+        # limit() too: the mongomock stand-in ignores to_list's length
+        rows = await collection.find({}, {"_id": 0}).limit(1000).to_list(1000)
+        return f"{len(rows)} rows, {args.docs - len(rows):,} unreachable"
+
+    ordered = collection.find({}, {"_id": 0, "id": 1}).sort([("timestamp", 1), ("id", 1)])
+    anchors = {"start": None}
+    position = 0
+    async for doc in ordered:
+        position += 1
+        if position == args.docs // 2:
+            anchors["middle"] = doc["id"]
+        if position == args.docs - args.page:
+            anchors["end"] = doc["id"]
+
+    print(f"GET /api/status over {args.docs:,} documents (best of {args.repeat})")
+    await timed("legacy to_list(1000)", legacy, args.repeat)
+    for label, after in anchors.items():
+        async def page(after=after):
+            stream = server.stream_json_array(
+                await server.status_page_cursor(args.page, after), server.STATUS_ROWS_ADAPTER
+            )
+            return f"{await drain(stream):,} bytes"
+        await timed(f"keyset page of {args.page} at {label}", page, args.repeat)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
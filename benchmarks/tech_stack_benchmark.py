@@ -0,0 +1,103 @@
+"""Throughput benchmark for tech stack extraction
+
+Compares the original per-item substring loop with the compiled trie
+matcher on synthetic interview transcripts, in MB/s, first with the
+built-in vocabulary and then with ``--extra-terms`` synthetic technology
+names added to both, to show how each scales with vocabulary size. The
+cost per message is also reported for typical single replies, which is
+how extraction runs during an interview.
+
+Usage:
+    python benchmarks/tech_stack_benchmark.py [--transcripts 2000] [--words 400]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from utils.constants import OTHER_TECH, TECH_STACK_CATEGORIES
+from utils.tech_stack import TechStackMatcher
+
+FILLER = (
+    "I worked on a small team building internal services and we had good review "
+    "processes so I enjoy learning new things and mentoring people on the project"
+).split()
+MENTIONS = ["Python 3.11", "AWS", "k8s", "Postgres", "React", "JavaScript", "golang", "Docker", "Java 17"]
+REPLIES = [
+    "Python, Django and PostgreSQL",
+    "I spent 2 years migrating our services to Go and Kubernetes.",
+    "Priya Sharma",
+    "It wraps a function and returns a new one that adds behaviour.",
+]
+
+
+def substring_loop(categories):
+    """The original extract_tech_stack: lowercase, then `in` per item"""
+    def extract(text):
+        text_lower = text.lower()
+        return {
+            category: [item for item in items if item.lower() in text_lower]
+            for category, items in categories.items()
+        }
+    return extract
+
+
+def make_transcripts(count, words, rng):
+    vocabulary = FILLER * 8 + MENTIONS
+    return [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(count)]
+
+
+def throughput(fn, texts, repeat):
+    size = sum(len(t) for t in texts) / 1e6
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return size / best
+
+
+def per_message(fn, texts, repeat):
+    """Best mean microseconds per call over ``texts``"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(1000):
+            for text in texts:
+                fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best / (1000 * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcripts", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--extra-terms", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    texts = make_transcripts(args.transcripts, args.words, rng)
+    extra = OTHER_TECH + [f"techname{n}" for n in range(args.extra_terms)]
+
+    print(f"{args.transcripts:,} transcripts of {args.words} words (best of {args.repeat})")
+    for label, other in [("built-in vocabulary", OTHER_TECH), (f"+{args.extra_terms} terms", extra)]:
+        matcher = TechStackMatcher(categories=TECH_STACK_CATEGORIES, other=other)
+        # The original loop never looked at "other"; give it the extra terms too
+        loop_categories = TECH_STACK_CATEGORIES if other is OTHER_TECH else {**TECH_STACK_CATEGORIES, "other": other}
+        terms = sum(len(items) for items in loop_categories.values())
+        old = throughput(substring_loop(loop_categories), texts, args.repeat)
+        new = throughput(matcher.extract, texts, args.repeat)
+        print(f"  {label:<22} ({terms:>5} names)  substring loop {old:7.1f} MB/s   compiled matcher {new:7.1f} MB/s")
+        old = per_message(substring_loop(loop_categories), REPLIES, args.repeat)
+        new = per_message(matcher.extract, REPLIES, args.repeat)
+        print(f"  {'':<22} {'per reply':>13}  substring loop {old:7.1f} us     compiled matcher {new:7.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,22 @@
 """Application settings and configuration management"""
 import os
+import sys
 from pydantic_settings import BaseSettings
 from typing import Optional
 
 def get_streamlit_secrets():
-    """Get secrets from Streamlit Cloud or return None for local development"""
+    """Get secrets from Streamlit Cloud or return None for local development
+
+    Secrets are only probed when Streamlit is already loaded, so the backend
+    and CLI tools never pay for a Streamlit import just to build settings.
+    """
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None
     try:
-        import streamlit as st
-        return st.secrets
-    except:
+        # Touching the mapping parses secrets.toml; a missing file raises
+        return st.secrets if len(st.secrets) else None
+    except Exception:
         return None
 
 class Settings(BaseSettings):
@@ -19,6 +27,29 @@ class Settings(BaseSettings):
     letta_agent_id: str = "placeholder"
     letta_project_id: str = "placeholder"
     letta_base_url: str = "https://api.letta.com"
+    letta_base_urls: str = ""  # comma-separated endpoints (replicas, cloud) to fail over across; empty: letta_base_url
+    letta_probe_interval: float = 15.0  # seconds between endpoint health probes (with several endpoints)
+    letta_probe_timeout: float = 5.0
+    letta_warmup_interval: float = 300.0  # seconds between agent info refreshes
+    letta_attach_timeout: float = 10.0  # max wait for warm-up when a session starts
+    letta_breaker_error_rate: float = 0.5  # error share over the window that opens the breaker
+    letta_breaker_p95_seconds: float = 20.0  # p95 time to first event that opens the breaker
+    letta_breaker_window_seconds: float = 60.0
+    letta_breaker_min_calls: int = 5  # calls in the window before the breaker can trip
+    letta_breaker_open_seconds: float = 30.0  # time open before a half-open probe
+    letta_opening_agent_id: str = ""  # scratch agent configured like the interview agent that writes the cached opening; empty: no cached opening
+    letta_opening_ttl: float = 3600.0  # seconds before the cached opening turn is regenerated
+    letta_resume_attempts: int = 3  # reconnects after a stream drops mid-turn
+    letta_resume_backoff: float = 0.5  # seconds before the first reconnect, doubling after each
+    letta_resume_poll_interval: float = 1.0  # seconds between history reads while the run is still going
+    letta_resume_history_limit: int = 50  # recent history messages searched for the rest of the turn
+    letta_background_streams: bool = False  # run turns in Letta background mode so drops replay exactly
+    letta_idempotency_ttl: float = 300.0  # seconds a finished turn answers resubmissions of its message
+    letta_agent_variants: str = ""  # A/B routing "name=agent_id:weight,..."; empty: all sessions to letta_agent_id
+    letta_variant_salt: str = ""  # change to reshuffle which sessions land in which variant
+    local_intents: str = "exit,help,repeat,acknowledge"  # comma-separated intents answered without the agent
+    interview_mode: str = "hybrid"  # "hybrid": details collected by a local script; "agent": all turns to Letta
+    technical_question_turns: int = 5  # technical answers before the agent concludes
     
     # MongoDB Configuration (Optional)
     mongo_url: str = "mongodb://localhost:27017"
@@ -45,11 +76,17 @@ class Settings(BaseSettings):
             self.letta_agent_id = secrets.get("LETTA_AGENT_ID", self.letta_agent_id)
             self.letta_project_id = secrets.get("LETTA_PROJECT_ID", self.letta_project_id)
             self.letta_base_url = secrets.get("LETTA_BASE_URL", self.letta_base_url)
+            self.letta_base_urls = secrets.get("LETTA_BASE_URLS", self.letta_base_urls)
+            self.letta_agent_variants = secrets.get("LETTA_AGENT_VARIANTS", self.letta_agent_variants)
+            self.letta_variant_salt = secrets.get("LETTA_VARIANT_SALT", self.letta_variant_salt)
             self.mongo_url = secrets.get("MONGO_URL", self.mongo_url)
             self.db_name = secrets.get("DB_NAME", self.db_name)
             self.app_title = secrets.get("APP_TITLE", self.app_title)
             self.app_icon = secrets.get("APP_ICON", self.app_icon)
             self.debug_mode = secrets.get("DEBUG_MODE", self.debug_mode)
+            self.local_intents = secrets.get("LOCAL_INTENTS", self.local_intents)
+            self.interview_mode = secrets.get("INTERVIEW_MODE", self.interview_mode)
+            self.technical_question_turns = secrets.get("TECHNICAL_QUESTION_TURNS", self.technical_question_turns)
 
 # Global settings instance
 settings = Settings()
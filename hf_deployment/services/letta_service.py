@@ -1,10 +1,14 @@
 """Service for interacting with Letta Agent with streaming support"""
-from letta_client import Letta
-from typing import Optional, Dict, List, Generator, Any
+from typing import Optional, Dict, List, Generator, Any, TYPE_CHECKING
 import os
 from config.settings import settings
 import logging
 
+if TYPE_CHECKING:
+    # letta_client takes most of the cold-start import budget, so it is only
+    # imported when a connection is actually built (see connect())
+    from letta_client import Letta
+
 logger = logging.getLogger(__name__)
 
 class LettaService:
@@ -12,13 +16,15 @@ class LettaService:
     
     def __init__(self):
         """Initialize Letta client"""
-        self.client: Optional[Letta] = None
+        self.client: Optional["Letta"] = None
         self.agent_id: str = settings.letta_agent_id
         self.is_connected: bool = False
     
     def connect(self) -> bool:
         """Connect to Letta API"""
         try:
+            from letta_client import Letta
+
             self.client = Letta(
                 token=settings.letta_api_key,
                 base_url=settings.letta_base_url
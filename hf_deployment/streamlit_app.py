@@ -12,6 +12,8 @@ import time
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from utils.profiling import mark
+
 # Load environment variables
 load_dotenv('.env.streamlit')
 
@@ -671,6 +673,15 @@ def main():
         unsafe_allow_html=True
     )
     
+    # Display chat history
+    for message in st.session_state.messages:
+        render_message(message)
+    
+    # Declare the chat input before connecting so the first paint (header,
+    # history and input box) never waits on Letta client construction
+    prompt = st.chat_input("Type your message here...", key="user_input")
+    mark("first_paint")
+    
     # Connect to Letta
     if not st.session_state.letta_connected:
         connect_to_letta()
@@ -678,15 +689,9 @@ def main():
     # Render sidebar
     render_sidebar()
     
-    # Main chat interface - no subtitle for cleaner look
-    
-    # Display chat history
-    for message in st.session_state.messages:
-        render_message(message)
-    
     # Chat input
     if st.session_state.letta_connected:
-        if prompt := st.chat_input("Type your message here...", key="user_input"):
+        if prompt:
             # Add user message to history
             st.session_state.messages.append({
                 'role': 'user',
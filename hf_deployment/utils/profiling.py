@@ -0,0 +1,80 @@
+"""Startup timing marks and import-time profiling helpers"""
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Reference point for all marks: the moment this module was first imported.
+# Entry points import it before anything heavy so marks measure script cost.
+_START = time.perf_counter()
+_MARKS: Dict[str, float] = {}
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def mark(name: str) -> float:
+    """Record a named startup mark (first occurrence wins)
+
+    Returns:
+        Milliseconds elapsed since this module was imported
+    """
+    if name not in _MARKS:
+        _MARKS[name] = time.perf_counter()
+    return (_MARKS[name] - _START) * 1000
+
+
+def get_marks(since: Optional[float] = None) -> Dict[str, float]:
+    """Return all recorded marks in milliseconds
+
+    Args:
+        since: ``time.perf_counter()`` reference; defaults to module import time
+    """
+    origin = _START if since is None else since
+    return {name: (ts - origin) * 1000 for name, ts in _MARKS.items()}
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int, int]]:
+    """Parse ``python -X importtime`` output
+
+    Returns:
+        List of (module, self_us, cumulative_us, depth) tuples
+    """
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def import_time_report(statement: str, top: int = 15, cwd: Optional[str] = None) -> str:
+    """Profile imports for a statement in a fresh interpreter
+
+    Args:
+        statement: Python source to execute, e.g. ``"import services.letta_service"``
+        top: Number of top-level imports to list, slowest first
+        cwd: Working directory for the child interpreter
+
+    Returns:
+        Human-readable report of the slowest top-level imports
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        cwd=cwd
+    )
+    rows = parse_importtime(result.stderr)
+    top_level = sorted((r for r in rows if r[3] == 0), key=lambda r: r[2], reverse=True)
+    total_ms = sum(r[2] for r in top_level) / 1000
+
+    lines = [f"Import profile for: {statement}", f"Total import time: {total_ms:.1f} ms", ""]
+    lines.append(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for module, self_us, cumulative_us, _ in top_level[:top]:
+        lines.append(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {module}")
+    if result.returncode != 0:
+        lines.append("")
+        lines.append(f"Statement failed: {result.stderr.strip().splitlines()[-1]}")
+    return "\n".join(lines)
@@ -0,0 +1,113 @@
+"""Batch re-scoring of stored interviews
+
+Reads transcripts from chat exports and candidate JSON files (any mix of
+files and directories), or from the backend's Mongo store, grades every
+technical answer and writes one result row per transcript. Rerunning with
+the same output resumes: transcripts already written are skipped and
+transcripts that failed are retried.
+
+The ``letta`` evaluator grades with the agents in --agent-id (default
+EVALUATION_AGENT_ID, comma-separated) using the credentials in
+.env.streamlit. Each agent grades one answer at a time and is reset in
+between, so at most one grading call per agent is in flight whatever
+--concurrency says. The ``local`` evaluator needs no credentials and
+scores with a heuristic.
+
+Usage:
+    python scripts/batch_screening.py exports/ saved/*.json --output results.jsonl
+    python scripts/batch_screening.py --store --evaluator letta --output results.parquet \\
+        [--workers 4] [--concurrency 8] [--max-attempts 3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from dotenv import load_dotenv
+
+from services.batch_screening import BatchScreening, iter_files, iter_store, local_grade, open_results
+from services.evaluation import AgentPool, agent_reply, grade_prompt, parse_grade
+
+
+def letta_grader(agent_ids):
+    from services.letta_service import letta_service
+
+    if not letta_service.refresh():
+        sys.exit(f"Could not reach Letta: {letta_service.last_error}")
+    agents = AgentPool(agent_ids, reset=letta_service.reset_messages_async)
+
+    async def grade(question, answer, candidate):
+        async with agents.use() as agent_id:
+            reply = await agent_reply(letta_service, grade_prompt(question, answer, candidate), agent_id)
+        return parse_grade(reply)
+
+    return grade
+
+
+def store_transcripts(sessions):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(ROOT_DIR / "backend" / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"], tz_aware=True)
+    return iter_store(client[os.environ["DB_NAME"]], sessions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="export / candidate JSON files or directories")
+    parser.add_argument("--store", action="store_true", help="read transcripts from the backend's Mongo store")
+    parser.add_argument("--session", action="append", help="only this session (with --store; repeatable)")
+    parser.add_argument("--output", required=True, help="results.jsonl, or results.parquet (a directory of parts; needs pyarrow)")
+    parser.add_argument("--evaluator", choices=["local", "letta"], default="local")
+    parser.add_argument("--agent-id", default=os.environ.get("EVALUATION_AGENT_ID"))
+    parser.add_argument("--workers", type=int, default=4, help="transcripts in progress at once")
+    parser.add_argument("--concurrency", type=int, default=8, help="grading calls in flight")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--rows-per-part", type=int, default=100, help="Parquet rows per part file")
+    parser.add_argument("--progress-every", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.store == bool(args.paths):
+        parser.error("give either paths or --store")
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    load_dotenv(ROOT_DIR / ".env.streamlit")
+
+    if args.evaluator == "letta":
+        agent_ids = [
+            agent_id.strip()
+            for agent_id in (args.agent_id or os.environ.get("EVALUATION_AGENT_ID") or "").split(",")
+            if agent_id.strip()
+        ]
+        if not agent_ids:
+            parser.error("the letta evaluator needs --agent-id or EVALUATION_AGENT_ID")
+        grade = letta_grader(agent_ids)
+        args.concurrency = min(args.concurrency, len(agent_ids))
+    else:
+        grade = local_grade
+
+    screening = BatchScreening(
+        grade,
+        open_results(args.output, args.rows_per_part),
+        evaluator=args.evaluator,
+        workers=args.workers,
+        concurrency=args.concurrency,
+        max_attempts=args.max_attempts,
+        progress_every=args.progress_every,
+        on_progress=lambda report: print(f"progress {json.dumps(report)}", flush=True)
+    )
+    transcripts = store_transcripts(args.session) if args.store else iter_files(args.paths)
+    report = asyncio.run(screening.run(transcripts))
+    print(json.dumps(report, indent=2))
+    if report["failed"]:
+        print(f"{report['failed']} transcripts failed; rerun with the same --output to retry them")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Weighted A/B routing of interview sessions across Letta agents
+
+Each variant is an agent configuration (a different model, memory setup or
+prompt) with a routing weight. A session is assigned to a variant on its
+first turn and keeps it: the assignment is a hash of the session id, so it
+is stable across processes and restarts, and it is also remembered so
+that changing the weights only affects new sessions.
+
+Every agent turn is recorded against the agent it went to: time to first
+assistant text, whole-turn time, token usage and errors. Sessions that
+reach the end of the interview count towards the completion rate.
+report() puts the variants side by side, relative to the first (control)
+variant.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set
+
+from services.circuit_breaker import percentile
+
+DEFAULT_VARIANT = "default"
+
+
+class Variant(NamedTuple):
+    name: str
+    agent_id: str
+    weight: float
+
+
+def parse_variants(spec: str, default_agent_id: str) -> List[Variant]:
+    """Variants from "name=agent_id:weight,..." (weight defaults to 1)
+
+    An empty spec routes everything to ``default_agent_id``.
+    """
+    variants = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, target = item.partition("=")
+        agent_id, _, weight = target.partition(":")
+        if not name.strip() or not agent_id.strip():
+            raise ValueError(f"Agent variant must look like name=agent_id[:weight]: {item!r}")
+        variants.append(Variant(name.strip(), agent_id.strip(), float(weight or 1)))
+    if not variants:
+        return [Variant(DEFAULT_VARIANT, default_agent_id, 1.0)]
+    if len({variant.name for variant in variants}) != len(variants):
+        raise ValueError(f"Duplicate agent variant names in {spec!r}")
+    if any(variant.weight < 0 for variant in variants) or not sum(variant.weight for variant in variants):
+        raise ValueError(f"Agent variant weights must be non-negative and not all zero: {spec!r}")
+    return variants
+
+
+def bucket(session_id: str, salt: str = "") -> float:
+    """Uniform position of a session in [0, 1)"""
+    digest = hashlib.sha1(f"{salt}:{session_id}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class VariantMetrics:
+    """Turn timings, tokens and outcomes of one variant"""
+
+    def __init__(self, max_samples: int = 1000):
+        self.sessions = 0
+        self.completed = 0
+        self.turns = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.ttft: Deque[float] = deque(maxlen=max_samples)
+        self.turn_seconds: Deque[float] = deque(maxlen=max_samples)
+
+    def summary(self) -> Dict[str, Any]:
+        ok = self.turns - self.errors
+        return {
+            "sessions": self.sessions,
+            "completion_rate": round(self.completed / self.sessions, 3) if self.sessions else None,
+            "turns": self.turns,
+            "error_rate": round(self.errors / self.turns, 3) if self.turns else None,
+            "ttft_p50_seconds": _percentile(self.ttft, 0.5),
+            "ttft_p95_seconds": _percentile(self.ttft, 0.95),
+            "turn_p50_seconds": _percentile(self.turn_seconds, 0.5),
+            "turn_p95_seconds": _percentile(self.turn_seconds, 0.95),
+            "prompt_tokens_per_turn": round(self.prompt_tokens / ok, 1) if ok else None,
+            "completion_tokens_per_turn": round(self.completion_tokens / ok, 1) if ok else None,
+            "tokens_per_turn": round(self.total_tokens / ok, 1) if ok else None,
+        }
+
+
+# Metrics compared in report(), and whether lower is better
+COMPARED = {
+    "ttft_p50_seconds": True,
+    "turn_p50_seconds": True,
+    "tokens_per_turn": True,
+    "error_rate": True,
+    "completion_rate": False,
+}
+
+
+class AgentRouter:
+    """Sticky weighted assignment of sessions to variants, with per-variant metrics"""
+
+    def __init__(self, variants: List[Variant], salt: str = "", max_sessions: int = 10000):
+        self.variants = variants
+        self.salt = salt
+        self.max_sessions = max_sessions
+        self.by_name = {variant.name: variant for variant in variants}
+        self.by_agent = {variant.agent_id: variant for variant in variants}
+        self.metrics = {variant.name: VariantMetrics() for variant in variants}
+        self._sessions: "OrderedDict[str, str]" = OrderedDict()  # session id -> variant name
+        self._completed: Set[str] = set()  # remembered sessions that completed
+        self._lock = threading.Lock()
+
+    def assign(self, session_id: str) -> Variant:
+        """Variant for ``session_id``; the first call counts a new session"""
+        with self._lock:
+            name = self._sessions.get(session_id)
+            if name in self.by_name:
+                self._sessions.move_to_end(session_id)
+                return self.by_name[name]
+            variant = self._pick(session_id)
+            self._sessions[session_id] = variant.name
+            if len(self._sessions) > self.max_sessions:
+                # Forgotten sessions hash to the same variant unless the weights changed
+                forgotten, _ = self._sessions.popitem(last=False)
+                self._completed.discard(forgotten)
+            self.metrics[variant.name].sessions += 1
+            return variant
+
+    def record_turn(
+        self,
+        agent_id: str,
+        ttft: Optional[float],
+        seconds: float,
+        usage: Optional[Dict[str, int]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """One agent turn; turns to agents that are not variants are ignored"""
+        variant = self.by_agent.get(agent_id)
+        if variant is None:
+            return
+        usage = usage or {}
+        with self._lock:
+            metrics = self.metrics[variant.name]
+            metrics.turns += 1
+            if error is not None:
+                metrics.errors += 1
+                return
+            if ttft is not None:
+                metrics.ttft.append(ttft)
+            metrics.turn_seconds.append(seconds)
+            metrics.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+            metrics.completion_tokens += usage.get("completion_tokens", 0) or 0
+            metrics.total_tokens += usage.get("total_tokens", 0) or 0
+
+    def record_completion(self, session_id: str) -> None:
+        """The session's interview reached its conclusion (counted once per session)"""
+        with self._lock:
+            name = self._sessions.get(session_id)
+            if name in self.metrics and session_id not in self._completed:
+                self._completed.add(session_id)
+                self.metrics[name].completed += 1
+
+    def report(self) -> Dict[str, Any]:
+        """Per-variant summaries and each variant relative to the control"""
+        with self._lock:
+            summaries = {name: metrics.summary() for name, metrics in self.metrics.items()}
+        control = self.variants[0].name
+        comparison = {}
+        for variant in self.variants[1:]:
+            changes = {}
+            for metric in COMPARED:
+                base, value = summaries[control][metric], summaries[variant.name][metric]
+                changes[metric] = round((value - base) / base, 3) if base and value is not None else None
+            comparison[variant.name] = changes
+        best = {}
+        for metric, lower in COMPARED.items():
+            measured = [(summary[metric], name) for name, summary in summaries.items() if summary[metric] is not None]
+            if len(measured) > 1:
+                best[metric] = (min(measured) if lower else max(measured))[1]
+        return {
+            "variants": {
+                variant.name: {"agent_id": variant.agent_id, "weight": variant.weight, **summaries[variant.name]}
+                for variant in self.variants
+            },
+            "control": control,
+            "relative_to_control": comparison,
+            "best": best,
+        }
+
+    def _pick(self, session_id: str) -> Variant:
+        point = bucket(session_id, self.salt) * sum(variant.weight for variant in self.variants)
+        for variant in self.variants:
+            point -= variant.weight
+            if point < 0:
+                return variant
+        return [variant for variant in self.variants if variant.weight][-1]  # float rounding at the top end
+
+
+def _percentile(samples: Deque[float], fraction: float) -> Optional[float]:
+    return round(percentile(list(samples), fraction), 3) if samples else None
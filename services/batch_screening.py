@@ -0,0 +1,426 @@
+"""Offline re-scoring of stored interview transcripts
+
+Transcripts are streamed from one of three sources:
+
+- chat exports (the TXT and Markdown files from the app's export buttons)
+- candidate JSON files written by ``utils.helpers.save_candidate_data``
+- the backend's interview_messages collection, one transcript per session
+
+Each transcript's technical answers are graded by an evaluator: the Letta
+evaluation agent, or a local heuristic scorer for dry runs. Grading uses the
+same retry rules as the backend's evaluation pipeline. ``workers``
+transcripts are in progress at once, and across them at most ``concurrency``
+grading calls are in flight.
+
+Results are written one row per transcript as soon as the transcript is
+done, to JSONL or to a directory of Parquet parts. The output is its own
+checkpoint: on a rerun, transcripts already present in the output are
+skipped. Transcripts with an answer that could not be graded are not
+written, so a rerun retries them.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Union
+)
+
+from services.circuit_breaker import percentile
+from services.evaluation import FAILED, GRADED, Grader, grade_with_retries, job_progress, new_job, overall_score
+from utils.constants import REQUIRED_FIELDS
+from utils.extraction import CandidateRecord, technical_answers
+
+logger = logging.getLogger(__name__)
+
+EXPORT_SUFFIXES = {".txt", ".md"}
+CANDIDATE_SUFFIXES = {".json"}
+
+# Message headers written by export_chat_as_txt / export_chat_as_markdown
+EXPORT_HEADER = re.compile(r"^(?:\[|## \S+ )(?P<kind>User Message|Assistant Response) #\d+\]?$")
+EXPORT_REASONING = re.compile(r"^(?:Reasoning: .*|\*💭 Reasoning: .*\*)$")
+EXPORT_SEPARATOR = re.compile(r"^(?:-{80}|---)$")
+
+
+class Transcript(NamedTuple):
+    id: str  # stable across runs: the checkpoint key
+    source: str
+    messages: List[Dict[str, str]]
+    candidate: Dict[str, Any]
+
+
+def parse_export(text: str) -> List[Dict[str, str]]:
+    """Messages of a TXT or Markdown chat export"""
+    messages: List[Dict[str, str]] = []
+    lines: List[str] = []
+
+    def close():
+        if messages:
+            messages[-1]["content"] = "\n".join(lines).strip()
+        lines.clear()
+
+    for line in text.splitlines():
+        header = EXPORT_HEADER.match(line.strip())
+        if header:
+            close()
+            role = "user" if header.group("kind") == "User Message" else "assistant"
+            messages.append({"role": role, "content": ""})
+        elif messages and not EXPORT_SEPARATOR.match(line.strip()):
+            started = any(previous.strip() for previous in lines)
+            if not (messages[-1]["role"] == "assistant" and not started and EXPORT_REASONING.match(line.strip())):
+                lines.append(line)
+    close()
+    return messages
+
+
+def candidate_fields(messages: List[Dict[str, str]], known: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Profile fields extracted from the transcript, overridden by ``known``"""
+    fields = dict(CandidateRecord.from_messages(messages).fields)
+    fields.update({key: value for key, value in (known or {}).items() if key in REQUIRED_FIELDS and value})
+    return fields
+
+
+def read_export(path: Path) -> Transcript:
+    messages = parse_export(path.read_text(encoding="utf-8"))
+    return Transcript(str(path), str(path), messages, candidate_fields(messages))
+
+
+def read_candidate_file(path: Path) -> Transcript:
+    """Transcript from a save_candidate_data file
+
+    The file holds the candidate's fields, either at the top level or under
+    "candidate", and the conversation under "messages".
+    """
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    messages = [
+        {"role": message.get("role", ""), "content": message.get("content") or ""}
+        for message in data.get("messages", [])
+    ]
+    known = {**data, **data.get("candidate", {})}
+    transcript_id = str(data.get("session_id") or data.get("id") or path)
+    return Transcript(transcript_id, str(path), messages, candidate_fields(messages, known))
+
+
+def iter_files(paths: Iterable[Union[str, Path]]) -> Iterator[Transcript]:
+    """Transcripts from export and candidate files; directories are walked in name order"""
+    for path in map(Path, paths):
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            suffix = file.suffix.lower()
+            if suffix in EXPORT_SUFFIXES:
+                yield read_export(file)
+            elif suffix in CANDIDATE_SUFFIXES:
+                yield read_candidate_file(file)
+
+
+async def iter_store(db, session_ids: Optional[List[str]] = None) -> AsyncIterator[Transcript]:
+    """Transcripts from db.interview_messages in one pass over the (session_id, timestamp) index"""
+    query = {"session_id": {"$in": session_ids}} if session_ids else {}
+    cursor = db.interview_messages.find(
+        query, {"_id": 0, "session_id": 1, "role": 1, "content": 1}
+    ).sort([("session_id", 1), ("timestamp", 1)])
+    session_id, messages = None, []
+    async for doc in cursor:
+        if doc["session_id"] != session_id:
+            if messages:
+                yield Transcript(session_id, "store", messages, candidate_fields(messages))
+            session_id, messages = doc["session_id"], []
+        messages.append({"role": doc["role"], "content": doc["content"]})
+    if messages:
+        yield Transcript(session_id, "store", messages, candidate_fields(messages))
+
+
+LOCAL_STOPWORDS = {
+    "about", "between", "could", "describe", "difference", "does", "explain", "from", "have", "how",
+    "into", "some", "that", "their", "them", "there", "they", "this", "used", "using", "what",
+    "when", "where", "which", "while", "with", "would", "your",
+}
+
+
+async def local_grade(question: str, answer: str, candidate: Dict[str, Any]):
+    """Heuristic (score, feedback) without any LLM call
+
+    Six points for detail (40 words or more scores full marks) and four for
+    covering the question's key terms. Meant for dry runs and throughput
+    measurements, not for hiring decisions.
+    """
+    words = re.findall(r"[a-z0-9+#]+", answer.lower())
+    terms = {
+        term for term in re.findall(r"[a-z][a-z0-9+#]{3,}", question.lower())
+        if term not in LOCAL_STOPWORDS
+    }
+    covered = terms & set(words)
+    coverage = len(covered) / len(terms) if terms else 1.0
+    score = round(6 * min(1.0, len(words) / 40) + 4 * coverage, 1)
+    return score, f"{len(words)} words, covers {len(covered)}/{len(terms)} key terms"
+
+
+class JsonlResults:
+    """Append-only JSONL results file, flushed after every row"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def completed(self) -> Set[str]:
+        """Transcript ids already written; a torn last line is cut off"""
+        if not self.path.exists():
+            return set()
+        done, good = set(), 0
+        with open(self.path, "rb") as handle:
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    done.add(json.loads(line)["transcript_id"])
+                except (ValueError, KeyError):
+                    break
+                good += len(line)
+        if good < self.path.stat().st_size:
+            logger.warning(f"Dropping a partial row at the end of {self.path}")
+            with open(self.path, "r+b") as handle:
+                handle.truncate(good)
+        return done
+
+    def open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = open(self.path, "a", encoding="utf-8")
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._handle.write(json.dumps(row, default=str) + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class ParquetResults:
+    """Directory of Parquet parts, one part per ``rows_per_part`` rows
+
+    Parts are written to a temporary name and renamed, so a crash loses at
+    most the rows buffered since the last part. Candidate fields are stored
+    as a JSON string so every part has the same schema.
+    """
+
+    def __init__(self, path: Path, rows_per_part: int = 100):
+        self.path = Path(path)
+        self.rows_per_part = rows_per_part
+        self._rows: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def schema():
+        import pyarrow as pa
+
+        answer = pa.struct([
+            ("question", pa.string()),
+            ("answer", pa.string()),
+            ("status", pa.string()),
+            ("score", pa.float64()),
+            ("feedback", pa.string()),
+            ("attempts", pa.int64()),
+            ("error", pa.string()),
+        ])
+        return pa.schema([
+            ("transcript_id", pa.string()),
+            ("source", pa.string()),
+            ("evaluator", pa.string()),
+            ("candidate", pa.string()),
+            ("answers", pa.list_(answer)),
+            ("answers_total", pa.int64()),
+            ("answers_graded", pa.int64()),
+            ("overall_score", pa.float64()),
+            ("seconds", pa.float64()),
+            ("scored_at", pa.float64()),
+        ])
+
+    def parts(self) -> List[Path]:
+        return sorted(self.path.glob("part-*.parquet"))
+
+    def completed(self) -> Set[str]:
+        import pyarrow.parquet as pq
+
+        done: Set[str] = set()
+        for part in self.parts():
+            done.update(pq.read_table(part, columns=["transcript_id"]).column(0).to_pylist())
+        return done
+
+    def open(self) -> None:
+        import pyarrow  # noqa: F401  (fail before any grading if it is missing)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        for leftover in self.path.glob("*.tmp"):
+            leftover.unlink()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.rows_per_part:
+            self.flush()
+
+    def flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._rows:
+            return
+        rows = [
+            {**row, "candidate": json.dumps(row["candidate"], default=str),
+             "answers_total": row["progress"]["total"], "answers_graded": row["progress"]["graded"]}
+            for row in self._rows
+        ]
+        table = pa.Table.from_pylist(rows, schema=self.schema())
+        parts = self.parts()
+        number = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        target = self.path / f"part-{number:05d}.parquet"
+        pq.write_table(table, str(target) + ".tmp")
+        os.replace(str(target) + ".tmp", target)
+        self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+
+
+def open_results(path: Union[str, Path], rows_per_part: int = 100):
+    """JSONL for a .jsonl path, Parquet parts for a .parquet directory"""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return ParquetResults(path, rows_per_part)
+    if path.suffix == ".jsonl":
+        return JsonlResults(path)
+    raise ValueError(f"Output must end in .jsonl or .parquet: {path}")
+
+
+class BatchStats:
+    """Counters and per-transcript latencies for throughput reporting"""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.scored = 0
+        self.skipped = 0  # already in the output
+        self.failed = 0
+        self.answers_graded = 0
+        self.seconds: List[float] = []
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = self.clock() - self.started
+        return {
+            "scored": self.scored,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "answers_graded": self.answers_graded,
+            "elapsed_seconds": round(elapsed, 2),
+            "transcripts_per_second": round(self.scored / elapsed, 2) if elapsed else None,
+            "answers_per_second": round(self.answers_graded / elapsed, 2) if elapsed else None,
+            "p50_seconds": round(percentile(self.seconds, 0.5), 3),
+            "p95_seconds": round(percentile(self.seconds, 0.95), 3),
+        }
+
+
+class BatchScreening:
+    """Grade a stream of transcripts into a results file"""
+
+    def __init__(
+        self,
+        grade: Grader,
+        results,
+        evaluator: str = "local",
+        workers: int = 4,
+        concurrency: int = 8,
+        max_attempts: int = 3,
+        progress_every: int = 25,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.grade = grade
+        self.results = results
+        self.evaluator = evaluator
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.progress_every = progress_every
+        self.on_progress = on_progress
+        self.stats = BatchStats()
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def run(self, transcripts: Union[Iterable[Transcript], AsyncIterable[Transcript]]) -> Dict[str, Any]:
+        """Score every transcript not already in the results; returns the final report"""
+        done = self.results.completed()
+        self.results.open()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def produce():
+            async for transcript in _aiter(transcripts):
+                if transcript.id in done:
+                    self.stats.skipped += 1
+                    continue
+                done.add(transcript.id)  # duplicates within one run are scored once
+                await queue.put(transcript)
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        # A worker that dies (e.g. the results cannot be written) fails the run
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.results.close()
+        return self.stats.report()
+
+    async def score(self, transcript: Transcript) -> Dict[str, Any]:
+        """Result row for one transcript"""
+        started = time.perf_counter()
+        job = new_job(transcript.id, technical_answers(transcript.messages), transcript.candidate)
+
+        async def grade(answer):
+            async with self._slots:
+                await grade_with_retries(self.grade, answer, job["candidate"], self.max_attempts)
+
+        await asyncio.gather(*(grade(answer) for answer in job["answers"]))
+        return {
+            "transcript_id": transcript.id,
+            "source": transcript.source,
+            "evaluator": self.evaluator,
+            "candidate": transcript.candidate,
+            "answers": job["answers"],
+            "progress": job_progress(job),
+            "overall_score": overall_score(job),
+            "seconds": round(time.perf_counter() - started, 3),
+            "scored_at": time.time(),
+        }
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            transcript = await queue.get()
+            if transcript is None:
+                return
+            try:
+                row = await self.score(transcript)
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f"Could not score {transcript.id}: {e}")
+                continue
+            if any(answer["status"] == FAILED for answer in row["answers"]):
+                # Left out of the results so that a rerun retries it
+                self.stats.failed += 1
+                errors = {answer["error"] for answer in row["answers"] if answer["status"] == FAILED}
+                logger.error(f"Could not grade every answer of {transcript.id}: {'; '.join(errors)}")
+                continue
+            self.results.write(row)
+            self.stats.scored += 1
+            self.stats.answers_graded += sum(answer["status"] == GRADED for answer in row["answers"])
+            self.stats.seconds.append(row["seconds"])
+            if self.on_progress and self.stats.scored % self.progress_every == 0:
+                self.on_progress(self.stats.report())
+
+
+async def _aiter(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,241 @@
+"""In-memory inverted index for faceted candidate search
+
+Every candidate gets a small integer slot. Each facet value (a tech stack
+item, a location, a desired position, an experience band) maps to a bitmap
+of slots, held as a Python int, so AND/OR filters are big-integer ``&`` and
+``|`` and facet counts are ``bit_count()`` of one intersection each. A
+million candidates is a 125 KB bitmap per value.
+
+The index is a per-process cache of the candidate store: it is loaded once
+and then kept current with ``upsert``/``remove`` as candidates change.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.constants import InfoFields
+from utils.helpers import normalize_key
+
+EXPERIENCE_BAND = "experience_band"
+
+# (label, lower bound inclusive, upper bound exclusive)
+EXPERIENCE_BANDS: List[Tuple[str, float, float]] = [
+    ("0-2", 0, 2),
+    ("2-5", 2, 5),
+    ("5-10", 5, 10),
+    ("10+", 10, float("inf")),
+]
+
+# Facets indexed for every candidate, keyed by candidate field name
+FACETS = (
+    InfoFields.TECH_STACK,
+    InfoFields.CURRENT_LOCATION,
+    InfoFields.DESIRED_POSITIONS,
+    EXPERIENCE_BAND,
+)
+
+
+def experience_band(years: Optional[float]) -> Optional[str]:
+    if years is None:
+        return None
+    for label, low, high in EXPERIENCE_BANDS:
+        if low <= years < high:
+            return label
+    return None
+
+
+def facet_values(candidate: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Normalized facet values of a candidate document"""
+    location = candidate.get(InfoFields.CURRENT_LOCATION)
+    band = experience_band(candidate.get(InfoFields.YEARS_EXPERIENCE))
+    return {
+        InfoFields.TECH_STACK: sorted({normalize_key(t) for t in candidate.get(InfoFields.TECH_STACK) or []}),
+        InfoFields.CURRENT_LOCATION: [normalize_key(location)] if location else [],
+        InfoFields.DESIRED_POSITIONS: sorted({normalize_key(p) for p in candidate.get(InfoFields.DESIRED_POSITIONS) or []}),
+        EXPERIENCE_BAND: [band] if band else [],
+    }
+
+
+def bitmap_of(slots: List[int]) -> int:
+    """Bitmap with the given bit positions set"""
+    if not slots:
+        return 0
+    buffer = bytearray(max(slots) // 8 + 1)
+    for slot in slots:
+        buffer[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def iter_slots(bitmap: int) -> Iterable[int]:
+    """Set bit positions of ``bitmap`` in ascending order"""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class CandidateIndex:
+    """Bitmap postings from facet values to candidates
+
+    Results come back in slot order, i.e. the order candidates were first
+    indexed. Slots of removed candidates are reused.
+    """
+
+    def __init__(self):
+        self.ids: List[Optional[str]] = []
+        self.slots: Dict[str, int] = {}
+        self.values: Dict[int, Dict[str, List[str]]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self.live = 0
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, candidate_id: str) -> bool:
+        return candidate_id in self.slots
+
+    def upsert(self, candidate: Dict[str, Any]) -> None:
+        """Index a candidate, replacing its previous postings if any"""
+        candidate_id = candidate["id"]
+        slot = self.slots.get(candidate_id)
+        if slot is None:
+            slot = self._allocate(candidate_id)
+            self.live |= 1 << slot
+        else:
+            self._unpost(slot)
+        values = facet_values(candidate)
+        bit = 1 << slot
+        for facet, keys in values.items():
+            postings = self.postings[facet]
+            for key in keys:
+                postings[key] = postings.get(key, 0) | bit
+        self.values[slot] = values
+
+    def upsert_many(self, candidates: Iterable[Dict[str, Any]]) -> int:
+        """Index many candidates, building each posting bitmap once
+
+        Setting bits one candidate at a time copies a whole bitmap per
+        value, which is quadratic over a large initial load; new candidates
+        are instead collected per value and OR-ed in as one bitmap each.
+        """
+        pending: Dict[Tuple[str, str], List[int]] = {}
+        new_slots: List[int] = []
+        count = 0
+        for candidate in candidates:
+            count += 1
+            if candidate["id"] in self.slots:
+                if pending or new_slots:
+                    # Repeated within this batch: its postings must exist first
+                    self._apply(pending, new_slots)
+                    pending, new_slots = {}, []
+                self.upsert(candidate)
+                continue
+            slot = self._allocate(candidate["id"])
+            new_slots.append(slot)
+            values = facet_values(candidate)
+            self.values[slot] = values
+            for facet, keys in values.items():
+                for key in keys:
+                    pending.setdefault((facet, key), []).append(slot)
+        self._apply(pending, new_slots)
+        return count
+
+    def _allocate(self, candidate_id: str) -> int:
+        slot = self._free.pop() if self._free else len(self.ids)
+        if slot == len(self.ids):
+            self.ids.append(candidate_id)
+        else:
+            self.ids[slot] = candidate_id
+        self.slots[candidate_id] = slot
+        return slot
+
+    def _apply(self, pending: Dict[Tuple[str, str], List[int]], new_slots: List[int]) -> None:
+        self.live |= bitmap_of(new_slots)
+        for (facet, key), slots in pending.items():
+            postings = self.postings[facet]
+            postings[key] = postings.get(key, 0) | bitmap_of(slots)
+
+    def remove(self, candidate_id: str) -> bool:
+        slot = self.slots.pop(candidate_id, None)
+        if slot is None:
+            return False
+        self._unpost(slot)
+        del self.values[slot]
+        self.ids[slot] = None
+        self.live &= ~(1 << slot)
+        self._free.append(slot)
+        return True
+
+    def _unpost(self, slot: int) -> None:
+        mask = ~(1 << slot)
+        for facet, keys in self.values[slot].items():
+            postings = self.postings[facet]
+            for key in keys:
+                remaining = postings[key] & mask
+                if remaining:
+                    postings[key] = remaining
+                else:
+                    del postings[key]
+
+    def match(
+        self,
+        all_of: Optional[Dict[str, Iterable[str]]] = None,
+        any_of: Optional[Dict[str, Iterable[str]]] = None
+    ) -> int:
+        """Bitmap of candidates matching the filters
+
+        ``all_of`` requires every listed value of each facet; ``any_of``
+        requires at least one listed value per facet. All facets are ANDed.
+        """
+        result = self.live
+        for facet, keys in (all_of or {}).items():
+            postings = self._facet(facet)
+            for key in keys:
+                result &= postings.get(self._key(facet, key), 0)
+        for facet, keys in (any_of or {}).items():
+            postings = self._facet(facet)
+            union = 0
+            for key in keys:
+                union |= postings.get(self._key(facet, key), 0)
+            result &= union
+        return result
+
+    def search(
+        self,
+        all_of: Optional[Dict[str, Iterable[str]]] = None,
+        any_of: Optional[Dict[str, Iterable[str]]] = None,
+        facets: Iterable[str] = FACETS,
+        offset: int = 0,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """Matching candidate ids with per-value counts for ``facets``
+
+        Returns:
+            {"total": int, "ids": [...], "counts": {facet: {value: count}}}
+            with counts sorted by descending count
+        """
+        result = self.match(all_of, any_of)
+        ids = []
+        for position, slot in enumerate(iter_slots(result)):
+            if position >= offset + limit:
+                break
+            if position >= offset:
+                ids.append(self.ids[slot])
+        counts = {}
+        for facet in facets:
+            facet_counts = {}
+            for key, bitmap in self._facet(facet).items():
+                count = (bitmap & result).bit_count()
+                if count:
+                    facet_counts[key] = count
+            counts[facet] = dict(sorted(facet_counts.items(), key=lambda item: (-item[1], item[0])))
+        return {"total": result.bit_count(), "ids": ids, "counts": counts}
+
+    def _facet(self, facet: str) -> Dict[str, int]:
+        try:
+            return self.postings[facet]
+        except KeyError:
+            raise ValueError(f"Unknown facet: {facet}") from None
+
+    @staticmethod
+    def _key(facet: str, value: str) -> str:
+        return value if facet == EXPERIENCE_BAND else normalize_key(value)
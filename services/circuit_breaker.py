@@ -0,0 +1,186 @@
+"""Health-aware circuit breaker for calls to the Letta agent
+
+Every call reports its outcome and latency. Over a sliding window the
+breaker trips (closed -> open) when the error rate or the p95 latency
+crosses its threshold. While open, calls are refused and callers fall back
+to local handling. After ``open_seconds`` the breaker goes half-open and
+lets a limited number of probe calls through: a successful probe closes it,
+a failed one opens it again. Every state change is recorded.
+
+Admitted calls carry a Permit. Only the outcome of a probe admitted in the
+current half-open period decides the transition; calls that were admitted
+earlier and finish while the breaker is half-open are ignored.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class Permit(NamedTuple):
+    """Admission of one call; ``probe`` is the half-open period it probes, if any"""
+    probe: Optional[int] = None
+
+
+class CallRecord(NamedTuple):
+    at: float
+    seconds: float
+    ok: bool
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of calls"""
+
+    def __init__(
+        self,
+        name: str = "letta",
+        error_rate: float = 0.5,
+        p95_seconds: float = 20.0,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        max_transitions: int = 100,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.p95_seconds = p95_seconds
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        self.state = BreakerState.CLOSED
+        self.opened_at: Optional[float] = None
+        self.transitions: Deque[Dict[str, object]] = deque(maxlen=max_transitions)
+        self._calls: Deque[CallRecord] = deque()
+        self._probes = 0
+        self._half_open_period = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now (consumes nothing)"""
+        with self._lock:
+            if self.state == BreakerState.CLOSED:
+                return True
+            if self.state == BreakerState.OPEN:
+                return self.clock() - self.opened_at >= self.open_seconds
+            return self._probes < self.half_open_probes
+
+    def allow_request(self) -> Optional[Permit]:
+        """Admit one call; None if it is refused
+
+        In half-open state this takes a probe slot. Every admitted call
+        must be followed by record_success, record_failure or release with
+        the returned permit.
+        """
+        with self._lock:
+            if self.state == BreakerState.OPEN:
+                if self.clock() - self.opened_at < self.open_seconds:
+                    return None
+                self._half_open_period += 1
+                self._transition(BreakerState.HALF_OPEN, f"probing after {self.open_seconds:g}s open")
+            if self.state == BreakerState.HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    return None
+                self._probes += 1
+                return Permit(probe=self._half_open_period)
+            return Permit()
+
+    def record_success(self, seconds: float, permit: Optional[Permit] = None) -> None:
+        self._record(seconds, True, None, permit)
+
+    def record_failure(self, seconds: float, error: Optional[str] = None, permit: Optional[Permit] = None) -> None:
+        self._record(seconds, False, error, permit)
+
+    def release(self, permit: Optional[Permit] = None) -> None:
+        """Give back a permit whose call was abandoned, without judging the service
+
+        A half-open probe's slot is freed for the next call.
+        """
+        with self._lock:
+            if self.state == BreakerState.HALF_OPEN and permit is not None and permit.probe == self._half_open_period:
+                self._probes = max(0, self._probes - 1)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            calls = self._window()
+            return {
+                "state": self.state.value,
+                "calls": len(calls),
+                "error_rate": self._error_rate(calls),
+                "p95_seconds": percentile([call.seconds for call in calls], 0.95),
+                "transitions": list(self.transitions),
+            }
+
+    def _record(self, seconds: float, ok: bool, error: Optional[str], permit: Optional[Permit]) -> None:
+        with self._lock:
+            now = self.clock()
+            if self.state == BreakerState.HALF_OPEN:
+                if permit is None or permit.probe != self._half_open_period:
+                    return  # admitted before this probing period; not its probe
+                self._probes = max(0, self._probes - 1)
+                if ok and seconds <= self.p95_seconds:
+                    self._calls.clear()
+                    self._transition(BreakerState.CLOSED, f"probe succeeded in {seconds:.2f}s")
+                else:
+                    self._open(now, f"probe failed: {error}" if not ok else f"probe took {seconds:.2f}s")
+                return
+            self._calls.append(CallRecord(now, seconds, ok))
+            if self.state != BreakerState.CLOSED:
+                return
+            calls = self._window()
+            if len(calls) < self.min_calls:
+                return
+            rate = self._error_rate(calls)
+            p95 = percentile([call.seconds for call in calls], 0.95)
+            if rate >= self.error_rate:
+                self._open(now, f"error rate {rate:.0%} over {len(calls)} calls")
+            elif p95 >= self.p95_seconds:
+                self._open(now, f"p95 latency {p95:.2f}s over {len(calls)} calls")
+
+    def _window(self) -> List[CallRecord]:
+        cutoff = self.clock() - self.window_seconds
+        while self._calls and self._calls[0].at < cutoff:
+            self._calls.popleft()
+        return list(self._calls)
+
+    @staticmethod
+    def _error_rate(calls: List[CallRecord]) -> float:
+        return sum(not call.ok for call in calls) / len(calls) if calls else 0.0
+
+    def _open(self, now: float, reason: str) -> None:
+        self.opened_at = now
+        self._transition(BreakerState.OPEN, reason)
+
+    def _transition(self, state: BreakerState, reason: str) -> None:
+        previous, self.state = self.state, state
+        if state != BreakerState.HALF_OPEN:
+            self._probes = 0
+        self.transitions.append({
+            "at": time.time(),
+            "from": previous.value,
+            "to": state.value,
+            "reason": reason,
+        })
+        logger.warning(f"Circuit breaker '{self.name}' {previous.value} -> {state.value}: {reason}")
@@ -0,0 +1,150 @@
+"""Latency-aware selection across several Letta endpoints
+
+Self-hosted replicas and Letta Cloud can serve the same agents. Every
+stream reports how long its endpoint took to the first event (passive
+measurement), and the warm-up thread probes every endpoint's health route
+(active measurement). New streams try the endpoints fastest first, skipping
+unhealthy ones, and fail over to the next one if an endpoint errors before
+its first event.
+
+Ranking uses an exponentially weighted moving average of time to first
+event. Samples expire after ``sample_ttl`` seconds: an endpoint that lost
+its traffic because it was slow is then tried again rather than being
+judged on stale numbers forever. An endpoint without live samples ranks by
+its probe latency, which is far below any time to first event, so it is
+tried next and measured properly.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class EndpointStats:
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.failures = 0  # consecutive
+        self.latency: Optional[float] = None  # EWMA of time to first event
+        self.latency_at: Optional[float] = None
+        self.probe_latency: Optional[float] = None
+        self.last_probe: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.streams = 0
+        self.stream_failures = 0
+
+
+class EndpointPool:
+    """Health and latency of a fixed list of endpoints, best first"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        alpha: float = 0.3,
+        failure_threshold: int = 2,
+        sample_ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if not urls:
+            raise ValueError("At least one endpoint is required")
+        self.urls = urls
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.sample_ttl = sample_ttl
+        self.clock = clock
+        self.stats: Dict[str, EndpointStats] = {url: EndpointStats(url) for url in urls}
+        self._lock = threading.Lock()
+
+    def ranked(self) -> List[str]:
+        """Endpoints to try, in order: healthy ones fastest first, then the rest
+
+        Unhealthy endpoints stay at the end so a stream is still attempted
+        when every endpoint has been failing.
+        """
+        with self._lock:
+            now = self.clock()
+            return sorted(
+                self.urls,
+                key=lambda url: (not self.stats[url].healthy, self._score(self.stats[url], now), self.urls.index(url))
+            )
+
+    def record_success(self, url: str, seconds: float) -> None:
+        """A stream from ``url`` produced its first event after ``seconds``"""
+        with self._lock:
+            stats = self.stats.get(url)
+            if stats is None:
+                return
+            now = self.clock()
+            stats.streams += 1
+            if stats.latency is None or now - stats.latency_at > self.sample_ttl:
+                stats.latency = seconds
+            else:
+                stats.latency += self.alpha * (seconds - stats.latency)
+            stats.latency_at = now
+            self._mark_up(stats)
+
+    def record_failure(self, url: str, error: str) -> None:
+        """A stream from ``url`` failed before its first event"""
+        with self._lock:
+            stats = self.stats.get(url)
+            if stats is None:
+                return
+            stats.streams += 1
+            stats.stream_failures += 1
+            self._mark_down(stats, error)
+
+    def record_probe(self, url: str, seconds: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            stats = self.stats.get(url)
+            if stats is None:
+                return
+            stats.last_probe = self.clock()
+            if error is not None:
+                self._mark_down(stats, error)
+                return
+            stats.probe_latency = (
+                seconds if stats.probe_latency is None
+                else stats.probe_latency + self.alpha * (seconds - stats.probe_latency)
+            )
+            self._mark_up(stats)
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        order = self.ranked()
+        with self._lock:
+            return [
+                {
+                    "url": url,
+                    "healthy": self.stats[url].healthy,
+                    "latency_seconds": _rounded(self.stats[url].latency),
+                    "probe_latency_seconds": _rounded(self.stats[url].probe_latency),
+                    "streams": self.stats[url].streams,
+                    "stream_failures": self.stats[url].stream_failures,
+                    "last_error": self.stats[url].last_error,
+                }
+                for url in order
+            ]
+
+    def _score(self, stats: EndpointStats, now: float) -> float:
+        if stats.latency is not None and now - stats.latency_at <= self.sample_ttl:
+            return stats.latency
+        return stats.probe_latency or 0.0
+
+    def _mark_up(self, stats: EndpointStats) -> None:
+        stats.failures = 0
+        stats.healthy = True
+        stats.last_error = None
+
+    def _mark_down(self, stats: EndpointStats, error: str) -> None:
+        stats.failures += 1
+        stats.last_error = error
+        if stats.failures >= self.failure_threshold:
+            stats.healthy = False
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def parse_endpoints(spec: str, default_url: str) -> List[str]:
+    """Endpoint URLs from a comma-separated list, or just ``default_url``"""
+    urls = [url.strip().rstrip("/") for url in spec.split(",") if url.strip()]
+    return list(dict.fromkeys(urls)) or [default_url.rstrip("/")]
@@ -0,0 +1,387 @@
+"""Background evaluation of finished interviews
+
+A job holds the candidate's technical answers. Workers grade them, write
+a summary and an overall score, and finalize the candidate record. Jobs
+live in a Mongo collection and every graded answer is written as soon as
+it is known, so the job document is always the full progress report.
+
+Grading runs on Letta agents, which are stateful: a message sent to an
+agent lands in its conversation, so two calls to one agent at the same
+time, or one after the other without a reset, see each other's answers.
+AgentPool therefore hands each grading or summary call an agent of its
+own and resets that agent's messages before handing it out again. The
+number of calls in flight is the number of evaluation agents.
+
+Restart safety comes from leases rather than in-memory state. A worker
+claims a job by setting ``lease_owner`` and ``lease_until`` and renews the
+lease with every write. Writes only apply while the worker still holds an
+unexpired lease; a worker that has lost its job stops. A sweeper re-queues
+queued jobs and running jobs whose lease has expired, so after a crash or
+restart a job resumes from its first ungraded answer, in this process or
+in any other.
+"""
+import asyncio
+import json
+import logging
+import re
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+
+PENDING = "pending"
+GRADED = "graded"
+FAILED = "failed"
+
+# grade(question, answer, candidate) -> (score out of 10, feedback)
+Grader = Callable[[str, str, Dict[str, Any]], Awaitable[Tuple[float, str]]]
+# summarize(job) -> summary text
+Summarizer = Callable[[Dict[str, Any]], Awaitable[str]]
+# finalize(job) -> candidate id the results were stored on, if any
+Finalizer = Callable[[Dict[str, Any]], Awaitable[Optional[str]]]
+
+
+class LeaseLost(RuntimeError):
+    """The job's lease expired or was taken over by another worker"""
+
+
+GRADE_PROMPT = """Grade this answer from a technical screening interview. The candidate has {years} years of experience.
+
+Question: {question}
+Answer: {answer}
+
+Reply with only a JSON object: {{"score": <0 to 10>, "feedback": "<one sentence>"}}"""
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def new_job(
+    session_id: str,
+    answers: List[Dict[str, str]],
+    candidate: Optional[Dict[str, Any]] = None,
+    candidate_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Job document for ``answers`` ([{"question", "answer"}, ...])"""
+    now = utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "candidate_id": candidate_id,
+        "candidate": candidate or {},
+        "status": QUEUED,
+        "answers": [
+            {
+                "question": item["question"],
+                "answer": item["answer"],
+                "status": PENDING,
+                "score": None,
+                "feedback": None,
+                "attempts": 0,
+                "error": None,
+            }
+            for item in answers
+        ],
+        "summary": None,
+        "overall_score": None,
+        "lease_owner": None,
+        "lease_until": None,
+        "created_at": now,
+        "updated_at": now,
+        "completed_at": None,
+    }
+
+
+def job_progress(job: Dict[str, Any]) -> Dict[str, int]:
+    answers = job.get("answers", [])
+    return {
+        "total": len(answers),
+        "graded": sum(answer["status"] == GRADED for answer in answers),
+        "failed": sum(answer["status"] == FAILED for answer in answers),
+    }
+
+
+def overall_score(job: Dict[str, Any]) -> Optional[float]:
+    scores = [answer["score"] for answer in job["answers"] if answer["status"] == GRADED]
+    return round(sum(scores) / len(scores), 2) if scores else None
+
+
+def grade_prompt(question: str, answer: str, candidate: Dict[str, Any]) -> str:
+    years = candidate.get("years_experience", "an unknown number of")
+    return GRADE_PROMPT.format(years=years, question=question, answer=answer)
+
+
+def parse_grade(reply: str) -> Tuple[float, str]:
+    """(score clamped to 0-10, feedback) from the grader's JSON reply"""
+    match = re.search(r"\{.*\}", reply, re.DOTALL)
+    if match is None:
+        raise ValueError(f"No JSON object in grade reply: {reply[:80]!r}")
+    data = json.loads(match.group())
+    return min(10.0, max(0.0, float(data["score"]))), str(data.get("feedback", ""))
+
+
+async def agent_reply(service, message: str, agent_id: str) -> str:
+    """Whole assistant reply of one non-interview turn with ``agent_id``
+
+    ``service`` is a LettaService; error events are raised so the caller
+    can retry. Turns to agents other than the interview agents do not go
+    through its circuit breaker.
+    """
+    parts = {}
+    async for event in service.send_message_stream_async(message, agent_id=agent_id):
+        if event.get("type") == "error":
+            raise RuntimeError(event.get("content", "agent error"))
+        if event.get("type") == "assistant":
+            parts[event.get("message_id", "default")] = event.get("content", "")
+    reply = " ".join(parts.values()).strip()
+    if not reply:
+        raise RuntimeError("The evaluation agent sent an empty reply")
+    return reply
+
+
+class AgentPool:
+    """Exclusive use of evaluation agents, one call per agent at a time
+
+    ``reset(agent_id)`` is awaited after every use so the next call starts
+    from an empty conversation; an agent whose reset fails is still
+    returned to the pool.
+    """
+
+    def __init__(self, agent_ids: List[str], reset: Optional[Callable[[str], Awaitable[None]]] = None):
+        if not agent_ids:
+            raise ValueError("AgentPool needs at least one agent")
+        self.agent_ids = list(agent_ids)
+        self.reset = reset
+        self._idle: Optional[asyncio.Queue] = None
+
+    def __len__(self) -> int:
+        return len(self.agent_ids)
+
+    @asynccontextmanager
+    async def use(self) -> AsyncIterator[str]:
+        if self._idle is None:
+            # Created on first use so it belongs to the running event loop
+            self._idle = asyncio.Queue()
+            for agent_id in self.agent_ids:
+                self._idle.put_nowait(agent_id)
+        agent_id = await self._idle.get()
+        try:
+            yield agent_id
+        finally:
+            try:
+                if self.reset is not None:
+                    await self.reset(agent_id)
+            except Exception as e:
+                logger.error(f"Resetting evaluation agent {agent_id} failed: {e}")
+            finally:
+                self._idle.put_nowait(agent_id)
+
+
+async def grade_with_retries(
+    grade: Grader,
+    answer: Dict[str, Any],
+    candidate: Dict[str, Any],
+    max_attempts: int,
+    on_attempt: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+) -> None:
+    """Grade one pending answer dict in place, up to ``max_attempts`` tries
+
+    The answer ends GRADED, or FAILED with the last error.
+    ``on_attempt`` is awaited after every try.
+    """
+    while answer["status"] == PENDING:
+        answer["attempts"] += 1
+        try:
+            answer["score"], answer["feedback"] = await grade(answer["question"], answer["answer"], candidate)
+            answer["status"] = GRADED
+            answer["error"] = None
+        except Exception as e:
+            answer["error"] = str(e)
+            if answer["attempts"] >= max_attempts:
+                answer["status"] = FAILED
+        if on_attempt is not None:
+            await on_attempt(answer)
+
+
+class EvaluationPipeline:
+    """Worker pool over a Mongo job collection
+
+    ``workers`` jobs run at once; across all of them at most
+    ``concurrency`` grading calls are in flight. The grader must make each
+    call independent of the others (see AgentPool), so ``concurrency``
+    should not exceed the number of evaluation agents.
+    """
+
+    def __init__(
+        self,
+        collection,
+        grade: Grader,
+        summarize: Summarizer,
+        finalize: Finalizer,
+        workers: int = 2,
+        concurrency: int = 4,
+        max_attempts: int = 3,
+        lease_seconds: float = 300.0,
+        sweep_seconds: float = 30.0
+    ):
+        self.collection = collection
+        self.grade = grade
+        self.summarize = summarize
+        self.finalize = finalize
+        self.workers = workers
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.sweep_seconds = sweep_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> int:
+        """Start the workers and the sweeper; returns how many jobs were resumed"""
+        self._queue = asyncio.Queue()
+        resumed = await self.sweep()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.sweep_seconds > 0:
+            self._tasks.append(asyncio.create_task(self._sweep_loop()))
+        return resumed
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        await self.collection.insert_one(dict(job))
+        self._enqueue(job["id"])
+        return job
+
+    async def sweep(self) -> int:
+        """Queue every job that is waiting or whose worker has gone away"""
+        now = utcnow()
+        cursor = self.collection.find(
+            {"$or": [
+                {"status": QUEUED},
+                {"status": RUNNING, "lease_until": {"$lt": now}},
+            ]},
+            {"_id": 0, "id": 1}
+        )
+        count = 0
+        async for doc in cursor:
+            count += self._enqueue(doc["id"])
+        return count
+
+    async def run(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Process one job to completion, or None if another worker holds it"""
+        job = await self._claim(job_id)
+        if job is None:
+            return None
+        pending = [n for n, answer in enumerate(job["answers"]) if answer["status"] == PENDING]
+        grading = [asyncio.ensure_future(self._grade(job, n)) for n in pending]
+        try:
+            await asyncio.gather(*grading)
+        except BaseException:
+            # A lost lease (or shutdown) stops the job's other grading calls too
+            for task in grading:
+                task.cancel()
+            await asyncio.gather(*grading, return_exceptions=True)
+            raise
+
+        if job["summary"] is None:
+            job["summary"] = await self.summarize(job)
+            await self._save(job, {"summary": job["summary"]})
+        job["overall_score"] = overall_score(job)
+        job["candidate_id"] = await self.finalize(job) or job.get("candidate_id")
+        job["status"] = COMPLETED
+        job["completed_at"] = utcnow()
+        await self._save(job, {
+            "overall_score": job["overall_score"],
+            "candidate_id": job["candidate_id"],
+            "status": COMPLETED,
+            "completed_at": job["completed_at"],
+            "lease_owner": None,
+            "lease_until": None,
+        })
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self.run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except LeaseLost as e:
+                logger.warning(f"Evaluation job {job_id} stopped: {e}")
+            except Exception as e:
+                # The lease runs out and the sweeper retries the job
+                logger.error(f"Evaluation job {job_id} failed: {e}")
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Evaluation sweep failed: {e}")
+
+    def _enqueue(self, job_id: str) -> bool:
+        if self._queue is None or job_id in self._queued:
+            return False
+        self._queued.add(job_id)
+        self._queue.put_nowait(job_id)
+        return True
+
+    async def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        now = utcnow()
+        job = await self.collection.find_one_and_update(
+            {
+                "id": job_id,
+                "$or": [
+                    {"status": QUEUED},
+                    {"status": RUNNING, "lease_until": {"$lt": now}},
+                ],
+            },
+            {"$set": {
+                "status": RUNNING,
+                "lease_owner": uuid.uuid4().hex,
+                "lease_until": self._lease(),
+                "updated_at": now,
+            }},
+            return_document=True
+        )
+        if job is not None:
+            job.pop("_id", None)
+        return job
+
+    async def _grade(self, job: Dict[str, Any], n: int) -> None:
+        async def save(answer):
+            # Persist every attempt so a restart never repeats finished work
+            await self._save(job, {f"answers.{n}": answer})
+
+        async with self._slots:
+            await grade_with_retries(self.grade, job["answers"][n], job["candidate"], self.max_attempts, save)
+
+    async def _save(self, job: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        """Write ``fields`` and renew the lease; raises LeaseLost if it is no longer held"""
+        now = utcnow()
+        fields = {"lease_until": self._lease(), **fields, "updated_at": now}
+        result = await self.collection.update_one(
+            {"id": job["id"], "lease_owner": job["lease_owner"], "lease_until": {"$gte": now}},
+            {"$set": fields}
+        )
+        if result.matched_count == 0:
+            raise LeaseLost(f"lease {job['lease_owner']} on job {job['id']} is no longer held")
+
+    def _lease(self) -> datetime:
+        return utcnow() + timedelta(seconds=self.lease_seconds)
@@ -0,0 +1,102 @@
+"""Cache of the agent's opening turn for new interviews
+
+Every interview opens with the same kind of greeting and first question, so
+the opening assistant message is generated once per agent and agent
+configuration version and then rendered instantly for new sessions. It is
+written by a scratch agent, so the shared interview agent's history holds
+only real turns (see LettaService.generate_opening). The warm-up thread
+keeps it fresh (see LettaService.start_warmup); a session never waits on
+generation.
+
+The cache also keeps the two numbers needed to compare turn one before and
+after: the TTFT the generation paid (what every session used to wait) and
+the time taken to serve the cached opening.
+"""
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+OpeningKey = Tuple[str, str]  # (agent id, agent configuration version)
+
+
+class Opening(NamedTuple):
+    text: str
+    generated_at: float
+    ttft_seconds: float
+
+
+class FirstTurnCache:
+    """Openings keyed by (agent id, config version), refreshed after ``ttl_seconds``
+
+    ``generate`` is called with a key and returns (text, ttft_seconds), or
+    None when the agent could not produce an opening.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[OpeningKey], Optional[Tuple[str, float]]],
+        ttl_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.generate = generate
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: Dict[OpeningKey, Opening] = {}
+        self._lock = threading.Lock()
+        self.generated = 0
+        self.generated_ttft_seconds = 0.0
+        self.served = 0
+        self.served_seconds = 0.0
+        self.misses = 0
+
+    def get(self, key: OpeningKey) -> Optional[str]:
+        """Cached opening for ``key`` (possibly stale), never generating"""
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.served += 1
+            self.served_seconds += time.perf_counter() - started
+            return entry.text
+
+    def is_fresh(self, key: OpeningKey) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self.clock() - entry.generated_at < self.ttl_seconds
+
+    def ensure(self, key: OpeningKey) -> bool:
+        """Generate the opening for ``key`` unless a fresh one is cached
+
+        Entries for other versions of the same agent are dropped once the
+        new one exists. Returns whether a fresh opening is now cached.
+        """
+        if self.is_fresh(key):
+            return True
+        result = self.generate(key)
+        if result is None:
+            return False
+        text, ttft = result
+        with self._lock:
+            for stale in [other for other in self._entries if other[0] == key[0] and other != key]:
+                del self._entries[stale]
+            self._entries[key] = Opening(text, self.clock(), ttft)
+            self.generated += 1
+            self.generated_ttft_seconds += ttft
+        return True
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "generated": self.generated,
+                "served": self.served,
+                "misses": self.misses,
+                "turn_one_ttft_uncached_seconds": (
+                    self.generated_ttft_seconds / self.generated if self.generated else None
+                ),
+                "turn_one_ttft_cached_seconds": (
+                    self.served_seconds / self.served if self.served else None
+                ),
+            }
@@ -0,0 +1,208 @@
+"""Incremental sync of Letta agent message history into Mongo
+
+The agent's history on the Letta server is the authoritative transcript.
+HistorySyncer copies it into a local collection so history can be restored
+without re-downloading whole conversations, and so transcripts survive
+the browser's IndexedDB being cleared.
+
+Letta lists an agent's messages with ``before``/``after`` message-id
+cursors and returns the most recent ``limit`` messages in that range. A
+sync walks backwards from the newest message, page by page, down to the
+cursor stored by the previous sync. The first sync therefore fetches the
+whole history and later ones only what is newer than the cursor. The walk
+position is checkpointed after every page, so an interrupted sync resumes
+where it stopped rather than starting over.
+
+Syncs for many agents run concurrently; every list call goes through a
+shared rate limiter so a large sync does not crowd out live turns.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+# Message types kept when history is restored as a chat
+CHAT_ROLES = {"user_message": "user", "assistant_message": "assistant"}
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` acquisitions per second on average, ``burst`` at once"""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.waited = 0.0  # seconds callers spent waiting for a token
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+
+def message_text(message: Any) -> str:
+    """Readable text of a Letta message (content parts are joined)"""
+    content = getattr(message, "content", None)
+    if isinstance(content, list):
+        content = "\n".join(
+            part.get("text", "") if isinstance(part, dict) else getattr(part, "text", "") or ""
+            for part in content
+        )
+    return content or getattr(message, "reasoning", None) or ""
+
+
+def message_doc(agent_id: str, message: Any) -> Dict[str, Any]:
+    """Stored form of one Letta message, with the full payload under ``raw``
+
+    Letta splits one stored message into several typed messages (reasoning,
+    assistant text, tool call) sharing an id, so documents are unique by
+    agent, id and message type.
+    """
+    raw = message.model_dump(mode="json") if hasattr(message, "model_dump") else dict(vars(message))
+    date = getattr(message, "date", None)
+    if isinstance(date, datetime) and date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return {
+        "agent_id": agent_id,
+        "id": message.id,
+        "message_type": getattr(message, "message_type", None),
+        "date": date,
+        "run_id": getattr(message, "run_id", None),
+        "text": message_text(message),
+        "raw": raw,
+    }
+
+
+def chronological(page: List[Any]) -> List[Any]:
+    """A page oldest first, whichever order the server returned it in"""
+    dates = [getattr(message, "date", None) for message in page]
+    if all(isinstance(date, datetime) for date in dates):
+        return sorted(page, key=lambda message: message.date)
+    return list(page)
+
+
+class HistorySyncer:
+    """Pulls agents' message history into ``messages``, tracking cursors in ``cursors``"""
+
+    def __init__(
+        self,
+        messages,
+        cursors,
+        page_size: int = 100,
+        concurrency: int = 4,
+        rate: float = 5.0,
+        burst: int = 5
+    ):
+        self.messages = messages
+        self.cursors = cursors
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst)
+        self._agent_locks: Dict[str, asyncio.Lock] = {}
+
+    async def sync_all(self, client: Any, agent_ids: List[str]) -> Dict[str, Any]:
+        """Sync several agents at once; failures are reported per agent"""
+        slots = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+
+        async def run(agent_id: str) -> Dict[str, Any]:
+            async with slots:
+                try:
+                    return await self.sync_agent(client, agent_id)
+                except Exception as e:
+                    logger.error(f"History sync failed for agent {agent_id}: {e}")
+                    return {"agent_id": agent_id, "error": str(e)}
+
+        results = await asyncio.gather(*(run(agent_id) for agent_id in dict.fromkeys(agent_ids)))
+        return {
+            "agents": len(results),
+            "failed": sum(1 for result in results if "error" in result),
+            "messages": sum(result.get("messages", 0) for result in results),
+            "pages": sum(result.get("pages", 0) for result in results),
+            "seconds": round(time.perf_counter() - started, 3),
+            "rate_limited_seconds": round(self.limiter.waited, 3),
+            "results": results,
+        }
+
+    async def sync_agent(self, client: Any, agent_id: str) -> Dict[str, Any]:
+        """Fetch and store the agent's messages newer than its stored cursor"""
+        lock = self._agent_locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            state = await self.cursors.find_one({"agent_id": agent_id}, {"_id": 0}) or {}
+            cursor = state.get("cursor")
+            newest = state.get("pending_cursor")  # set while a walk is unfinished
+            before = state.get("walk_before")
+            fetched = pages = 0
+            while True:
+                await self.limiter.acquire()
+                page = await client.agents.messages.list(
+                    agent_id, after=cursor, before=before, limit=self.page_size
+                )
+                pages += 1
+                # The walk is done at a short page or once it reaches the cursor
+                done = len(page) < self.page_size or any(message.id == cursor for message in page)
+                page = chronological([message for message in page if message.id != cursor])
+                if not page:
+                    break
+                fetched += await self._store([message_doc(agent_id, message) for message in page])
+                newest = newest or page[-1].id
+                before = page[0].id
+                if done:
+                    break
+                await self._save(agent_id, {"pending_cursor": newest, "walk_before": before})
+            await self._save(agent_id, {
+                "cursor": newest or cursor,
+                "pending_cursor": None,
+                "walk_before": None,
+                "synced_at": datetime.now(timezone.utc),
+            }, inc=fetched)
+            return {"agent_id": agent_id, "messages": fetched, "pages": pages, "cursor": newest or cursor}
+
+    async def _store(self, docs: List[Dict[str, Any]]) -> int:
+        """Insert a page; messages already stored (a re-read page) are skipped"""
+        try:
+            result = await self.messages.insert_many(docs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+            return e.details.get("nInserted", 0)
+
+    async def _save(self, agent_id: str, fields: Dict[str, Any], inc: int = 0) -> None:
+        update: Dict[str, Any] = {"$set": fields}
+        if inc:
+            update["$inc"] = {"messages": inc}
+        await self.cursors.update_one({"agent_id": agent_id}, update, upsert=True)
+
+
+async def load_history(messages, agent_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Stored chat turns of an agent, oldest first, as {"role", "content", "date"}"""
+    query = {"agent_id": agent_id, "message_type": {"$in": list(CHAT_ROLES)}}
+    cursor = messages.find(query, {"_id": 0, "message_type": 1, "text": 1, "date": 1}).sort("date", -1)
+    if limit:
+        cursor = cursor.limit(limit)
+    docs = await cursor.to_list(None)
+    return [
+        {"role": CHAT_ROLES[doc["message_type"]], "content": doc["text"], "date": doc["date"]}
+        for doc in reversed(docs)
+    ]
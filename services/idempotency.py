@@ -0,0 +1,187 @@
+"""Idempotent submission of user messages
+
+A double Enter, a browser retry or a Streamlit rerun during a slow turn can
+deliver the same message twice. Each submission carries a client-generated
+idempotency key; the first one starts the agent turn and records its events
+in a Submission, and a duplicate with the same key attaches to that
+Submission instead of starting a second (billed) turn. It replays what was
+already produced and then follows the live events.
+
+Finished submissions are kept for ``ttl`` seconds so a late retry gets the
+recorded reply. Failed ones are dropped at once so a retry runs the turn
+again. Reusing a key for a different message is an error.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class IdempotencyConflict(ValueError):
+    """An idempotency key was reused for a different message"""
+
+
+def fingerprint(*parts: Optional[str]) -> str:
+    """Digest of what a submission sends, to tell retries from key reuse"""
+    return hashlib.sha1("\x1f".join(part or "" for part in parts).encode()).hexdigest()
+
+
+def turn_key(session_id: str, messages: List[Dict], prompt: str) -> str:
+    """Idempotency key for ``prompt`` as the next turn of a chat
+
+    Submissions of the same text before the agent has replied share a key;
+    once a reply is in the history the same text is a new turn.
+    """
+    replies = sum(1 for message in messages if message.get("role") == "assistant")
+    return fingerprint(session_id, str(replies), prompt)
+
+
+class Submission:
+    """Events of one submitted turn, shared by every attached consumer"""
+
+    def __init__(self, key: str, fingerprint: str, started_at: float):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.started_at = started_at
+        self.finished_at: Optional[float] = None
+        self.events: List[Any] = []
+        self.done = False
+        self.failed = False
+        self.error: Optional[BaseException] = None
+        self.duplicates = 0
+        self._changed = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def publish(self, event: Any) -> None:
+        with self._changed:
+            self.events.append(event)
+            self._notify()
+
+    def finish(self, failed: bool = False, error: Optional[BaseException] = None) -> None:
+        with self._changed:
+            self.done = True
+            self.failed = failed or error is not None
+            self.error = error
+            self._notify()
+
+    def follow(self) -> Iterator[Any]:
+        """Every event from the first, blocking for new ones until the turn ends
+
+        An exception that ended the turn is re-raised after its events.
+        """
+        index = 0
+        while True:
+            with self._changed:
+                while index == len(self.events) and not self.done:
+                    self._changed.wait()
+                batch, done = self.events[index:], self.done
+            index += len(batch)
+            yield from batch
+            if done and index == len(self.events):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    async def follow_async(self) -> AsyncIterator[Any]:
+        """Async variant of follow; publishers may run in any thread"""
+        index = 0
+        while True:
+            changed = asyncio.Event()
+            with self._changed:
+                batch, done = self.events[index:], self.done
+                if not batch and not done:
+                    self._waiters.append((asyncio.get_running_loop(), changed))
+            index += len(batch)
+            for event in batch:
+                yield event
+            if batch:
+                continue
+            if done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+    def _notify(self) -> None:
+        self._changed.notify_all()
+        for loop, changed in self._waiters:
+            loop.call_soon_threadsafe(changed.set)
+        self._waiters = []
+
+
+class SubmissionTable:
+    """In-flight and recently completed submissions by idempotency key"""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.started = 0
+        self.suppressed = 0
+        self._entries: "OrderedDict[str, Submission]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[Submission, bool]:
+        """The submission for ``key`` and whether the caller must run it
+
+        Raises IdempotencyConflict when the key belongs to another message.
+        """
+        with self._lock:
+            now = self.clock()
+            self._purge(now)
+            submission = self._entries.get(key)
+            if submission is not None:
+                if submission.fingerprint != fingerprint:
+                    raise IdempotencyConflict(f"Idempotency key {key!r} was used for a different message")
+                submission.duplicates += 1
+                self.suppressed += 1
+                return submission, False
+            submission = self._entries[key] = Submission(key, fingerprint, now)
+            self.started += 1
+            if len(self._entries) > self.max_entries:
+                self._evict_finished()
+            return submission, True
+
+    def finish(
+        self,
+        submission: Submission,
+        failed: bool = False,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """End a claimed submission; failed ones are forgotten so a retry runs again"""
+        with self._lock:
+            submission.finished_at = self.clock()
+            if (failed or error is not None) and self._entries.get(submission.key) is submission:
+                del self._entries[submission.key]
+        submission.finish(failed, error)
+
+    def release(self, submission: Submission) -> None:
+        """Give up a claim whose turn never started"""
+        self.finish(submission, failed=True)
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = sum(1 for submission in self._entries.values() if not submission.done)
+            return {
+                "in_flight": in_flight,
+                "completed": len(self._entries) - in_flight,
+                "started": self.started,
+                "suppressed_duplicates": self.suppressed,
+            }
+
+    def _purge(self, now: float) -> None:
+        expired = [
+            key for key, submission in self._entries.items()
+            if submission.finished_at is not None and now - submission.finished_at > self.ttl
+        ]
+        for key in expired:
+            del self._entries[key]
+
+    def _evict_finished(self) -> None:
+        # Oldest finished entry first; in-flight turns are never evicted
+        for key, submission in self._entries.items():
+            if submission.done:
+                del self._entries[key]
+                return
@@ -0,0 +1,312 @@
+"""Hybrid scripted/LLM interview engine
+
+The interview is driven by ConversationStage. Stages listed in
+``scripted_stages`` are run by a local state machine: it asks for each
+missing candidate field in turn (the questions of the original scripted
+flow), re-asks once when a reply cannot be read, and never calls the LLM.
+All other stages are handed to the agent, together with a note of what the
+record already holds and what the agent is expected to do next.
+
+With the default stages the greeting, the candidate details and the tech
+stack are collected locally, and only the technical questions and the
+conclusion reach the agent.
+
+While ``degraded`` is set (the agent is slow or unreachable) the details
+and tech stack are collected locally in every mode, and technical
+questions prefetched from the question bank are asked locally too. The
+answers are queued for the agent, which catches up when it is back.
+"""
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from utils.constants import ConversationStage, FIELD_QUESTIONS, InfoFields, REQUIRED_FIELDS
+from utils.extraction import FIELD_LABELS, CandidateRecord, expected_field, technical_answers
+from services.question_bank import Question, QuestionBank, QuestionSampler
+
+SCRIPTED_STAGES: FrozenSet[ConversationStage] = frozenset({
+    ConversationStage.GREETING,
+    ConversationStage.INFO_COLLECTION,
+    ConversationStage.TECH_STACK_DECLARATION,
+})
+
+# Settings value -> stages run locally
+INTERVIEW_MODES: Dict[str, FrozenSet[ConversationStage]] = {
+    "hybrid": SCRIPTED_STAGES,
+    "agent": frozenset(),
+}
+
+# Candidate answers to technical questions before the agent wraps up
+TECHNICAL_TURNS = 5
+
+# A field that still cannot be read after this many questions is left to the agent
+MAX_FIELD_ATTEMPTS = 2
+
+GREETING_REPLY = "Great! Let's get started with your screening interview."
+
+# Reply while the agent is unavailable and the answer is queued for it
+DEFERRED_REPLY = (
+    "Thank you, I've saved your answer. Our interviewer is taking a little longer than "
+    "usual to respond, so the next question may take a moment. Feel free to add anything "
+    "else in the meantime."
+)
+
+# Prefix of a banked technical question asked while the agent is unavailable
+BANKED_QUESTION_REPLY = "Thank you, I've saved your answer. Here is the next question:"
+
+# Instructions sent to the agent when the interview enters its stage
+STAGE_INSTRUCTIONS = {
+    ConversationStage.TECHNICAL_QUESTIONS: (
+        "The screening details have been collected. Ask the candidate technical questions "
+        "tailored to their tech stack and experience, one question per message."
+    ),
+    ConversationStage.CONCLUSION: (
+        "That was the candidate's last technical answer. Thank them, tell them the team "
+        "will review their profile and be in touch, and end the interview."
+    ),
+}
+
+# Used instead of the technical-questions instruction when the bank has questions
+PREFETCHED_INSTRUCTION = (
+    "The screening details have been collected. Ask the candidate these technical "
+    "questions, one per message and in this order, adapting the wording to their "
+    "previous answers:"
+)
+
+
+class EngineStep(NamedTuple):
+    stage: ConversationStage
+    reply: Optional[str] = None  # scripted answer; None hands the turn to the agent
+    context: Optional[str] = None  # note to send with the agent turn
+
+
+class InterviewEngine:
+    """Per-interview state machine over ConversationStage
+
+    ``handlers`` maps each scripted stage to a function taking the engine,
+    the user's message and the previous assistant message; it returns the
+    reply, or None after moving the interview to a stage run by the agent.
+    """
+
+    def __init__(
+        self,
+        scripted_stages: Iterable[ConversationStage] = SCRIPTED_STAGES,
+        technical_turns: int = TECHNICAL_TURNS,
+        record: Optional[CandidateRecord] = None,
+        question_bank: Optional[QuestionBank] = None
+    ):
+        self.scripted_stages = frozenset(scripted_stages)
+        self.technical_turns = technical_turns
+        self.record = record or CandidateRecord()
+        # Technical questions are taken from the bank when one is given
+        self.questions = QuestionSampler(question_bank) if question_bank else None
+        self.prefetched: List[Question] = []
+        self.stage = ConversationStage.GREETING
+        self.handlers: Dict[ConversationStage, Callable[["InterviewEngine", str, Optional[str]], Optional[str]]] = {
+            ConversationStage.GREETING: InterviewEngine._greet,
+            ConversationStage.INFO_COLLECTION: InterviewEngine._collect,
+            ConversationStage.TECH_STACK_DECLARATION: InterviewEngine._collect,
+        }
+        self.degraded = False  # agent unavailable; set by the caller before each turn
+        self.attempts: Dict[str, int] = {}
+        self.given_up: List[str] = []  # fields left for the agent to ask about
+        self.technical_answers = 0
+        self.local_turns = 0
+        self.agent_turns = 0
+        self._announced: Set[ConversationStage] = set()
+        # Agent turns held back while the agent was unavailable: (message, context)
+        self.queued: List[Tuple[str, Optional[str]]] = []
+
+    @classmethod
+    def from_messages(cls, messages: List[Dict], **kwargs) -> "InterviewEngine":
+        """Resume an interview from a restored chat history
+
+        The technical stage is also reached when technical questions were
+        answered after the tech stack question, even if some detail could
+        not be read from the transcript. There the answers already given
+        count towards ``technical_turns``, so a finished interview resumes
+        concluded.
+        """
+        engine = cls(record=CandidateRecord.from_messages(messages), **kwargs)
+        if any(message.get('role') == 'user' for message in messages):
+            engine.stage = engine._collection_stage()
+            answered = technical_answers(messages)
+            asked_stack = any(
+                message.get('role') == 'assistant' and expected_field(message.get('content')) == InfoFields.TECH_STACK
+                for message in messages
+            )
+            if asked_stack and answered:
+                engine.stage = ConversationStage.TECHNICAL_QUESTIONS
+            if engine.stage == ConversationStage.TECHNICAL_QUESTIONS:
+                engine._announced.add(engine.stage)
+                engine.technical_answers = len(answered)
+                if engine.technical_answers >= engine.technical_turns:
+                    engine.stage = ConversationStage.CONCLUSION
+                    engine._announced.add(engine.stage)
+        return engine
+
+    @property
+    def is_scripted(self) -> bool:
+        """Whether the next message is answered without the agent"""
+        if self.degraded:
+            if self.stage == ConversationStage.TECHNICAL_QUESTIONS:
+                return self.questions is not None
+            return self.stage in SCRIPTED_STAGES | self.scripted_stages and self.stage in self.handlers
+        return self.stage in self.scripted_stages and self.stage in self.handlers
+
+    def handle(self, text: str, question: Optional[str] = None) -> EngineStep:
+        """Advance the interview with one user message
+
+        ``question`` is the previous assistant message. The returned step
+        carries either the scripted reply or the context for the agent.
+        """
+        if self.is_scripted:
+            handler = self.handlers.get(self.stage, InterviewEngine._ask_banked)
+            reply = handler(self, text, question)
+            if reply is None and self.degraded and self.is_scripted:
+                # The details are complete; the technical questions start locally too
+                reply = self._ask_banked(text, None)
+            if reply is not None:
+                self.local_turns += 1
+                return EngineStep(self.stage, reply=reply)
+        else:
+            self._update_record(text, question)
+            self._advance()
+        context = self._agent_context()
+        self.agent_turns += 1
+        return EngineStep(self.stage, context=context)
+
+    def defer(self, text: str, context: Optional[str] = None) -> str:
+        """Queue an agent turn that could not be sent; returns the holding reply"""
+        self.queued.append((text, context))
+        return DEFERRED_REPLY
+
+    def take_queued(self, context: Optional[str] = None) -> Optional[str]:
+        """``context`` for the next agent turn, preceded by the queued turns
+
+        The queue is emptied; defer the turn again if it cannot be sent.
+        """
+        if not self.queued:
+            return context
+        notes = [note for _, note in self.queued if note]
+        notes.append(
+            "While you were unavailable the candidate sent these messages, in order:\n"
+            + "\n".join(f"- {text}" for text, _ in self.queued)
+        )
+        if context:
+            notes.append(context)
+        self.queued = []
+        return "\n\n".join(notes)
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "stage": self.stage.value,
+            "local_turns": self.local_turns,
+            "agent_turns": self.agent_turns,
+            "queued": len(self.queued),
+            "questions_prefetched": len(self.prefetched),
+            "fields_left_to_agent": list(self.given_up),
+        }
+
+    def _greet(self, text: str, question: Optional[str]) -> Optional[str]:
+        # The opening message may already volunteer some details
+        self.record.update(text)
+        reply = self._next_question(answering=None)
+        return None if reply is None else f"{GREETING_REPLY}\n\n{reply}"
+
+    def _collect(self, text: str, question: Optional[str]) -> Optional[str]:
+        answering = self._pending_field()
+        self.record.update(text, question)
+        return self._next_question(answering)
+
+    def _next_question(self, answering: Optional[str]) -> Optional[str]:
+        """Ask for the next missing field, moving the stage along with it"""
+        while True:
+            field = self._pending_field()
+            self.stage = self._stage_for(field)
+            if field is None:
+                return None
+            attempts = self.attempts.get(field, 0)
+            if attempts >= MAX_FIELD_ATTEMPTS:
+                self.given_up.append(field)
+                continue
+            self.attempts[field] = attempts + 1
+            if field == answering:
+                return f"Sorry, I couldn't quite catch that. Could you tell me your {FIELD_LABELS[field].lower()}?"
+            return FIELD_QUESTIONS[field]
+
+    def _ask_banked(self, text: str, question: Optional[str]) -> Optional[str]:
+        """Technical stage while degraded: queue the answer, ask the next banked question
+
+        Returns None once the interview reaches its conclusion, which is
+        left to the agent.
+        """
+        self._update_record(text, question)
+        self._advance()
+        if self.stage != ConversationStage.TECHNICAL_QUESTIONS:
+            return None
+        # Announces the stage on first use, which prefetches the questions
+        note = self._agent_context()
+        self.queued.append((f"{text} (answering: {question})" if question else text, note))
+        # The agent asks the prefetched questions in order, one per answer
+        if self.technical_answers < len(self.prefetched):
+            return f"{BANKED_QUESTION_REPLY}\n\n{self.prefetched[self.technical_answers].text}"
+        return DEFERRED_REPLY
+
+    def _update_record(self, text: str, question: Optional[str]) -> None:
+        """Read an agent-stage reply into the record
+
+        Once the details are collected, replies are technical answers: they
+        may add to the tech stack, but "2 years on that project" is not the
+        candidate's experience.
+        """
+        collected = self.stage in (ConversationStage.TECHNICAL_QUESTIONS, ConversationStage.CONCLUSION)
+        self.record.update(text, question, (InfoFields.TECH_STACK,) if collected else None)
+
+    def _pending_field(self) -> Optional[str]:
+        for field in REQUIRED_FIELDS:
+            if field not in self.record.fields and field not in self.given_up:
+                return field
+        return None
+
+    @staticmethod
+    def _stage_for(field: Optional[str]) -> ConversationStage:
+        if field is None:
+            return ConversationStage.TECHNICAL_QUESTIONS
+        if field == InfoFields.TECH_STACK:
+            return ConversationStage.TECH_STACK_DECLARATION
+        return ConversationStage.INFO_COLLECTION
+
+    def _collection_stage(self) -> ConversationStage:
+        return self._stage_for(self._pending_field())
+
+    def _advance(self) -> None:
+        """Stage changes while the agent is running the interview"""
+        if self.stage == ConversationStage.TECHNICAL_QUESTIONS:
+            if self.stage in self._announced:
+                self.technical_answers += 1
+                if self.technical_answers >= self.technical_turns:
+                    self.stage = ConversationStage.CONCLUSION
+        elif self.stage != ConversationStage.CONCLUSION:
+            # The agent collects the details itself; follow its progress
+            self.stage = self._collection_stage()
+
+    def _agent_context(self) -> Optional[str]:
+        # The agent did not see the scripted turns, so its first note
+        # repeats every known detail even if nothing changed since
+        notes = [self.record.pending_context(force=not self.agent_turns and self.local_turns > 0)]
+        if self.stage in STAGE_INSTRUCTIONS and self.stage not in self._announced:
+            self._announced.add(self.stage)
+            notes.append(self._stage_instruction())
+        notes = [note for note in notes if note]
+        return "\n\n".join(notes) if notes else None
+
+    def _stage_instruction(self) -> str:
+        if self.stage == ConversationStage.TECHNICAL_QUESTIONS and self.questions:
+            self.prefetched = self.questions.next(
+                self.record.fields.get(InfoFields.TECH_STACK, []),
+                self.record.fields.get(InfoFields.YEARS_EXPERIENCE),
+                self.technical_turns
+            )
+            if self.prefetched:
+                listed = "\n".join(f"{n}. {question.text}" for n, question in enumerate(self.prefetched, 1))
+                return f"{PREFETCHED_INSTRUCTION}\n{listed}"
+        return STAGE_INSTRUCTIONS[self.stage]
@@ -1,74 +1,561 @@
 """Service for interacting with Letta Agent with streaming support"""
-from letta_client import Letta
-from typing import Optional, Dict, List, Generator, Any
+from typing import Optional, Dict, List, Generator, AsyncGenerator, AsyncIterator, Any, Iterator, Tuple, Union, TYPE_CHECKING
+import asyncio
+import hashlib
 import os
+import threading
+import time
 from config.settings import settings
+from services.agent_router import AgentRouter, parse_variants
+from services.circuit_breaker import BreakerState, CircuitBreaker, Permit
+from services.endpoint_pool import EndpointPool, parse_endpoints
+from services.first_turn_cache import FirstTurnCache, OpeningKey
+from services.idempotency import Submission, SubmissionTable, fingerprint
+from services.message_coalescer import merge_parts
+from services.stream_turn import StreamTurn
 import logging
 
+if TYPE_CHECKING:
+    # letta_client takes most of the cold-start import budget, so it is only
+    # imported when a connection is actually built (see connect())
+    from letta_client import AsyncLetta, Letta
+
 logger = logging.getLogger(__name__)
 
+# Sent with the candidate's usual first message when generating the cached opening
+OPENING_MESSAGE = "Hello"
+OPENING_CONTEXT = (
+    "A new candidate has just joined the screening interview. Greet them, briefly "
+    "explain how the interview works, and ask your first question."
+)
+
+
+def agent_config_version(agent: Any) -> str:
+    """Short hash of the agent settings that shape its replies
+    
+    The system prompt, model and tools change what the opening turn looks
+    like; conversation-driven state (memory, timestamps) does not count.
+    """
+    llm_config = getattr(agent, 'llm_config', None)
+    tools = getattr(agent, 'tools', None) or []
+    parts = [
+        str(getattr(agent, 'system', '')),
+        str(getattr(llm_config, 'model', '')),
+        ",".join(sorted(str(getattr(tool, 'name', tool)) for tool in tools)),
+    ]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]
+
 class LettaService:
     """Service for interacting with Letta Agent with streaming capabilities"""
     
     def __init__(self):
         """Initialize Letta client"""
-        self.client: Optional[Letta] = None
+        self.client: Optional["Letta"] = None
+        self.async_client: Optional["AsyncLetta"] = None
+        # One client per endpoint; client/async_client are the first endpoint's
+        self.clients: Dict[str, "Letta"] = {}
+        self.async_clients: Dict[str, "AsyncLetta"] = {}
+        self.endpoints = EndpointPool(parse_endpoints(settings.letta_base_urls, settings.letta_base_url))
+        self._last_probe: Optional[float] = None
+        self.resume_stats = {"resumed": 0, "failed": 0}  # streams continued after a drop
         self.agent_id: str = settings.letta_agent_id
         self.is_connected: bool = False
+        
+        # Background warm-up state (see start_warmup)
+        self.agent_info: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+        self.last_refresh: Optional[float] = None
+        self._ready = threading.Event()
+        self._warmup_stop = threading.Event()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_lock = threading.Lock()
+        
+        # Trips on error rate or p95 time to first event; callers fall back
+        # to local handling while it is open (see is_degraded)
+        self.breaker = CircuitBreaker(
+            name="letta",
+            error_rate=settings.letta_breaker_error_rate,
+            p95_seconds=settings.letta_breaker_p95_seconds,
+            window_seconds=settings.letta_breaker_window_seconds,
+            min_calls=settings.letta_breaker_min_calls,
+            open_seconds=settings.letta_breaker_open_seconds
+        )
+        
+        # A/B variants: sessions are routed across agents (see assign_agent)
+        # and every turn is measured against the agent it went to
+        self.router = AgentRouter(
+            parse_variants(settings.letta_agent_variants, settings.letta_agent_id),
+            salt=settings.letta_variant_salt
+        )
+        
+        # Turns by idempotency key: a resubmitted message attaches to its
+        # running or recent turn instead of starting another
+        self.submissions = SubmissionTable(ttl=settings.letta_idempotency_ttl)
+        self._pumps: set = set()  # tasks running async submitted turns
+        
+        # Opening turn for new sessions, kept fresh by the warm-up thread
+        self.opening_cache = FirstTurnCache(self.generate_opening, ttl_seconds=settings.letta_opening_ttl)
+        self._cache_opening = False
     
     def connect(self) -> bool:
         """Connect to Letta API"""
         try:
-            self.client = Letta(
-                token=settings.letta_api_key,
-                base_url=settings.letta_base_url
-            )
+            from letta_client import AsyncLetta, Letta
+
+            for url in self.endpoints.urls:
+                self.clients[url] = Letta(token=settings.letta_api_key, base_url=url)
+                self.async_clients[url] = AsyncLetta(token=settings.letta_api_key, base_url=url)
+            self.client = self.clients[self.endpoints.urls[0]]
+            self.async_client = self.async_clients[self.endpoints.urls[0]]
             self.is_connected = True
-            logger.info(f"Connected to Letta API at {settings.letta_base_url}")
+            logger.info(f"Connected to Letta API at {', '.join(self.endpoints.urls)}")
             logger.info(f"Using agent ID: {self.agent_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Letta: {e}")
             self.is_connected = False
+            self.last_error = str(e)
+            return False
+    
+    def start_warmup(
+        self,
+        refresh_interval: float = 300.0,
+        retry_interval: float = 5.0,
+        cache_opening: bool = False
+    ) -> None:
+        """Start background connection warm-up (idempotent)
+        
+        Builds the client and fetches agent info off the request path, then
+        refreshes agent info every ``refresh_interval`` seconds. Until the
+        first success it retries every ``retry_interval`` seconds. With
+        ``cache_opening`` it also keeps the opening turn cached when an
+        opening agent is configured (see generate_opening).
+        """
+        self._cache_opening = self._cache_opening or (cache_opening and bool(settings.letta_opening_agent_id))
+        with self._warmup_lock:
+            if self._warmup_thread and self._warmup_thread.is_alive():
+                return
+            self._warmup_stop.clear()
+            self._warmup_thread = threading.Thread(
+                target=self._warmup_loop,
+                args=(refresh_interval, retry_interval),
+                name="letta-warmup",
+                daemon=True
+            )
+            self._warmup_thread.start()
+    
+    def stop_warmup(self, timeout: Optional[float] = None) -> None:
+        """Stop the background warm-up thread"""
+        self._warmup_stop.set()
+        thread = self._warmup_thread
+        if thread and thread.is_alive():
+            thread.join(timeout)
+    
+    def _warmup_loop(self, refresh_interval: float, retry_interval: float) -> None:
+        """Warm-up thread body: connect, fetch agent info, refresh periodically"""
+        while not self._warmup_stop.is_set():
+            self.refresh()
+            wait = refresh_interval if self._ready.is_set() else retry_interval
+            if len(self.clients) > 1:
+                self.probe_endpoints()
+                wait = min(wait, settings.letta_probe_interval)
+            if self.breaker.state != BreakerState.CLOSED:
+                # Probe for recovery instead of waiting for a candidate turn
+                self.probe()
+                wait = min(wait, retry_interval)
+            elif self._cache_opening and self._ready.is_set():
+                key = self.opening_key()
+                if key and not self.opening_cache.ensure(key):
+                    wait = min(wait, retry_interval)
+            self._warmup_stop.wait(wait)
+    
+    def refresh(self) -> bool:
+        """Connect if needed and refresh agent info
+        
+        A failed refresh keeps an already-ready connection ready; only the
+        error is recorded so a transient blip does not detach sessions.
+        """
+        if not self.is_connected and not self.connect():
+            return False
+        
+        info = self.get_agent_info()
+        if info is None:
+            return False
+        
+        self.agent_info = info
+        self.last_error = None
+        self.last_refresh = time.time()
+        self._ready.set()
+        return True
+    
+    def probe(self) -> Optional[bool]:
+        """Half-open health probe; None if the breaker is not admitting one"""
+        if not self.is_connected or self.breaker.state == BreakerState.CLOSED:
+            return None
+        permit = self.breaker.allow_request()
+        if not permit:
+            return None
+        started = time.perf_counter()
+        info = self.get_agent_info()
+        if info is None:
+            self.breaker.record_failure(time.perf_counter() - started, self.last_error, permit)
             return False
+        self.breaker.record_success(time.perf_counter() - started, permit)
+        return True
+    
+    def probe_endpoints(self) -> None:
+        """Active health check of every endpoint, at most once per probe interval"""
+        now = time.monotonic()
+        if self._last_probe is not None and now - self._last_probe < settings.letta_probe_interval:
+            return
+        self._last_probe = now
+        for url, client in list(self.clients.items()):
+            started = time.perf_counter()
+            try:
+                client.health.check(request_options={"timeout_in_seconds": settings.letta_probe_timeout})
+                self.endpoints.record_probe(url, time.perf_counter() - started)
+            except Exception as e:
+                logger.warning(f"Health probe of {url} failed: {e}")
+                self.endpoints.record_probe(url, time.perf_counter() - started, str(e))
+    
+    def opening_key(self) -> Optional[OpeningKey]:
+        """Cache key for the opening turn, once agent info is known"""
+        info = self.agent_info
+        if not info or not info.get("version"):
+            return None
+        return (self.agent_id, info["version"])
+    
+    def get_opening(self) -> Optional[str]:
+        """Cached opening assistant message for a new session, if any (no network calls)"""
+        key = self.opening_key()
+        return self.opening_cache.get(key) if key else None
+    
+    def generate_opening(self, key: Optional[OpeningKey] = None) -> Optional[Tuple[str, float]]:
+        """Have the opening agent write the opening turn; returns (text, TTFT seconds)
+        
+        The interview agent is stateful and shared, so the opening is written
+        by ``letta_opening_agent_id``, a scratch agent configured like it,
+        whose history is reset afterwards. It is not an interview agent, so
+        these turns stay out of the breaker and the router metrics. Without
+        one no opening is generated.
+        """
+        agent_id = settings.letta_opening_agent_id
+        if not agent_id:
+            return None
+        started = time.perf_counter()
+        ttft: Optional[float] = None
+        reasoning: Dict[str, str] = {}
+        parts: Dict[str, str] = {}
+        try:
+            for chunk in self.send_message_stream(
+                OPENING_MESSAGE, stream_tokens=True, context=OPENING_CONTEXT, agent_id=agent_id
+            ):
+                if chunk.get('type') == 'error':
+                    return None
+                if chunk.get('type') == 'reasoning':
+                    reasoning[chunk.get('message_id', 'default')] = chunk.get('content', '')
+                elif chunk.get('type') == 'assistant' and chunk.get('content'):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    parts[chunk.get('message_id', 'default')] = chunk['content']
+        finally:
+            self._reset_opening_agent(agent_id)
+        text = ' '.join(parts.values()).strip()
+        # Letta can repeat the reasoning at the start of the assistant text
+        thought = ' '.join(reasoning.values()).strip()
+        if thought and text.startswith(thought):
+            text = text[len(thought):].strip()
+        if not text:
+            return None
+        logger.info(f"Generated opening turn for {key} (TTFT {ttft:.2f}s)")
+        return text, ttft
+    
+    def _reset_opening_agent(self, agent_id: str) -> None:
+        """Drop the opening turn from the scratch agent's history"""
+        try:
+            self.client.agents.messages.reset(agent_id, add_default_initial_messages=False)
+        except Exception as e:
+            logger.warning(f"Failed to reset opening agent {agent_id}: {e}")
+    
+    def is_degraded(self) -> bool:
+        """True while the breaker refuses calls; use the local fallback"""
+        return not self.breaker.available()
+    
+    def is_ready(self) -> bool:
+        """Cheap readiness check: connected and agent info fetched"""
+        return self._ready.is_set()
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up has succeeded or ``timeout`` seconds elapse"""
+        return self._ready.wait(timeout)
     
-    def send_message_stream(self, message: str, stream_tokens: bool = True) -> Generator[Dict[str, Any], None, None]:
+    def get_status(self) -> Dict[str, Any]:
+        """Snapshot of connection readiness (no network calls)"""
+        thread = self._warmup_thread
+        return {
+            "ready": self._ready.is_set(),
+            "connected": self.is_connected,
+            "warming_up": bool(thread and thread.is_alive()) and not self._ready.is_set(),
+            "agent_info": self.agent_info,
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error,
+            "breaker": self.breaker.snapshot(),
+            "endpoints": self.endpoints.snapshot(),
+            "stream_resumes": dict(self.resume_stats),
+            "submissions": self.submissions.summary()
+        }
+    
+    def send_message_stream(
+        self,
+        message: Union[str, List[str]],
+        stream_tokens: bool = True,
+        context: Optional[str] = None,
+        opening: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Generator[Dict[str, Any], None, None]:
         """Send message to Letta agent and stream responses
         
         Args:
-            message: User message to send
+            message: User message to send, or the parts of a multi-part
+                user message (consecutive messages coalesced into one turn)
             stream_tokens: If True, use token streaming for real-time UX
+            context: Optional system note sent ahead of the message (e.g.
+                candidate details already captured locally)
+            opening: Cached opening the session was started with; sent
+                ahead of the first message so the agent's history matches
+                what the candidate saw
+            agent_id: Agent to send to, e.g. the session's A/B variant
+                (see assign_agent); defaults to the configured agent
+            idempotency_key: Client-generated key of this submission. A
+                duplicate of a running or recently finished turn replays
+                and follows that turn instead of starting a new one; the
+                turn then runs in its own thread so it survives the
+                consumer going away (e.g. a Streamlit rerun)
             
         Yields:
             Dict containing message chunks with type, content, and metadata
         """
+        if idempotency_key is not None:
+            submission, created = self._claim_submission(idempotency_key, message, agent_id)
+            if created:
+                turn = self.send_message_stream(message, stream_tokens, context, opening, agent_id)
+                threading.Thread(
+                    target=self._run_submission, args=(submission, turn), name="letta-submission", daemon=True
+                ).start()
+            yield from submission.follow()
+            return
+        
+        turn = self._begin_turn(message, context, opening, agent_id)
+        if turn is None:
+            yield self._degraded_event()
+            return
+        try:
+            # Endpoints fastest first; move on to the next one only while
+            # nothing has been streamed yet
+            for url, client in self._stream_targets(self.clients, self.client):
+                try:
+                    stream = turn.open(url, client, stream_tokens)
+                    # A drop after the first event resumes from where it
+                    # stopped instead of failing the turn
+                    while stream is not None:
+                        try:
+                            for chunk in stream:
+                                event = turn.process(chunk)
+                                if event:
+                                    yield event
+                            stream = None
+                        except Exception as e:
+                            delay = turn.dropped(e)
+                            if delay is None:
+                                raise
+                            time.sleep(delay)
+                            stream = turn.resumed_stream(client)
+                    turn.completed()
+                except Exception as e:
+                    if not turn.fail_over(e):
+                        raise
+                    continue
+                break
+            else:
+                raise turn.exhausted()
+        except GeneratorExit:
+            # The consumer stopped reading (e.g. a Streamlit rerun)
+            turn.cancelled = True
+            raise
+        except Exception as e:
+            yield turn.failed(e)
+        finally:
+            turn.record()
+    
+    async def send_message_stream_async(
+        self,
+        message: Union[str, List[str]],
+        stream_tokens: bool = True,
+        context: Optional[str] = None,
+        opening: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Async variant of send_message_stream for the FastAPI gateway
+        
+        Yields the same event dicts as send_message_stream, processed by the
+        same chunk handlers, without tying up a thread per stream.
+        ``agent_id`` sends the message to another agent than the
+        interviewer (e.g. the evaluation agent). A submitted turn
+        (``idempotency_key``) runs in its own task.
+        """
+        if idempotency_key is not None:
+            submission, created = self._claim_submission(idempotency_key, message, agent_id)
+            if created:
+                turn = self.send_message_stream_async(message, stream_tokens, context, opening, agent_id)
+                task = asyncio.create_task(self._run_submission_async(submission, turn))
+                self._pumps.add(task)
+                task.add_done_callback(self._pumps.discard)
+            async for event in submission.follow_async():
+                yield event
+            return
+        
+        turn = self._begin_turn(message, context, opening, agent_id)
+        if turn is None:
+            yield self._degraded_event()
+            return
+        try:
+            for url, client in self._stream_targets(self.async_clients, self.async_client):
+                try:
+                    stream = turn.open(url, client, stream_tokens)
+                    while stream is not None:
+                        try:
+                            async for chunk in stream:
+                                event = turn.process(chunk)
+                                if event:
+                                    yield event
+                            stream = None
+                        except Exception as e:
+                            delay = turn.dropped(e)
+                            if delay is None:
+                                raise
+                            await asyncio.sleep(delay)
+                            stream = turn.resumed_stream_async(client)
+                    turn.completed()
+                except Exception as e:
+                    if not turn.fail_over(e):
+                        raise
+                    continue
+                break
+            else:
+                raise turn.exhausted()
+        except (asyncio.CancelledError, GeneratorExit):
+            # A newer message cancelled the turn, or the consumer went away
+            turn.cancelled = True
+            raise
+        except Exception as e:
+            yield turn.failed(e)
+        finally:
+            turn.record()
+    
+    def _stream_targets(self, clients: Dict[str, Any], fallback: Any) -> List[Tuple[str, Any]]:
+        """(endpoint, client) pairs in the order a new stream should try them"""
+        if not clients:
+            return [(self.endpoints.urls[0], fallback)]
+        return [(url, clients[url]) for url in self.endpoints.ranked()]
+    
+    def _claim_submission(
+        self,
+        key: str,
+        message: Union[str, List[str]],
+        agent_id: Optional[str]
+    ) -> Tuple[Submission, bool]:
+        return self.submissions.claim(key, fingerprint(self._message_text(message), agent_id or self.agent_id))
+    
+    def _begin_turn(
+        self,
+        message: Union[str, List[str]],
+        context: Optional[str],
+        opening: Optional[str],
+        agent_id: Optional[str]
+    ) -> Optional[StreamTurn]:
+        """A new turn, or None if the breaker refuses it"""
         if not self.is_connected:
             raise ConnectionError("Letta client not connected. Call connect() first.")
-        
+        agent_id = agent_id or self.agent_id
+        # Only interview turns are gated by the breaker
+        permit = self.breaker.allow_request() if self.is_interview_agent(agent_id) else Permit()
+        if not permit:
+            return None
+        return StreamTurn(self, agent_id, self._build_messages(message, context, opening), permit)
+    
+    def _run_submission(self, submission: Submission, turn: Iterator[Dict[str, Any]]) -> None:
+        """Drive a submitted turn, recording its events for every consumer"""
         try:
-            # Create streaming request
-            stream = self.client.agents.messages.create_stream(
-                agent_id=self.agent_id,
-                messages=[{"role": "user", "content": message}],
-                stream_tokens=stream_tokens
-            )
-            
-            # Message accumulators for token streaming
-            message_accumulators = {}
-            
-            # Process stream
-            for chunk in stream:
-                processed_chunk = self._process_stream_chunk(chunk, message_accumulators)
-                if processed_chunk:
-                    yield processed_chunk
-                    
+            for event in turn:
+                submission.publish(event)
         except Exception as e:
-            logger.error(f"Error during streaming: {e}")
-            yield {
-                "type": "error",
-                "content": f"Error: {str(e)}",
-                "error": True
-            }
+            self.submissions.finish(submission, error=e)
+            return
+        self.submissions.finish(submission, failed=any(event.get("error") for event in submission.events))
+    
+    async def _run_submission_async(self, submission: Submission, turn: AsyncIterator[Dict[str, Any]]) -> None:
+        try:
+            async for event in turn:
+                submission.publish(event)
+        except Exception as e:
+            self.submissions.finish(submission, error=e)
+            return
+        self.submissions.finish(submission, failed=any(event.get("error") for event in submission.events))
+    
+    def assign_agent(self, session_id: str) -> str:
+        """Agent id of the session's A/B variant (sticky per session)"""
+        return self.router.assign(session_id).agent_id
+    
+    def is_interview_agent(self, agent_id: str) -> bool:
+        """Whether ``agent_id`` runs interviews (the configured agent or an A/B variant)
+        
+        Turns to other agents, e.g. the evaluation agent, are left out of the
+        breaker and the router metrics.
+        """
+        return agent_id == self.agent_id or agent_id in self.router.by_agent
+    
+    async def reset_messages_async(self, agent_id: str) -> None:
+        """Clear an agent's in-context message history (its memory blocks are kept)"""
+        if not self.is_connected:
+            raise ConnectionError("Letta client not connected. Call connect() first.")
+        await self.async_client.agents.messages.reset(agent_id, add_default_initial_messages=False)
+    
+    @staticmethod
+    def _background_option() -> Dict[str, Any]:
+        # Background runs can be replayed after a drop (see StreamTurn.resumed_stream)
+        return {"background": True} if settings.letta_background_streams else {}
+    
+    @staticmethod
+    def _degraded_event() -> Dict[str, Any]:
+        return {
+            "type": "error",
+            "content": "Error: the agent is temporarily unavailable",
+            "error": True,
+            "degraded": True
+        }
+    
+    @staticmethod
+    def _build_messages(
+        message: Union[str, List[str]],
+        context: Optional[str] = None,
+        opening: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        if isinstance(message, list):
+            content = [{"type": "text", "text": part} for part in message]
+        else:
+            content = message
+        messages = [{"role": "user", "content": content}]
+        if opening:
+            messages.insert(0, {"role": "assistant", "content": opening})
+        if context:
+            messages.insert(0, {"role": "system", "content": context})
+        return messages
+    
+    @staticmethod
+    def _message_text(message: Union[str, List[str]]) -> str:
+        return merge_parts(message) if isinstance(message, list) else message
     
     def _process_stream_chunk(self, chunk: Any, accumulators: Dict) -> Optional[Dict[str, Any]]:
         """Process individual stream chunk
@@ -200,16 +687,30 @@ class LettaService:
             return None
         
         try:
-            agent = self.client.agents.retrieve(self.agent_id)
+            agent = self._retrieve_agent()
             return {
                 "id": agent.id,
                 "name": getattr(agent, 'name', 'Unknown'),
                 "model": getattr(agent, 'llm_config', {}).model if hasattr(agent, 'llm_config') else 'Unknown',
-                "created_at": getattr(agent, 'created_at', 'Unknown')
+                "created_at": getattr(agent, 'created_at', 'Unknown'),
+                "version": agent_config_version(agent)
             }
         except Exception as e:
             logger.error(f"Error getting agent info: {e}")
+            self.last_error = str(e)
             return None
 
+    def _retrieve_agent(self) -> Any:
+        """Agent from the best endpoint that answers"""
+        error: Optional[Exception] = None
+        for url, client in self._stream_targets(self.clients, self.client):
+            started = time.perf_counter()
+            try:
+                return client.agents.retrieve(self.agent_id)
+            except Exception as e:
+                error = e
+                self.endpoints.record_probe(url, time.perf_counter() - started, str(e))
+        raise error
+
 # Global instance
 letta_service = LettaService()
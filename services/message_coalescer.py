@@ -0,0 +1,126 @@
+"""Coalescing of rapid consecutive user messages into one agent turn
+
+Candidates often answer in bursts ("Python", "also Go", "and Docker").
+Sent one by one, each message is a separate agent turn queued behind the
+previous one. MessageCoalescer holds a session's messages for a short
+window instead: messages arriving within ``window`` seconds of the last
+one, or while the session's previous turn is still running, are merged
+into a single multi-part user message. ``max_wait`` caps how long the
+first message of a burst can be held back.
+
+With ``cancel_running`` a new message cancels the session's running turn
+so the agent answers the whole burst at once rather than finishing a reply
+the candidate has already moved past. The cancelled turn's message has
+already reached the agent, so only the new messages make up the next turn.
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def merge_parts(parts: List[str]) -> str:
+    """Plain-text form of a multi-part user message"""
+    return "\n".join(parts)
+
+
+class PendingTurn:
+    """Messages collected for one upcoming agent turn"""
+
+    def __init__(self, started_at: float):
+        self.id = uuid.uuid4().hex
+        self.parts: List[str] = []
+        self.submissions: List[Any] = []  # idempotency submissions of the parts
+        self.first_at = started_at
+        self.last_at = started_at
+
+
+class _SessionState:
+    def __init__(self):
+        self.pending: Optional[PendingTurn] = None
+        self.running: Optional[asyncio.Task] = None
+        self.flusher: Optional[asyncio.Task] = None
+
+
+Dispatch = Callable[[str, PendingTurn], Awaitable[None]]
+
+
+class MessageCoalescer:
+    """Per-session coalescing window in front of the agent turn"""
+
+    def __init__(
+        self,
+        dispatch: Dispatch,
+        window: float = 1.0,
+        max_wait: float = 3.0,
+        cancel_running: bool = False,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.dispatch = dispatch
+        self.window = window
+        self.max_wait = max_wait
+        self.cancel_running = cancel_running
+        self.clock = clock
+        self.messages = 0
+        self.turns = 0
+        self.coalesced = 0  # messages merged into another message's turn
+        self.cancelled = 0
+        self._sessions: Dict[str, _SessionState] = {}
+
+    async def submit(self, session_id: str, text: str, submission: Any = None) -> PendingTurn:
+        """Queue ``text`` for the session's next turn and return that turn"""
+        state = self._sessions.setdefault(session_id, _SessionState())
+        now = self.clock()
+        pending = state.pending
+        if pending is None:
+            pending = state.pending = PendingTurn(now)
+        else:
+            self.coalesced += 1
+        pending.parts.append(text)
+        if submission is not None:
+            pending.submissions.append(submission)
+        pending.last_at = now
+        self.messages += 1
+
+        if self.cancel_running and state.running is not None and not state.running.done():
+            state.running.cancel()
+            self.cancelled += 1
+        if state.flusher is None:
+            state.flusher = asyncio.create_task(self._flush(session_id, state))
+        return pending
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "turns": self.turns,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "pending": sum(1 for state in self._sessions.values() if state.pending is not None),
+        }
+
+    async def _flush(self, session_id: str, state: _SessionState) -> None:
+        """Dispatch the pending turn once its window has closed and the session is idle"""
+        try:
+            while True:
+                pending = state.pending
+                due = min(pending.last_at + self.window, pending.first_at + self.max_wait)
+                delay = due - self.clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                if state.running is not None and not state.running.done():
+                    # Messages keep joining the pending turn meanwhile
+                    await asyncio.wait([state.running])
+                    continue
+                state.pending = None
+                state.running = asyncio.create_task(self.dispatch(session_id, pending))
+                state.running.add_done_callback(lambda _: self._forget_if_idle(session_id))
+                self.turns += 1
+                return
+        finally:
+            state.flusher = None
+
+    def _forget_if_idle(self, session_id: str) -> None:
+        state = self._sessions.get(session_id)
+        if state is not None and state.pending is None and state.flusher is None and state.running.done():
+            del self._sessions[session_id]
@@ -0,0 +1,157 @@
+"""Curated technical question bank indexed by technology and experience band
+
+Questions are written per technology at three levels and loaded once from
+config/question_bank.json. The index maps every (technology, experience
+band) pair to a precomputed pool: the questions at the band's level first,
+then the neighbouring levels as a fallback, so sampling is a few tuple
+lookups and never depends on the LLM.
+
+The interview engine samples a candidate's questions when it hands the
+interview to the agent and sends them with that turn, so the agent asks
+them instead of inventing new ones. Letta tools run in Letta's own
+sandbox and cannot reach this in-process bank, so prefetching is used
+rather than a tool.
+"""
+import json
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from services.candidate_index import EXPERIENCE_BANDS, experience_band
+from utils.helpers import normalize_key
+
+QUESTION_BANK_PATH = Path(__file__).parent.parent / "config" / "question_bank.json"
+
+LEVELS = ("junior", "mid", "senior")
+
+# Experience band -> level whose questions come first
+BAND_LEVELS = {
+    "0-2": "junior",
+    "2-5": "mid",
+    "5-10": "senior",
+    "10+": "senior",
+}
+
+# Band used when the candidate's experience is unknown
+DEFAULT_BAND = "2-5"
+
+
+class Question(NamedTuple):
+    id: str
+    tech: str
+    level: str
+    text: str
+
+
+class QuestionBank:
+    """Question pools per (technology, experience band)"""
+
+    def __init__(self, questions: Iterable[Question]):
+        by_tech_level: Dict[Tuple[str, str], List[Question]] = {}
+        self.techs: Dict[str, str] = {}  # normalized name -> name as written
+        self.by_id: Dict[str, Question] = {}
+        for question in questions:
+            key = normalize_key(question.tech)
+            self.techs.setdefault(key, question.tech)
+            self.by_id[question.id] = question
+            by_tech_level.setdefault((key, question.level), []).append(question)
+
+        self.index: Dict[Tuple[str, str], Tuple[Tuple[Question, ...], Tuple[Question, ...]]] = {}
+        for key in self.techs:
+            for band, _, _ in EXPERIENCE_BANDS:
+                level = LEVELS.index(BAND_LEVELS[band])
+                nearest = sorted(range(len(LEVELS)), key=lambda other: (abs(other - level), -other))
+                primary = tuple(by_tech_level.get((key, LEVELS[level]), ()))
+                fallback = tuple(
+                    question for other in nearest[1:]
+                    for question in by_tech_level.get((key, LEVELS[other]), ())
+                )
+                self.index[(key, band)] = (primary, fallback)
+
+    @classmethod
+    def from_file(cls, path: Path = QUESTION_BANK_PATH) -> "QuestionBank":
+        """Load ``{tech: {level: [question, ...]}}`` JSON"""
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        questions = []
+        for tech, levels in data.items():
+            for level, texts in levels.items():
+                if level not in LEVELS:
+                    raise ValueError(f"Unknown question level {level!r} for {tech}")
+                for n, text in enumerate(texts, 1):
+                    questions.append(Question(f"{normalize_key(tech)}-{level}-{n}", tech, level, text))
+        return cls(questions)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def covers(self, tech: str) -> bool:
+        return normalize_key(tech) in self.techs
+
+    def pool(self, tech: str, years: Optional[float]) -> Tuple[Question, ...]:
+        """All questions for ``tech`` at the candidate's band, best fit first"""
+        primary, fallback = self.index.get(
+            (normalize_key(tech), experience_band(years) or DEFAULT_BAND), ((), ())
+        )
+        return primary + fallback
+
+    def sample(
+        self,
+        techs: Iterable[str],
+        years: Optional[float],
+        count: int,
+        exclude: Iterable[str] = (),
+        rng: Optional[random.Random] = None
+    ) -> List[Question]:
+        """Up to ``count`` questions spread across ``techs``, none in ``exclude``
+
+        Technologies take turns in the order given, so the first ones listed
+        get the extra questions. Within a technology, questions at the
+        candidate's level are used up before the neighbouring levels.
+        """
+        rng = rng or random.Random()
+        excluded = set(exclude)
+        queues = []
+        for tech in dict.fromkeys(normalize_key(tech) for tech in techs):
+            primary, fallback = self.index.get((tech, experience_band(years) or DEFAULT_BAND), ((), ()))
+            queue = []
+            for tier in (primary, fallback):
+                available = [question for question in tier if question.id not in excluded]
+                rng.shuffle(available)
+                queue.extend(available)
+            if queue:
+                queues.append(queue)
+        picked: List[Question] = []
+        while queues and len(picked) < count:
+            for queue in list(queues):
+                if len(picked) >= count:
+                    break
+                picked.append(queue.pop(0))
+                if not queue:
+                    queues.remove(queue)
+        return picked
+
+
+class QuestionSampler:
+    """Per-candidate sampling without repeats across calls"""
+
+    def __init__(self, bank: QuestionBank, seed: Optional[int] = None):
+        self.bank = bank
+        self.asked: Set[str] = set()
+        self.rng = random.Random(seed)
+
+    def next(self, techs: Iterable[str], years: Optional[float], count: int) -> List[Question]:
+        questions = self.bank.sample(techs, years, count, exclude=self.asked, rng=self.rng)
+        self.asked.update(question.id for question in questions)
+        return questions
+
+
+_default_bank: Optional[QuestionBank] = None
+
+
+def get_question_bank() -> QuestionBank:
+    """Shared bank loaded from QUESTION_BANK_PATH on first use"""
+    global _default_bank
+    if _default_bank is None:
+        _default_bank = QuestionBank.from_file()
+    return _default_bank
@@ -0,0 +1,124 @@
+"""Bounded per-connection event buffers for the streaming gateway"""
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "close")
+
+
+def coalesce_key(event: Dict[str, Any]) -> Optional[Tuple[Hashable, ...]]:
+    """Key under which partial events replace each other, or None
+
+    Token-streamed reasoning/assistant events carry the full accumulated
+    content of their message, so only the newest one per message id matters.
+    """
+    if event.get("partial") and event.get("message_id") is not None:
+        return (event.get("type"), event["message_id"])
+    return None
+
+
+class CoalescingEventBuffer:
+    """Async FIFO of stream events with bounded size and latest-wins coalescing
+
+    A fast producer (the upstream Letta stream) feeding a slow consumer (a
+    client connection) would otherwise queue every token. Partial events for
+    a message still waiting in the buffer are replaced in place. What happens
+    once ``maxsize`` distinct events are pending depends on ``overflow``:
+
+    - ``block``: ``put`` waits, pushing backpressure up to the producer
+    - ``drop_oldest``: the oldest pending event is discarded
+    - ``close``: the buffer closes and ``overflowed`` is set, so the owner
+      can drop the connection
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 64,
+        overflow: str = "block",
+        key: Callable[[Any], Optional[Hashable]] = coalesce_key
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.coalesced = 0
+        self.dropped = 0
+        self.overflowed = False
+        self._key = key
+        self._events: Deque[List[Any]] = deque()
+        self._pending: Dict[Hashable, List[Any]] = {}
+        self._closed = False
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def offer(self, event: Any) -> bool:
+        """Queue an event without waiting
+
+        Returns:
+            False if the event was not queued (buffer closed, or full under
+            the ``block`` policy)
+        """
+        if self._closed:
+            return False
+        key = self._key(event)
+        if key is not None and key in self._pending:
+            self._pending[key][0] = event
+            self.coalesced += 1
+            return True
+        if len(self._events) >= self.maxsize:
+            if self.overflow == "drop_oldest":
+                _, dropped_key = self._events.popleft()
+                if dropped_key is not None:
+                    self._pending.pop(dropped_key, None)
+                self.dropped += 1
+            elif self.overflow == "close":
+                self.overflowed = True
+                self.close()
+                return False
+            else:
+                return False
+        slot = [event, key]
+        self._events.append(slot)
+        if key is not None:
+            self._pending[key] = slot
+        self._not_empty.set()
+        return True
+
+    async def put(self, event: Any) -> None:
+        """Queue an event, waiting for space under the ``block`` policy"""
+        while not self.offer(event) and not self._closed:
+            self._not_full.clear()
+            await self._not_full.wait()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Pop the oldest event
+
+        Returns:
+            The event, or None once the buffer is closed and drained
+
+        Raises:
+            asyncio.TimeoutError: if ``timeout`` elapses with nothing queued
+        """
+        while not self._events and not self._closed:
+            self._not_empty.clear()
+            await asyncio.wait_for(self._not_empty.wait(), timeout)
+        if not self._events:
+            return None
+        event, key = self._events.popleft()
+        if key is not None:
+            self._pending.pop(key, None)
+        self._not_full.set()
+        return event
+
+    def close(self) -> None:
+        """Stop accepting events; queued events can still be drained"""
+        self._closed = True
+        self._not_empty.set()
+        self._not_full.set()
@@ -0,0 +1,249 @@
+"""In-process pub/sub for interview streams
+
+One upstream agent stream is published once per session and fanned out to
+any number of subscribers: the candidate's UI, recruiter monitors and the
+persistence writer. Publishing never waits on a subscriber.
+"""
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from services.stream_buffer import coalesce_key
+
+# Listener signature: (session_id, seq, event) -> None. Listeners must not
+# block; Subscriber is the standard buffered implementation.
+Listener = Callable[[str, int, Dict[str, Any]], None]
+
+
+class SessionStream:
+    """Sequenced event log for one interview session
+
+    Every published event gets the next sequence number and is kept in a
+    ring buffer so a reconnecting client can resume from the last sequence
+    it saw instead of restarting the turn.
+    """
+
+    def __init__(self, session_id: str, history: int = 512):
+        self.session_id = session_id
+        self.seq = 0
+        self.events: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=history)
+        self.listeners: Set[Listener] = set()
+        # Compacted view of the current turn, used for snapshots
+        self.turn: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self.turn_complete = True
+
+    @property
+    def oldest_seq(self) -> int:
+        """Sequence number of the oldest event still held (seq + 1 if empty)"""
+        return self.events[0][0] if self.events else self.seq + 1
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Append an event and hand it to every listener"""
+        self.seq += 1
+        self.events.append((self.seq, event))
+        self._update_turn(event)
+        for listener in list(self.listeners):
+            listener(self.session_id, self.seq, event)
+        return self.seq
+
+    def _update_turn(self, event: Dict[str, Any]) -> None:
+        if event.get("type") == "user":
+            self.turn.clear()
+            self.turn_complete = False
+        elif event.get("type") == "done":
+            self.turn_complete = True
+        key = coalesce_key(event)
+        self.turn[key if key is not None else ("seq", self.seq)] = event
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current turn compacted to the latest state of each message"""
+        return {
+            "type": "snapshot",
+            "content": "",
+            "events": list(self.turn.values()),
+            "turn_complete": self.turn_complete
+        }
+
+    def replay(self, since: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], bool]:
+        """Events published after sequence ``since``
+
+        Returns:
+            (events, complete) where ``complete`` is False if some events
+            after ``since`` have already been evicted from the ring buffer
+        """
+        complete = since + 1 >= self.oldest_seq
+        return [(seq, event) for seq, event in self.events if seq > since], complete
+
+
+class Subscriber:
+    """Bounded mailbox for one consumer of a session stream
+
+    Events queue up to ``maxsize``. A consumer that falls further behind is
+    not allowed to hold up the producer: its backlog is discarded and its
+    next ``get`` returns a snapshot of the current turn, after which it
+    follows live events again.
+    """
+
+    def __init__(self, stream: SessionStream, name: str = "", maxsize: int = 256):
+        self.stream = stream
+        self.name = name
+        self.maxsize = maxsize
+        self.backlog: Deque[Tuple[int, Dict[str, Any]]] = deque()
+        self.delivered_seq = stream.seq
+        self.snapshot_pending = False
+        self.closed = False
+        self.delivered = 0
+        self.snapshots = 0
+        self.max_lag = 0
+        self._ready = asyncio.Event()
+
+    def __call__(self, session_id: str, seq: int, event: Dict[str, Any]) -> None:
+        if self.closed or self.snapshot_pending:
+            # A pending snapshot will capture this event's effect
+            return
+        if len(self.backlog) >= self.maxsize:
+            self._fall_back_to_snapshot()
+        else:
+            self.backlog.append((seq, event))
+        self.max_lag = max(self.max_lag, self.lag)
+        self._ready.set()
+
+    def _fall_back_to_snapshot(self) -> None:
+        self.backlog.clear()
+        self.snapshot_pending = True
+        self.snapshots += 1
+        self._ready.set()
+
+    @property
+    def lag(self) -> int:
+        """Events published but not yet delivered to this subscriber"""
+        return self.stream.seq - self.delivered_seq
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Next (seq, event), a (seq, snapshot) after falling behind, or None once closed
+
+        Raises:
+            asyncio.TimeoutError: if ``timeout`` elapses with nothing to deliver
+        """
+        while not self.backlog and not self.snapshot_pending and not self.closed:
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        if self.snapshot_pending:
+            self.snapshot_pending = False
+            self.delivered_seq = self.stream.seq
+            return self.stream.seq, self.stream.snapshot()
+        if not self.backlog:
+            return None
+        seq, event = self.backlog.popleft()
+        self.delivered_seq = seq
+        self.delivered += 1
+        return seq, event
+
+    def close(self) -> None:
+        self.closed = True
+        self.stream.listeners.discard(self)
+        self._ready.set()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "backlog": len(self.backlog),
+            "delivered": self.delivered,
+            "snapshots": self.snapshots
+        }
+
+
+class StreamHub:
+    """Registry of session streams, evicting idle sessions beyond a cap"""
+
+    def __init__(self, history: int = 512, max_sessions: int = 10000):
+        self.history = history
+        self.max_sessions = max_sessions
+        self.streams: "OrderedDict[str, SessionStream]" = OrderedDict()
+
+    def get(self, session_id: str) -> SessionStream:
+        """Return the stream for a session, creating it if needed"""
+        stream = self.streams.get(session_id)
+        if stream is None:
+            stream = SessionStream(session_id, self.history)
+            self.streams[session_id] = stream
+            self._evict()
+        else:
+            self.streams.move_to_end(session_id)
+        return stream
+
+    def subscribe(
+        self,
+        session_id: str,
+        listener: Listener,
+        since: Optional[int] = None
+    ) -> Tuple[List[Tuple[int, Dict[str, Any]]], bool]:
+        """Attach a listener, returning events to replay first
+
+        With ``since=None`` only live events are delivered.
+        """
+        stream = self.get(session_id)
+        replay, complete = ([], True) if since is None else stream.replay(since)
+        stream.listeners.add(listener)
+        return replay, complete
+
+    def open_subscriber(
+        self,
+        session_id: str,
+        name: str = "",
+        since: Optional[int] = None,
+        maxsize: int = 256
+    ) -> Subscriber:
+        """Create a buffered subscriber, replaying from ``since`` if given
+
+        A resume point that has been evicted, or a replay larger than the
+        subscriber's buffer, starts with a snapshot instead.
+        """
+        stream = self.get(session_id)
+        subscriber = Subscriber(stream, name, maxsize)
+        replay, complete = self.subscribe(session_id, subscriber, since)
+        if since is not None:
+            subscriber.delivered_seq = since
+        if not complete or len(replay) > maxsize:
+            subscriber._fall_back_to_snapshot()
+        else:
+            subscriber.backlog.extend(replay)
+        return subscriber
+
+    def metrics(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Subscriber lag metrics, for one session or aggregated over all"""
+        streams = [self.streams[session_id]] if session_id in self.streams else (
+            [] if session_id else list(self.streams.values())
+        )
+        subscribers = [
+            (stream, listener) for stream in streams
+            for listener in stream.listeners if isinstance(listener, Subscriber)
+        ]
+        report = {
+            "sessions": len(streams),
+            "subscribers": len(subscribers),
+            "max_lag": max((sub.lag for _, sub in subscribers), default=0),
+            "peak_lag": max((sub.max_lag for _, sub in subscribers), default=0),
+            "snapshots": sum(sub.snapshots for _, sub in subscribers)
+        }
+        if session_id:
+            report["seq"] = streams[0].seq if streams else 0
+            report["detail"] = [sub.metrics() for _, sub in subscribers]
+        return report
+
+    def unsubscribe(self, session_id: str, listener: Listener) -> None:
+        stream = self.streams.get(session_id)
+        if stream is not None:
+            stream.listeners.discard(listener)
+
+    def _evict(self) -> None:
+        """Drop the least recently used idle streams beyond max_sessions"""
+        if len(self.streams) <= self.max_sessions:
+            return
+        for session_id in list(self.streams):
+            if len(self.streams) <= self.max_sessions:
+                break
+            if not self.streams[session_id].listeners:
+                del self.streams[session_id]
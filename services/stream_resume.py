@@ -0,0 +1,81 @@
+"""Bookkeeping for resuming an agent stream that dropped mid-turn
+
+While a turn streams, ResumeState notes the run id, the last sequence
+number and which messages have been received in full (with token
+streaming, a message is complete once the next one starts). After a
+transient failure LettaService reconnects and fetches only what is
+missing:
+
+- background runs (``letta_background_streams``) are replayed from the
+  server's stream buffer after the last sequence number
+- otherwise the turn's messages are read back from the agent's message
+  history, which holds whole messages; the ones already complete are
+  skipped and the partial one is replaced by its full text
+
+Either way the agent does not run the turn again, and the events keep
+their message ids, so the UI overwrites the partial message in place.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Letta run statuses after which a run's messages are final
+TERMINAL_RUN_STATUSES = {"completed", "failed", "cancelled", "expired"}
+
+MessageKey = Tuple[str, str]  # (message id, message type)
+
+
+def resume_delay(attempt: int, base: float) -> float:
+    """Exponential backoff before resume attempt ``attempt`` (1-based)"""
+    return base * 2 ** (attempt - 1)
+
+
+class ResumeState:
+    """What one turn has received so far"""
+
+    def __init__(self):
+        self.run_id: Optional[str] = None
+        self.seq_id: Optional[int] = None
+        self.first_id: Optional[str] = None
+        self.current: Optional[MessageKey] = None
+        self.complete: Set[MessageKey] = set()
+        self.replayed: Dict[MessageKey, str] = {}
+
+    def track(self, chunk: Any) -> None:
+        """Note one raw stream chunk"""
+        self.run_id = getattr(chunk, "run_id", None) or self.run_id
+        seq_id = getattr(chunk, "seq_id", None)
+        if seq_id is not None:
+            self.seq_id = seq_id
+        message_id = getattr(chunk, "id", None)
+        if not message_id:
+            return
+        key = (message_id, getattr(chunk, "message_type", ""))
+        if key != self.current:
+            if self.current is not None:
+                self.complete.add(self.current)
+            self.current = key
+        self.first_id = self.first_id or message_id
+
+    def missing(self, history: List[Any], accumulators: Dict[str, Any]) -> List[Any]:
+        """Messages of this turn in ``history`` not yet received in full
+
+        Accumulators of returned messages are reset: history holds the
+        whole message rather than a delta to append.
+        """
+        missing = []
+        for message in self._turn_messages(history):
+            key = (message.id, getattr(message, "message_type", ""))
+            text = f"{getattr(message, 'reasoning', '') or ''}{getattr(message, 'content', '') or ''}"
+            if key in self.complete or self.replayed.get(key) == text:
+                continue
+            self.replayed[key] = text
+            accumulators.pop(message.id, None)
+            missing.append(message)
+        return missing
+
+    def _turn_messages(self, history: List[Any]) -> List[Any]:
+        if self.run_id:
+            return [message for message in history if getattr(message, "run_id", None) == self.run_id]
+        ids = [getattr(message, "id", None) for message in history]
+        if self.first_id not in ids:
+            return []
+        return history[ids.index(self.first_id):]
@@ -0,0 +1,178 @@
+"""Per-turn state of an agent stream, shared by the sync and async paths
+
+LettaService streams turns from a thread (Streamlit) and from the event
+loop (the FastAPI gateway). The two paths only differ in how they iterate
+a stream and wait; everything else about a turn lives in StreamTurn, so
+both behave the same:
+
+- failing over to the next endpoint while nothing has been streamed yet
+- processing raw chunks into events and timing them
+- resuming a stream that dropped after its first event (see
+  services/stream_resume.py)
+- reporting the outcome to the breaker, the endpoint pool and the A/B
+  router
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from config.settings import settings
+from services.circuit_breaker import Permit
+from services.stream_resume import TERMINAL_RUN_STATUSES, ResumeState, resume_delay
+
+logger = logging.getLogger(__name__)
+
+
+class StreamTurn:
+    """One agent turn of a LettaService: its endpoint attempts, timings and outcome"""
+
+    def __init__(self, service: Any, agent_id: str, messages: List[Dict[str, Any]], permit: Permit):
+        self.service = service
+        self.agent_id = agent_id
+        self.messages = messages
+        self.permit = permit
+        self.started = time.perf_counter()
+        self.first_event: Optional[float] = None  # seconds to the first event
+        self.ttft: Optional[float] = None  # seconds to the first assistant text
+        self.usage: Optional[Dict[str, int]] = None
+        self.error: Optional[str] = None
+        self.resumes = 0
+        self.cancelled = False  # abandoned by the caller; says nothing about the agent
+        # The current endpoint attempt
+        self.url: Optional[str] = None
+        self.attempt_started = self.started
+        self.accumulators: Dict = {}  # message accumulators for token streaming
+        self.resume = ResumeState()
+        self.drops = 0
+
+    def open(self, url: str, client: Any, stream_tokens: bool) -> Any:
+        """Start an attempt on ``url``; returns the client's raw chunk stream"""
+        self.url = url
+        self.attempt_started = time.perf_counter()
+        self.accumulators = {}
+        self.resume = ResumeState()
+        self.drops = 0
+        return client.agents.messages.create_stream(
+            agent_id=self.agent_id,
+            messages=self.messages,
+            stream_tokens=stream_tokens,
+            **self.service._background_option()
+        )
+
+    def process(self, chunk: Any) -> Optional[Dict[str, Any]]:
+        """Event for one raw chunk, or None if it completes nothing yet"""
+        self.resume.track(chunk)
+        event = self.service._process_stream_chunk(chunk, self.accumulators)
+        if event:
+            elapsed = time.perf_counter() - self.started
+            if self.first_event is None:
+                self.service.endpoints.record_success(self.url, time.perf_counter() - self.attempt_started)
+                self.first_event = elapsed
+            if event["type"] == "assistant" and self.ttft is None:
+                self.ttft = elapsed
+            elif event["type"] == "usage":
+                self.usage = event.get("usage")
+        return event
+
+    def dropped(self, error: Exception) -> Optional[float]:
+        """Seconds to wait before resuming a stream that raised ``error``
+
+        None if it is not resumed: before the first event the endpoint
+        failover applies instead, and resumes stop after
+        ``letta_resume_attempts``.
+        """
+        self.drops += 1
+        if self.first_event is None:
+            return None
+        if self.drops > settings.letta_resume_attempts:
+            self.service.resume_stats["failed"] += 1
+            return None
+        logger.warning(f"Stream dropped mid-turn ({error}); resume attempt {self.drops}")
+        return resume_delay(self.drops, settings.letta_resume_backoff)
+
+    def resumed_stream(self, client: Any) -> Iterator[Any]:
+        """Raw chunks for the rest of an interrupted turn, without re-running it"""
+        resume = self.resume
+        if settings.letta_background_streams and resume.run_id and resume.seq_id is not None:
+            yield from client.runs.stream(resume.run_id, starting_after=resume.seq_id)
+            return
+        while True:
+            history = client.agents.messages.list(self.agent_id, limit=settings.letta_resume_history_limit)
+            yield from resume.missing(history, self.accumulators)
+            # Without a run id there is no way to wait for the turn to end
+            if not resume.run_id or client.runs.retrieve(resume.run_id).status in TERMINAL_RUN_STATUSES:
+                return
+            time.sleep(settings.letta_resume_poll_interval)
+
+    async def resumed_stream_async(self, client: Any) -> AsyncIterator[Any]:
+        """Async variant of resumed_stream"""
+        resume = self.resume
+        if settings.letta_background_streams and resume.run_id and resume.seq_id is not None:
+            async for chunk in client.runs.stream(resume.run_id, starting_after=resume.seq_id):
+                yield chunk
+            return
+        while True:
+            history = await client.agents.messages.list(self.agent_id, limit=settings.letta_resume_history_limit)
+            for message in resume.missing(history, self.accumulators):
+                yield message
+            if not resume.run_id or (await client.runs.retrieve(resume.run_id)).status in TERMINAL_RUN_STATUSES:
+                return
+            await asyncio.sleep(settings.letta_resume_poll_interval)
+
+    def completed(self) -> None:
+        """The current attempt streamed to its end"""
+        if self.drops:
+            self.service.resume_stats["resumed"] += 1
+            self.resumes = self.drops
+        self.error = None
+
+    def fail_over(self, error: Exception) -> bool:
+        """Record a failed endpoint; True if the turn may try the next one
+
+        Once an event has been streamed the turn is committed to this
+        endpoint, so later errors are reported instead. Note that an endpoint
+        can fail after accepting the message, so failing over may deliver
+        it twice when the endpoints share the agent's state.
+        """
+        if self.first_event is not None:
+            return False
+        self.service.endpoints.record_failure(self.url, str(error))
+        logger.warning(f"Letta endpoint {self.url} failed before its first event: {error}")
+        self.error = str(error)
+        return True
+
+    def exhausted(self) -> ConnectionError:
+        """Error for a turn that every endpoint failed"""
+        return ConnectionError(self.error)
+
+    def failed(self, error: Exception) -> Dict[str, Any]:
+        """Error event ending a turn that failed with ``error``"""
+        logger.error(f"Error during streaming: {error}")
+        self.error = str(error)
+        return {
+            "type": "error",
+            "content": f"Error: {str(error)}",
+            "error": True
+        }
+
+    def record(self) -> None:
+        """Report an interview turn to the breaker, timed to its first event, and to the router
+
+        A cancelled turn (the candidate sent another message, the page
+        reran) only gives its permit back.
+        """
+        service = self.service
+        if not service.is_interview_agent(self.agent_id):
+            return
+        if self.cancelled:
+            service.breaker.release(self.permit)
+            return
+        seconds = time.perf_counter() - self.started
+        error = self.error
+        if error is None and self.first_event is not None:
+            service.breaker.record_success(self.first_event, self.permit)
+        else:
+            error = error or "no events"
+            service.breaker.record_failure(seconds, error, self.permit)
+        service.router.record_turn(self.agent_id, self.ttft, seconds, self.usage, error)
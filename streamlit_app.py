@@ -11,18 +11,25 @@ import time
 from datetime import datetime
 import io
 import json
-import streamlit.components.v1 as components
+import uuid
+from typing import Optional
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from utils.profiling import mark
+
 # Load environment variables
 load_dotenv('.env.streamlit')
 
 from config.settings import settings
-from utils.constants import ConversationStage, REQUIRED_FIELDS
-from utils.helpers import is_exit_keyword
+from utils.constants import ConversationStage, Intent, REQUIRED_FIELDS
+from utils.intents import answer_locally, intent_stats
+from utils.extraction import InterviewMetrics
+from services.idempotency import turn_key
+from services.interview_engine import INTERVIEW_MODES, EngineStep, InterviewEngine
 from services.letta_service import letta_service
+from services.question_bank import get_question_bank
 
 # Page configuration
 st.set_page_config(
@@ -480,6 +487,8 @@ window.addEventListener('load', function() {
 
 def save_messages_to_indexeddb(messages):
     """Save messages to browser IndexedDB using global manager"""
+    import streamlit.components.v1 as components
+
     messages_json = json.dumps(messages)
     save_script = f"""
     <script>
@@ -493,6 +502,8 @@ def save_messages_to_indexeddb(messages):
 
 def clear_indexeddb():
     """Clear conversation history from IndexedDB using global manager"""
+    import streamlit.components.v1 as components
+
     clear_script = """
     <script>
     if (window.talentScoutDB) {
@@ -526,6 +537,46 @@ def initialize_session_state():
     
     if 'indexeddb_checked' not in st.session_state:
         st.session_state.indexeddb_checked = False
+    
+    if 'interview_engine' not in st.session_state:
+        st.session_state.interview_engine = new_interview_engine()
+    
+    if 'interview_metrics' not in st.session_state:
+        st.session_state.interview_metrics = InterviewMetrics()
+    
+    if 'session_id' not in st.session_state:
+        # Keys the session's A/B agent variant
+        st.session_state.session_id = str(uuid.uuid4())
+
+
+def configured_scripted_stages():
+    """Interview stages run locally in the configured interview mode"""
+    return INTERVIEW_MODES.get(settings.interview_mode, INTERVIEW_MODES['hybrid'])
+
+
+def new_interview_engine(messages=None):
+    """Interview engine for the configured mode, resumed from ``messages`` if given"""
+    options = {
+        'scripted_stages': configured_scripted_stages(),
+        'technical_turns': int(settings.technical_question_turns),
+        'question_bank': get_question_bank(),
+    }
+    if messages:
+        return InterviewEngine.from_messages(messages, **options)
+    return InterviewEngine(**options)
+
+
+def last_assistant_message(messages):
+    """Content of the most recent assistant message, if any"""
+    for message in reversed(messages):
+        if message.get('role') == 'assistant' and message.get('content'):
+            return message['content']
+    return None
+
+
+def is_unanswered(messages, prompt):
+    """Whether ``prompt`` is the last message and still waits for a reply"""
+    return bool(messages) and messages[-1]['role'] == 'user' and messages[-1]['content'] == prompt
 
 
 def export_chat_as_txt():
@@ -586,19 +637,18 @@ def export_chat_as_markdown():
     return content
 
 
-def connect_to_letta():
-    """Connect to Letta service"""
+def connect_to_letta(timeout: float = 0.0):
+    """Attach this session to the background-warmed Letta connection
+    
+    Connection setup and agent-info fetching happen in the warm-up thread
+    started at process boot; this only waits (up to ``timeout`` seconds)
+    if warm-up has not finished yet.
+    """
     if not st.session_state.letta_connected:
-        with st.spinner("Connecting to Letta Agent..."):
-            success = letta_service.connect()
-            if success:
-                st.session_state.letta_connected = True
-                st.session_state.agent_info = letta_service.get_agent_info()
-                return True
-            else:
-                st.error("❌ Failed to connect to Letta Agent. Check your credentials.")
-                return False
-    return True
+        if letta_service.is_ready() or letta_service.wait_until_ready(timeout):
+            st.session_state.letta_connected = True
+            st.session_state.agent_info = letta_service.get_status()['agent_info']
+    return st.session_state.letta_connected
 
 
 def render_message(message):
@@ -627,13 +677,20 @@ def render_message(message):
                 st.write(content)
 
 
-def handle_stream_response(user_message: str):
+def handle_stream_response(
+    user_message: str,
+    context: Optional[str] = None,
+    opening: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    idempotency_key: Optional[str] = None
+):
     """Handle streaming response from Letta"""
     try:
         # Track message components - keep reasoning and assistant SEPARATE
         reasoning_parts = {}
         assistant_parts = {}
         tool_calls = []
+        usage = {}
         
         # Create placeholders for streaming
         thinking_indicator = st.empty()
@@ -653,7 +710,10 @@ def handle_stream_response(user_message: str):
         """, unsafe_allow_html=True)
         
         # Stream responses
-        for chunk in letta_service.send_message_stream(user_message, stream_tokens=True):
+        for chunk in letta_service.send_message_stream(
+            user_message, stream_tokens=True, context=context, opening=opening, agent_id=agent_id,
+            idempotency_key=idempotency_key
+        ):
             chunk_type = chunk.get('type')
             
             if chunk_type == 'reasoning':
@@ -706,6 +766,9 @@ def handle_stream_response(user_message: str):
                 tool_name = chunk.get('tool_name', 'unknown')
                 tool_calls.append(tool_name)
             
+            elif chunk_type == 'usage':
+                usage = chunk.get('usage', {})
+            
             elif chunk_type == 'error':
                 st.error(f"❌ {chunk.get('content', 'Unknown error')}")
                 return None
@@ -725,7 +788,8 @@ def handle_stream_response(user_message: str):
             'role': 'assistant',
             'content': clean_assistant,  # Clean assistant message WITHOUT reasoning
             'reasoning': '',  # Don't store reasoning to avoid duplication on rerun
-            'tool_calls': tool_calls
+            'tool_calls': tool_calls,
+            'usage': usage
         }
     
     except Exception as e:
@@ -741,6 +805,8 @@ def main():
     
     # Check for messages to restore from IndexedDB (via sessionStorage bridge)
     if not st.session_state.indexeddb_checked and len(st.session_state.messages) == 0:
+        import streamlit.components.v1 as components
+
         # Use a component to check sessionStorage
         check_script = """
         <script>
@@ -769,8 +835,10 @@ def main():
             messages = json.loads(restored_data)
             if messages and isinstance(messages, list) and len(messages) > 0:
                 st.session_state.messages = messages
+                st.session_state.interview_engine = new_interview_engine(messages)
                 # Clear the query param and sessionStorage
                 del st.query_params['_restore']
+                import streamlit.components.v1 as components
                 components.html('<script>sessionStorage.removeItem("_talentscout_restore");</script>', height=0)
                 st.rerun()
         except Exception as e:
@@ -806,6 +874,10 @@ def main():
     with col4:
         if st.button("✨ New Chat", help="Start a new conversation"):
             st.session_state.messages = []
+            st.session_state.interview_engine = new_interview_engine()
+            st.session_state.interview_metrics = InterviewMetrics()
+            st.session_state.pop('pending_opening', None)
+            st.session_state.session_id = str(uuid.uuid4())
             clear_indexeddb()
             st.rerun()
     
@@ -824,47 +896,178 @@ def main():
         unsafe_allow_html=True
     )
     
-    # Connect to Letta
+    # Status badge is filled in once the connection attempt finishes
+    status_placeholder = st.empty()
+    
+    # New sessions whose first turn goes to the agent open instantly with
+    # the cached opening; the agent gets it with the first real message
+    engine = st.session_state.interview_engine
+    agent_id = letta_service.assign_agent(st.session_state.session_id)
+    # The opening is cached for the default agent only; other A/B variants
+    # write their own first turn
+    if not st.session_state.messages and not engine.is_scripted and agent_id == letta_service.agent_id:
+        opening = letta_service.get_opening()
+        if opening:
+            st.session_state.messages.append({
+                'role': 'assistant',
+                'content': opening,
+                'reasoning': '',
+                'tool_calls': []
+            })
+            st.session_state.pending_opening = opening
+    
+    # Display chat history
+    for message in st.session_state.messages:
+        render_message(message)
+    
+    # Declare the chat input before connecting so the first paint (header,
+    # history and input box) never waits on Letta client construction
+    prompt = st.chat_input("Type your message here...", key="user_input")
+    mark("first_paint")
+    
+    # Build the Letta connection in the background once per process (no-op
+    # when already running). Started right after the first paint of the
+    # first session so its letta_client import never competes with it.
+    letta_service.start_warmup(
+        refresh_interval=settings.letta_warmup_interval,
+        cache_opening=ConversationStage.GREETING not in configured_scripted_stages()
+    )
+    
+    # Attach to the warmed-up Letta connection
     if not st.session_state.letta_connected:
-        connect_to_letta()
+        status_placeholder.markdown(
+            '<div class="connection-status">Connecting to AI Agent...</div>',
+            unsafe_allow_html=True
+        )
+        connect_to_letta(timeout=settings.letta_attach_timeout)
     
     # Show connection status inline
-    if st.session_state.letta_connected:
-        st.markdown(
+    if st.session_state.letta_connected and letta_service.is_degraded():
+        status_placeholder.markdown(
+            '<div class="connection-status status-error">⚠ AI Agent Slow - Answers Are Being Saved</div>',
+            unsafe_allow_html=True
+        )
+    elif st.session_state.letta_connected:
+        status_placeholder.markdown(
             '<div class="connection-status status-connected">✓ AI Agent Connected</div>',
             unsafe_allow_html=True
         )
     else:
-        st.markdown(
+        status_placeholder.markdown(
             '<div class="connection-status status-error">⚠ Connection Error</div>',
             unsafe_allow_html=True
         )
-    
-    # Display chat history
-    for message in st.session_state.messages:
-        render_message(message)
+        last_error = letta_service.get_status()['last_error']
+        if last_error:
+            st.error(f"❌ Failed to connect to Letta Agent. Check your credentials. ({last_error})")
+    
+    if settings.debug_mode:
+        st.caption(f"Local intents: {intent_stats.summary()}")
+        st.caption(f"Engine: {engine.summary()}")
+        st.caption(f"Letta breaker: {letta_service.breaker.snapshot()}")
+        if len(letta_service.endpoints.urls) > 1:
+            st.caption(f"Letta endpoints: {letta_service.endpoints.snapshot()}")
+        st.caption(f"Opening cache: {letta_service.opening_cache.summary()}")
+        st.caption(f"Submissions: {letta_service.submissions.summary()}")
+        st.caption(f"Interview: {st.session_state.interview_metrics.summary(engine.record)}")
+        if len(letta_service.router.variants) > 1:
+            st.caption(f"Agent variant {agent_id}: {letta_service.router.report()}")
+    
+    # While the agent is slow or unreachable the engine runs what it can
+    # locally (details, tech stack, banked technical questions)
+    engine.degraded = not st.session_state.letta_connected or letta_service.is_degraded()
+    
+    # Trivial turns (bye, help, repeat...) and the scripted interview stages
+    # are answered without the agent, so they also work while the connection
+    # is still being established
+    step = None
+    # A turn the agent has not answered yet (the script reran mid-stream, or
+    # the same message was sent again) attaches to the submission already
+    # running under its key instead of starting another turn
+    pending = st.session_state.get('pending_turn')
+    if pending and not is_unanswered(st.session_state.messages, pending['prompt']):
+        st.session_state.pop('pending_turn')
+        pending = None
+    resubmitted = pending is not None and (not prompt or prompt == pending['prompt'])
+    if resubmitted:
+        prompt = pending['prompt']
+        step = EngineStep(engine.stage)
+    elif prompt:
+        intent, local_response = answer_locally(
+            prompt, st.session_state.messages, settings.local_intents.split(",")
+        )
+        if intent == Intent.EXIT and local_response is not None:
+            engine.stage = ConversationStage.CONCLUSION
+        elif local_response is None:
+            step = engine.handle(prompt, last_assistant_message(st.session_state.messages))
+            local_response = step.reply
+            if local_response is None and not st.session_state.letta_connected:
+                # No connection to send the turn on: queue the answer and say so
+                local_response = engine.defer(prompt, step.context)
+        if local_response is not None:
+            st.session_state.messages.append({'role': 'user', 'content': prompt})
+            st.session_state.messages.append({
+                'role': 'assistant',
+                'content': local_response,
+                'reasoning': '',
+                'tool_calls': []
+            })
+            save_messages_to_indexeddb(st.session_state.messages)
+            st.rerun()
     
     # Chat input
     if st.session_state.letta_connected:
-        if prompt := st.chat_input("Type your message here...", key="user_input"):
-            # Add user message to history
-            st.session_state.messages.append({
-                'role': 'user',
-                'content': prompt
-            })
-            
-            # Get streaming response (this will display reasoning and assistant message)
-            response = handle_stream_response(prompt)
+        if step is not None:
+            if resubmitted:
+                key, context = pending['key'], pending['context']
+            else:
+                key = turn_key(st.session_state.session_id, st.session_state.messages, prompt)
+                # Add user message to history
+                st.session_state.messages.append({
+                    'role': 'user',
+                    'content': prompt
+                })
+                # Answers given while the agent was unavailable go ahead of this turn
+                context = engine.take_queued(step.context)
+                st.session_state.pending_turn = {'key': key, 'prompt': prompt, 'context': context}
+            response = None
+            if not letta_service.is_degraded():
+                # Get streaming response (this will display reasoning and assistant message)
+                turn_started = time.perf_counter()
+                response = handle_stream_response(
+                    prompt,
+                    context=context,
+                    opening=st.session_state.get('pending_opening'),
+                    agent_id=agent_id,
+                    idempotency_key=key
+                )
+                if not resubmitted:
+                    intent_stats.record_agent(intent, time.perf_counter() - turn_started)
+                if response:
+                    st.session_state.interview_metrics.record_turn(response.get('usage'))
+                    if step.stage == ConversationStage.CONCLUSION:
+                        letta_service.router.record_completion(st.session_state.session_id)
             
             # Store the response WITHOUT reasoning to avoid duplication
             # Reasoning was already displayed during streaming
             if response:
+                st.session_state.pop('pending_opening', None)
                 st.session_state.messages.append({
                     'role': 'assistant',
                     'content': response['content'],  # Only store assistant content
                     'reasoning': '',  # Don't store reasoning to avoid showing twice
                     'tool_calls': response.get('tool_calls', [])
                 })
+            else:
+                # Agent slow or down: queue the answer so the candidate is not stuck
+                st.session_state.messages.append({
+                    'role': 'assistant',
+                    'content': engine.defer(prompt, context),
+                    'reasoning': '',
+                    'tool_calls': []
+                })
+            
+            st.session_state.pop('pending_turn', None)
             
             # Save messages to IndexedDB
             save_messages_to_indexeddb(st.session_state.messages)
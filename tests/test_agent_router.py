@@ -0,0 +1,61 @@
+"""Test A/B routing of sessions across agent variants"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.agent_router import AgentRouter, Variant, parse_variants
+
+
+def test_parse_variants():
+    assert parse_variants("", "agent-main") == [Variant("default", "agent-main", 1.0)]
+    assert parse_variants("control=agent-a:3, cheap=agent-b", "x") == [
+        Variant("control", "agent-a", 3.0),
+        Variant("cheap", "agent-b", 1.0),
+    ]
+    for spec in ("control", "a=x,a=y", "a=x:0,b=y:0"):
+        with pytest.raises(ValueError):
+            parse_variants(spec, "x")
+
+
+def test_assignment_is_weighted_and_sticky():
+    router = AgentRouter(parse_variants("control=agent-a:3,cheap=agent-b:1", "x"))
+    picks = [router.assign(f"session-{n}").name for n in range(4000)]
+    assert 0.72 < picks.count("control") / len(picks) < 0.78
+    assert router.metrics["control"].sessions == picks.count("control")
+
+    # Another process agrees, and weight changes leave running sessions alone
+    assert AgentRouter(router.variants).assign("session-7").name == picks[7]
+    router.variants = [Variant("control", "agent-a", 0.0), Variant("cheap", "agent-b", 1.0)]
+    assert [router.assign(f"session-{n}").name for n in range(100)] == picks[:100]
+    assert router.metrics["cheap"].sessions == picks.count("cheap")
+
+
+def test_report_compares_variants_to_control():
+    router = AgentRouter(parse_variants("control=agent-a,cheap=agent-b", "x"))
+    sessions = {"control": [], "cheap": []}
+    n = 0
+    while min(len(ids) for ids in sessions.values()) < 2:
+        sessions[router.assign(f"s{n}").name].append(f"s{n}")
+        n += 1
+    for _ in range(4):
+        router.record_turn("agent-a", 1.0, 4.0, {"prompt_tokens": 900, "completion_tokens": 100, "total_tokens": 1000})
+        router.record_turn("agent-b", 0.5, 3.0, {"prompt_tokens": 500, "completion_tokens": 100, "total_tokens": 600})
+    router.record_turn("agent-b", None, 9.0, error="timed out")
+    router.record_turn("agent-eval", 0.1, 0.2)  # not a variant
+    for session_id in sessions["control"] + sessions["cheap"][:1] * 2:
+        router.record_completion(session_id)
+
+    report = router.report()
+    cheap = report["variants"]["cheap"]
+    assert cheap["turns"] == 5 and cheap["error_rate"] == 0.2
+    assert cheap["tokens_per_turn"] == 600.0 and cheap["ttft_p50_seconds"] == 0.5
+    assert report["relative_to_control"]["cheap"]["tokens_per_turn"] == -0.4
+    assert report["best"]["ttft_p50_seconds"] == "cheap"
+    assert report["best"]["completion_rate"] == "control"
+    assert report["variants"]["control"]["completion_rate"] == 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,468 @@
+"""Test the FastAPI backend against an in-memory Mongo stand-in"""
+import pytest
+from pathlib import Path
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+pytest.importorskip("fastapi")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+from fastapi.testclient import TestClient
+import asyncio
+import server
+from services.agent_router import AgentRouter, parse_variants
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """TestClient with a fresh in-memory database and no Letta warm-up"""
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["test_database"])
+    monkeypatch.setattr(server.letta_service, "start_warmup", lambda *a, **k: None)
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def parse_sse(body: str):
+    """Split an SSE body into (event, data) pairs, skipping comments"""
+    frames = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if not line.startswith(":")
+        )
+        if fields:
+            frames.append((fields["event"], json.loads(fields["data"])))
+    return frames
+
+
+def test_status_checks_keyset_pagination(api):
+    """Pages follow (timestamp, id) order and resume after the last id"""
+    created = [api.post("/api/status", json={"client_name": f"c{n}"}).json() for n in range(5)]
+
+    first = api.get("/api/status", params={"limit": 2}).json()
+    second = api.get("/api/status", params={"limit": 2, "after": first[-1]["id"]}).json()
+    rest = api.get("/api/status", params={"limit": 10, "after": second[-1]["id"]}).json()
+
+    assert [c["id"] for c in first + second + rest] == [c["id"] for c in created]
+    assert api.get("/api/status", params={"after": "missing"}).status_code == 400
+
+
+def test_status_checks_store_datetimes(api):
+    """New rows store BSON datetimes; unmigrated string rows still serialize"""
+    legacy = {"id": "legacy", "client_name": "old", "timestamp": "2024-01-01T00:00:00+00:00"}
+    asyncio.run(server.db.status_checks.insert_one(legacy))
+    created = api.post("/api/status", json={"client_name": "new"}).json()
+
+    stored = asyncio.run(server.db.status_checks.find_one({"id": created["id"]}))
+    assert not isinstance(stored["timestamp"], str)
+
+    listed = api.get("/api/status").json()
+    assert listed[0]["id"] == "legacy"
+    assert listed[0]["timestamp"].startswith("2024-01-01T00:00:00")
+    assert listed[1]["client_name"] == "new"
+
+
+def test_status_checks_bulk_ingest(api):
+    """Arrays and NDJSON insert in batches and report failures by position"""
+    records = [{"client_name": f"c{n}"} for n in range(5)] + [{"name": "bad"}]
+    report = api.post("/api/status/bulk", params={"batch_size": 2}, json=records).json()
+    assert (report["received"], report["inserted"], report["failed"]) == (6, 5, 1)
+    assert report["errors"][0]["index"] == 5
+
+    body = '{"client_name": "n0"}\nnot json\n\n{"client_name": "n1"}'
+    report = api.post(
+        "/api/status/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    ).json()
+    assert (report["received"], report["inserted"]) == (3, 2)
+    assert [e["index"] for e in report["errors"]] == [1]
+
+    assert len(api.get("/api/status", params={"limit": 100}).json()) == 7
+    assert api.post("/api/status/bulk", json={"client_name": "x"}).status_code == 400
+
+
+def test_candidates_filters_and_projection(api):
+    """Candidates are unique by email and filter by tech, location and experience"""
+    people = [
+        ("Ada", "Ada@Example.com", 7, "London", ["Python", "Django"]),
+        ("Bo", "bo@example.com", 3, "london ", ["Python", "React"]),
+        ("Cy", "cy@example.com", 5, "Berlin", {"languages": ["Go"], "tools": ["Docker"]}),
+    ]
+    for name, email, years, location, tech in people:
+        response = api.post("/api/candidates", json={
+            "full_name": name, "email": email, "years_experience": years,
+            "current_location": location, "tech_stack": tech
+        })
+        assert response.status_code == 201
+    assert api.post("/api/candidates", json={"email": " ada@example.COM"}).status_code == 409
+    assert api.post("/api/candidates", json={"email": "not-an-email"}).status_code == 422
+
+    london = api.get("/api/candidates", params={"location": "LONDON", "fields": "full_name"}).json()
+    assert [c["full_name"] for c in london] == ["Bo", "Ada"]
+    assert set(london[0]) == {"id", "full_name"}
+
+    python_senior = api.get("/api/candidates", params={"tech": "python", "min_experience": 5}).json()
+    assert [c["full_name"] for c in python_senior] == ["Ada"]
+    either = api.get("/api/candidates", params={"tech": ["react", "go"], "match": "any"}).json()
+    assert [c["full_name"] for c in either] == ["Bo", "Cy"]
+    assert either[1]["tech_stack"] == ["Go", "Docker"]
+
+    page = api.get("/api/candidates", params={"limit": 1, "after": london[0]["id"]}).json()
+    assert [c["full_name"] for c in page] == ["Cy"]
+    updated = api.patch(f"/api/candidates/{page[0]['id']}", json={"current_location": "London"}).json()
+    assert updated["current_location"] == "London"
+    assert len(api.get("/api/candidates", params={"location": "london"}).json()) == 3
+    for field in ("email", "years_experience", "tech_stack", "desired_positions"):
+        assert api.patch(f"/api/candidates/{page[0]['id']}", json={field: None}).status_code == 422
+    cleared = api.patch(f"/api/candidates/{page[0]['id']}", json={"current_location": None}).json()
+    assert cleared["current_location"] is None and cleared["email"] == updated["email"]
+    assert len(api.get("/api/candidates", params={"location": "london"}).json()) == 2
+    assert api.get("/api/candidates", params={"fields": "password"}).status_code == 400
+
+
+def test_candidate_search_uses_index(api):
+    """Faceted search reflects creates, updates and deletes immediately"""
+    ids = [
+        api.post("/api/candidates", json={
+            "email": f"c{n}@example.com", "years_experience": years,
+            "current_location": location, "tech_stack": tech
+        }).json()["id"]
+        for n, (years, location, tech) in enumerate([
+            (1, "Pune", ["Python"]), (4, "Delhi", ["Python", "AWS"]), (8, "Pune", ["Java", "AWS"])
+        ])
+    ]
+    result = api.get("/api/candidates/search", params={"tech": "aws", "location": ["pune", "delhi"]}).json()
+    assert [c["id"] for c in result["candidates"]] == ids[1:]
+    assert result["counts"]["experience_band"] == {"2-5": 1, "5-10": 1}
+
+    api.patch(f"/api/candidates/{ids[0]}", json={"tech_stack": ["AWS"]})
+    api.delete(f"/api/candidates/{ids[2]}")
+    result = api.get("/api/candidates/search", params={"tech": "aws", "fields": "email"}).json()
+    assert result["total"] == 2
+    assert result["candidates"][0] == {"id": ids[0], "email": "c0@example.com"}
+
+
+def test_interview_message_streams_sse(api, monkeypatch):
+    """Agent output arrives as SSE frames and both turns are persisted"""
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        for text in ("Hel", "Hello", "Hello there"):
+            yield {"type": "assistant", "content": text, "partial": True, "message_id": "m1"}
+        yield {"type": "stop", "content": "", "stop_reason": "end_turn"}
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+
+    response = api.post("/api/interviews/s1/messages", json={"content": "Hi"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    frames = parse_sse(response.text)
+    assert frames[-1][0] == "done"
+    assistant = [data for event, data in frames if event == "assistant"]
+    assert assistant[-1]["content"] == "Hello there"
+
+    history = api.get("/api/interviews/s1/messages").json()
+    assert [(m["role"], m["content"]) for m in history] == [("user", "Hi"), ("assistant", "Hello there")]
+
+
+def test_duplicate_submission_replays_the_turn(api, monkeypatch):
+    """A repeated Idempotency-Key streams the recorded turn instead of a new one"""
+    calls = []
+
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        calls.append(message)
+        yield {"type": "assistant", "content": "Hello", "partial": True, "message_id": "m1"}
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    monkeypatch.setattr(server, "turn_submissions", server.SubmissionTable())
+    headers = {"Idempotency-Key": "k1"}
+
+    first = parse_sse(api.post("/api/interviews/s3/messages", json={"content": "Hi"}, headers=headers).text)
+    second = parse_sse(api.post("/api/interviews/s3/messages", json={"content": "Hi"}, headers=headers).text)
+    assert second == first and first[-1][0] == "done"
+    assert calls == ["Hi"]
+    history = api.get("/api/interviews/s3/messages").json()
+    assert [m["role"] for m in history] == ["user", "assistant"]
+
+    conflict = api.post("/api/interviews/s3/messages", json={"content": "Bye"}, headers=headers)
+    assert conflict.status_code == 422
+    metrics = api.get("/api/streams/metrics").json()
+    assert metrics["submissions"]["suppressed_duplicates"] == 1
+
+
+def test_websocket_channel_multiplexes_and_resumes(api, monkeypatch):
+    """A turn sent over the channel can be replayed from a sequence number"""
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        yield {"type": "assistant", "content": f"echo {message}", "partial": True, "message_id": message}
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    monkeypatch.setattr(server, "stream_hub", server.StreamHub())
+
+    with api.websocket_connect("/api/ws") as ws:
+        ws.send_text(json.dumps({"op": "sub", "sid": "watched"}))
+        ws.send_text(json.dumps({"op": "send", "sid": "s2", "content": "hi"}))
+        frames = []
+        while not frames or frames[-1].get("ev", {}).get("type") != "done":
+            frames.append(ws.receive_json())
+
+    assert {f["sid"] for f in frames} == {"s2"}
+    assert [f["seq"] for f in frames] == [1, 2, 3]
+    assert frames[1]["ev"]["content"] == "echo hi"
+
+    with api.websocket_connect("/api/ws") as ws:
+        ws.send_text(json.dumps({"op": "sub", "sid": "s2", "since": 1}))
+        replayed = [ws.receive_json(), ws.receive_json()]
+        ws.send_text(json.dumps({"op": "ping"}))
+        assert ws.receive_json() == {"t": "pong"}
+
+    assert [f["seq"] for f in replayed] == [2, 3]
+
+
+def test_websocket_bad_frames_get_errors_and_keep_the_socket(api, monkeypatch):
+    monkeypatch.setattr(server, "stream_hub", server.StreamHub())
+
+    with api.websocket_connect("/api/ws") as ws:
+        for frame in ([1], {"op": "sub", "sid": ["s1"]}, {"op": "sub", "sid": "s1", "since": "abc"}):
+            ws.send_text(json.dumps(frame))
+            assert ws.receive_json()["t"] == "err"
+        ws.send_text(json.dumps({"op": "sub", "sid": "s1", "since": "0"}))
+        ws.send_text(json.dumps({"op": "ping"}))
+        assert ws.receive_json() == {"t": "pong"}
+
+
+def test_websocket_retry_after_reconnect_replays_the_turn(api, monkeypatch):
+    """A keyed message sent again on a new connection gets the recorded reply"""
+    calls = []
+
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        calls.append(message)
+        yield {"type": "assistant", "content": "Hello", "partial": True, "message_id": "m1"}
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    monkeypatch.setattr(server, "stream_hub", server.StreamHub())
+    monkeypatch.setattr(server, "turn_submissions", server.SubmissionTable())
+
+    def send(content):
+        with api.websocket_connect("/api/ws") as ws:
+            ws.send_text(json.dumps({"op": "send", "sid": "s7", "content": content, "key": "k1"}))
+            frames = []
+            while not frames or frames[-1].get("ev", {}).get("type") != "done":
+                frames.append(ws.receive_json())
+        return [(frame["seq"], frame["ev"]["type"]) for frame in frames]
+
+    first = send("Hi")
+    assert send("Hi") == first
+    assert calls == ["Hi"]
+
+
+def test_websocket_burst_is_coalesced_into_one_turn(api, monkeypatch):
+    """Messages sent in quick succession reach the agent as one multi-part message"""
+    sent = []
+
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        sent.append(message)
+        yield {"type": "assistant", "content": "Noted", "partial": True, "message_id": "m1"}
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    monkeypatch.setattr(server, "stream_hub", server.StreamHub())
+    monkeypatch.setattr(server, "message_coalescer", server.MessageCoalescer(server.run_coalesced_turn, window=0.2))
+
+    with api.websocket_connect("/api/ws") as ws:
+        for content in ("Python", "also Go"):
+            ws.send_text(json.dumps({"op": "send", "sid": "s4", "content": content}))
+        frames = []
+        while not frames or frames[-1].get("ev", {}).get("type") != "done":
+            frames.append(ws.receive_json())
+
+    assert sent == [["Python", "also Go"]]
+    assert frames[0]["ev"]["content"] == "Python\nalso Go"
+    history = api.get("/api/interviews/s4/messages").json()
+    assert [(m["role"], m["content"]) for m in history] == [("user", "Python\nalso Go"), ("assistant", "Noted")]
+
+
+def test_cancelled_coalesced_turn_is_not_replayed(api, monkeypatch):
+    """A retry of a message whose turn was cancelled by a newer one runs again"""
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        if message == "Python":
+            await asyncio.sleep(1)
+        yield {"type": "assistant", "content": "Noted", "partial": True, "message_id": "m1"}
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    monkeypatch.setattr(server, "stream_hub", server.StreamHub())
+    monkeypatch.setattr(server, "turn_submissions", server.SubmissionTable())
+
+    async def scenario():
+        coalescer = server.MessageCoalescer(server.run_coalesced_turn, window=0.01, cancel_running=True)
+        submission, _ = server.claim_submission("s6", "k1", "Python")
+        await coalescer.submit("s6", "Python", submission)
+        await asyncio.sleep(0.1)
+        await coalescer.submit("s6", "also Go")
+        await asyncio.sleep(0.2)
+        return submission, coalescer.summary()
+
+    submission, summary = asyncio.run(scenario())
+    assert summary["cancelled"] == 1
+    assert submission.done and submission.failed
+    assert server.claim_submission("s6", "k1", "Python")[1] is True
+
+
+def test_history_sync_then_restore(api, monkeypatch):
+    """Synced Letta history is served from Mongo as chat turns"""
+    pages = []
+
+    async def list_messages(agent_id, after=None, before=None, limit=100):
+        pages.append((agent_id, after))
+        if after:
+            return []
+        now = datetime.now(timezone.utc)
+        return [  # newest first
+            SimpleNamespace(id="m2", message_type="assistant_message", content="Hi Ada", date=now),
+            SimpleNamespace(id="m2", message_type="reasoning_message", reasoning="Greet", date=now),
+            SimpleNamespace(
+                id="m1", message_type="user_message", content=[{"type": "text", "text": "Hi"}],
+                date=now - timedelta(seconds=1)
+            ),
+        ]
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "async_client", SimpleNamespace(
+        agents=SimpleNamespace(messages=SimpleNamespace(list=list_messages))
+    ))
+    assert api.get("/api/history/agent-1").status_code == 404
+
+    report = api.post("/api/history/sync", json={"agent_ids": ["agent-1"]}).json()
+    assert (report["agents"], report["failed"], report["messages"]) == (1, 0, 3)
+    history = api.get("/api/history/agent-1").json()
+    assert [(m["role"], m["content"]) for m in history["messages"]] == [("user", "Hi"), ("assistant", "Hi Ada")]
+
+    assert api.post("/api/history/sync", json={"agent_ids": ["agent-1"]}).json()["messages"] == 0
+    assert pages == [("agent-1", None), ("agent-1", "m2")]
+
+
+def test_interview_message_requires_connection(api, monkeypatch):
+    monkeypatch.setattr(server.letta_service, "is_connected", False)
+    response = api.post("/api/interviews/s1/messages", json={"content": "Hi"})
+    assert response.status_code == 503
+
+
+def test_evaluation_grades_transcript_and_updates_candidate(api, monkeypatch):
+    """Answers come from the stored transcript; results land on the candidate"""
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        assert agent_id == "grader"
+        reply = "Solid answer." if message.startswith("Summarize") else '{"score": 12, "feedback": "Clear"}'
+        yield {"type": "assistant", "content": reply, "message_id": "m1"}
+
+    monkeypatch.setattr(server, "evaluation_agents", server.AgentPool(["grader"]))
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    transcript = [
+        ("assistant", "Which technologies are in your tech stack?"), ("user", "Python"),
+        ("assistant", "What does a Python decorator do?"), ("user", "It wraps a function."),
+    ]
+    for role, content in transcript:
+        asyncio.run(server.db.interview_messages.insert_one(
+            server.InterviewMessage(session_id="s1", role=role, content=content).model_dump()
+        ))
+    candidate = api.post("/api/candidates", json={
+        "full_name": "Ada", "email": "ada@example.com", "years_experience": 7, "tech_stack": ["Python"]
+    }).json()
+
+    job = api.post("/api/evaluations", json={"session_id": "s1", "candidate_id": candidate["id"]})
+    assert job.status_code == 202
+    assert job.json()["progress"] == {"total": 1, "graded": 0, "failed": 0}
+
+    for _ in range(100):
+        result = api.get(f"/api/evaluations/{job.json()['id']}").json()
+        if result["status"] == "completed":
+            break
+        time.sleep(0.01)
+    assert result["status"] == "completed" and result["overall_score"] == 10.0
+    assert result["answers"][0]["question"] == "What does a Python decorator do?"
+    stored = api.get(f"/api/candidates/{candidate['id']}").json()
+    assert stored["evaluation"]["summary"] == "Solid answer."
+
+    assert api.get("/api/evaluations/missing").status_code == 404
+    assert api.post("/api/evaluations", json={"session_id": "empty"}).status_code == 400
+
+
+def test_concluded_interview_is_evaluated_automatically(api, monkeypatch):
+    """The turn that reaches the conclusion stage queues one evaluation job"""
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        if agent_id == "grader":
+            reply = "Solid answer." if message.startswith("Summarize") else '{"score": 7, "feedback": "Clear"}'
+        else:
+            replies.append(message)
+            reply = "What is a generator?" if len(replies) == 1 else "Thank you, the team will be in touch."
+        yield {"type": "assistant", "content": reply, "message_id": "m1"}
+
+    replies = []
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    monkeypatch.setattr(server, "evaluation_agents", server.AgentPool(["grader"]))
+    monkeypatch.setattr(server, "TECHNICAL_QUESTION_TURNS", 2)
+    transcript = [
+        ("assistant", "Which technologies are in your tech stack?"), ("user", "Python"),
+        ("assistant", "What does a Python decorator do?"),
+    ]
+    for role, content in transcript:
+        asyncio.run(server.db.interview_messages.insert_one(
+            server.InterviewMessage(session_id="s1", role=role, content=content).model_dump()
+        ))
+
+    def evaluations():
+        return asyncio.run(server.db.evaluations.find({"session_id": "s1"}, {"_id": 0}).to_list(None))
+
+    api.post("/api/interviews/s1/messages", json={"content": "It wraps a function."})
+    time.sleep(0.05)
+    assert evaluations() == []  # one technical answer of two
+
+    api.post("/api/interviews/s1/messages", json={"content": "A function that yields values lazily."})
+    for _ in range(100):
+        jobs = evaluations()
+        if jobs and jobs[0]["status"] == "completed":
+            break
+        time.sleep(0.01)
+    assert len(jobs) == 1 and jobs[0]["overall_score"] == 7.0
+    assert [answer["question"] for answer in jobs[0]["answers"]] == [
+        "What does a Python decorator do?", "What is a generator?"
+    ]
+
+    api.post("/api/interviews/s1/messages", json={"content": "bye"})
+    time.sleep(0.05)
+    assert len(evaluations()) == 1
+
+
+
+def test_concluded_gateway_session_completes_its_variant(api, monkeypatch):
+    """Sessions served by the backend count towards their variant's completion rate"""
+    async def fake_stream(message, stream_tokens=True, agent_id=None):
+        yield {"type": "assistant", "content": "Thanks, goodbye!", "message_id": "m1"}
+
+    monkeypatch.setattr(server.letta_service, "is_connected", True)
+    monkeypatch.setattr(server.letta_service, "send_message_stream_async", fake_stream)
+    monkeypatch.setattr(server.letta_service, "router", AgentRouter(parse_variants("control=agent-a", "agent-a")))
+    monkeypatch.setattr(server, "evaluation_agents", None)
+
+    api.post("/api/interviews/s9/messages", json={"content": "Hello"})
+    api.post("/api/interviews/s9/messages", json={"content": "bye"})
+    for _ in range(100):
+        control = server.letta_service.router.report()["variants"]["control"]
+        if control["completion_rate"]:
+            break
+        time.sleep(0.01)
+    assert control["sessions"] == 1 and control["completion_rate"] == 1.0
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,186 @@
+"""Test offline batch screening of stored transcripts"""
+import pytest
+from pathlib import Path
+import asyncio
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.batch_screening import (
+    BatchScreening,
+    JsonlResults,
+    iter_files,
+    iter_store,
+    local_grade,
+    open_results,
+    parse_export,
+)
+
+TXT_EXPORT = """TalentScout AI Hiring Assistant - Chat Export
+Exported on: 2026-01-01 10:00:00
+================================================================================
+
+[Assistant Response #1]
+Reasoning: ask for the stack
+Which technologies are in your tech stack?
+
+--------------------------------------------------------------------------------
+
+[User Message #2]
+Python and Django
+
+--------------------------------------------------------------------------------
+
+[Assistant Response #3]
+How does the Django ORM avoid N+1 queries?
+
+--------------------------------------------------------------------------------
+
+[User Message #4]
+With select_related and prefetch_related.
+
+--------------------------------------------------------------------------------
+
+"""
+
+MD_EXPORT = """# TalentScout AI Hiring Assistant - Chat Export
+
+**Exported on:** 2026-01-01 10:00:00
+
+---
+
+## 🤖 Assistant Response #1
+
+*💭 Reasoning: technical question*
+
+What is a Python generator?
+
+---
+
+## 👤 User Message #2
+
+A function that yields values lazily.
+
+---
+
+"""
+
+
+def write_transcripts(folder: Path, count: int):
+    for n in range(count):
+        (folder / f"t{n:02d}.txt").write_text(TXT_EXPORT)
+    return [str(folder / f"t{n:02d}.txt") for n in range(count)]
+
+
+def test_exports_parse_to_messages():
+    messages = parse_export(TXT_EXPORT)
+    assert [m["role"] for m in messages] == ["assistant", "user", "assistant", "user"]
+    assert messages[0]["content"] == "Which technologies are in your tech stack?"
+    assert messages[3]["content"] == "With select_related and prefetch_related."
+
+    assert parse_export(MD_EXPORT) == [
+        {"role": "assistant", "content": "What is a Python generator?"},
+        {"role": "user", "content": "A function that yields values lazily."},
+    ]
+
+
+def test_candidate_files_keep_known_fields(tmp_path):
+    path = tmp_path / "ada.json"
+    path.write_text(json.dumps({
+        "session_id": "s-ada",
+        "full_name": "Ada Lovelace",
+        "timestamp": "2026-01-01T10:00:00",
+        "messages": parse_export(MD_EXPORT),
+    }))
+    (transcript,) = iter_files([tmp_path])
+    assert transcript.id == "s-ada"
+    assert transcript.candidate == {"full_name": "Ada Lovelace"}
+
+
+def test_store_yields_one_transcript_per_session():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+
+    async def scenario():
+        await db.interview_messages.insert_many([
+            {"session_id": "b", "role": "user", "content": "second", "timestamp": 2},
+            {"session_id": "a", "role": "assistant", "content": "What is your email?", "timestamp": 1},
+            {"session_id": "b", "role": "assistant", "content": "first", "timestamp": 1},
+            {"session_id": "a", "role": "user", "content": "a@example.com", "timestamp": 2},
+        ])
+        return [transcript async for transcript in iter_store(db)]
+
+    first, second = asyncio.run(scenario())
+    assert (first.id, first.candidate) == ("a", {"email": "a@example.com"})
+    assert [m["content"] for m in second.messages] == ["first", "second"]
+
+
+def test_local_grade_rewards_detail_and_coverage():
+    question = "How does the Django ORM avoid N+1 queries?"
+    short, _ = asyncio.run(local_grade(question, "dunno", {}))
+    full, feedback = asyncio.run(local_grade(question, "To avoid extra queries the Django ORM joins with select_related " * 4, {}))
+    assert short < 1 and full == 10.0
+    assert "3/3 key terms" in feedback
+
+
+def test_run_writes_jsonl_and_resumes(tmp_path):
+    """A rerun skips written transcripts, drops a torn row and retries failures"""
+    paths = write_transcripts(tmp_path, 5)
+    output = tmp_path / "out" / "results.jsonl"
+    calls = []
+
+    async def flaky(question, answer, candidate):
+        calls.append(question)
+        if len(calls) in (2, 3):
+            raise RuntimeError("agent unavailable")
+        return 7.0, "ok"
+
+    first = asyncio.run(BatchScreening(flaky, open_results(output), workers=1, max_attempts=2).run(iter_files(paths)))
+    assert first["scored"] == 4 and first["failed"] == 1
+
+    with open(output, "a") as handle:
+        handle.write('{"transcript_id": "half')  # interrupted mid-write
+    second = asyncio.run(BatchScreening(local_grade, open_results(output)).run(iter_files(paths)))
+    assert second["skipped"] == 4 and second["scored"] == 1 and second["failed"] == 0
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(row["transcript_id"] for row in rows) == sorted(paths)
+    assert rows[0]["answers"][0]["question"] == "How does the Django ORM avoid N+1 queries?"
+    assert rows[0]["overall_score"] == 7.0 and rows[0]["progress"]["graded"] == 1
+    assert JsonlResults(output).completed() == set(paths)
+
+
+def test_concurrency_cap_applies_across_transcripts(tmp_path):
+    paths = write_transcripts(tmp_path, 8)
+    state = {"in_flight": 0, "peak": 0}
+
+    async def slow(question, answer, candidate):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        return 5.0, "ok"
+
+    screening = BatchScreening(slow, open_results(tmp_path / "r.jsonl"), workers=6, concurrency=3)
+    report = asyncio.run(screening.run(iter_files(paths)))
+    assert report["scored"] == 8 and state["peak"] == 3
+    assert report["transcripts_per_second"] > 0
+
+
+def test_parquet_parts_resume(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    paths = write_transcripts(tmp_path, 5)
+    output = tmp_path / "results.parquet"
+
+    asyncio.run(BatchScreening(local_grade, open_results(output, rows_per_part=2)).run(iter_files(paths[:3])))
+    report = asyncio.run(BatchScreening(local_grade, open_results(output, rows_per_part=2)).run(iter_files(paths)))
+    assert report["skipped"] == 3 and report["scored"] == 2
+
+    table = pq.read_table(output)
+    assert sorted(table.column("transcript_id").to_pylist()) == sorted(paths)
+    assert table.column("answers_graded").to_pylist() == [1] * 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,64 @@
+"""Test the in-memory candidate search index"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.candidate_index import CandidateIndex
+
+
+def candidate(candidate_id, tech, location, years, positions=()):
+    return {
+        "id": candidate_id,
+        "tech_stack": list(tech),
+        "current_location": location,
+        "years_experience": years,
+        "desired_positions": list(positions),
+    }
+
+
+@pytest.fixture
+def index():
+    index = CandidateIndex()
+    index.upsert(candidate("a", ["Python", "Django"], "London", 7, ["Backend Engineer"]))
+    index.upsert(candidate("b", ["Python", "React"], "Berlin", 3, ["Full Stack"]))
+    index.upsert(candidate("c", ["Go", "Docker"], "london", 12, ["Backend Engineer"]))
+    return index
+
+
+def test_and_or_queries_with_counts(index):
+    """Facets AND together; any_of ORs values; counts cover the result set"""
+    result = index.search(all_of={"tech_stack": ["python"]}, any_of={"current_location": ["LONDON"]})
+    assert result["ids"] == ["a"] and result["total"] == 1
+
+    result = index.search(any_of={"tech_stack": ["react", "go"], "experience_band": ["10+", "2-5"]})
+    assert result["ids"] == ["b", "c"]
+    assert result["counts"]["current_location"] == {"berlin": 1, "london": 1}
+
+    everyone = index.search(limit=1, offset=1)
+    assert everyone["total"] == 3 and everyone["ids"] == ["b"]
+    assert everyone["counts"]["desired_positions"]["backend engineer"] == 2
+
+
+def test_incremental_update_and_remove(index):
+    """Upserts replace old postings; removed slots are reused"""
+    index.upsert(candidate("b", ["Go"], "Paris", 1))
+    assert index.search(all_of={"tech_stack": ["python"]})["ids"] == ["a"]
+    assert index.search(any_of={"current_location": ["berlin"]})["total"] == 0
+
+    assert index.remove("a") and not index.remove("a")
+    index.upsert(candidate("d", ["Rust"], "Oslo", 4))
+    assert index.slots["d"] == 0 and len(index) == 3
+    assert "python" not in index.postings["tech_stack"]
+    bulk = CandidateIndex()
+    bulk.upsert_many([candidate("a", ["Go"], "Oslo", 1), candidate("b", ["Go"], "Oslo", 1),
+                      candidate("a", ["Rust"], "Oslo", 1)])
+    assert bulk.search(all_of={"tech_stack": ["go"]})["ids"] == ["b"]
+    assert bulk.search(any_of={"tech_stack": ["rust"]})["ids"] == ["a"]
+    with pytest.raises(ValueError):
+        index.search(all_of={"salary": ["high"]})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+"""Test the Letta circuit breaker state machine"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.circuit_breaker import BreakerState, CircuitBreaker, percentile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **kwargs):
+    options = dict(error_rate=0.5, p95_seconds=5.0, window_seconds=60, min_calls=4, open_seconds=30, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def test_trips_on_error_rate():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for ok in (True, False, True):
+        breaker.allow_request()
+        (breaker.record_success if ok else breaker.record_failure)(0.2)
+    assert breaker.state == BreakerState.CLOSED  # below min_calls
+
+    assert breaker.allow_request()
+    breaker.record_failure(0.2, "timeout")
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.allow_request() is None
+    assert breaker.available() is False
+    assert "error rate 50%" in breaker.transitions[-1]["reason"]
+
+
+def test_trips_on_p95_latency():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for seconds in (0.5, 0.6, 0.4, 9.0):
+        breaker.allow_request()
+        breaker.record_success(seconds)
+    assert breaker.state == BreakerState.OPEN
+    assert "p95 latency" in breaker.transitions[-1]["reason"]
+
+
+def test_old_calls_leave_the_window():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure(0.1)
+    clock.now = 120
+    for _ in range(3):
+        breaker.record_success(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock, min_calls=1)
+    breaker.record_failure(0.1, "down")
+    assert breaker.state == BreakerState.OPEN
+
+    clock.now = 31
+    assert breaker.available()
+    probe = breaker.allow_request()
+    assert probe
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow_request() is None  # one probe at a time
+    breaker.record_failure(0.1, "still down", probe)
+    assert breaker.state == BreakerState.OPEN
+
+    clock.now = 62
+    probe = breaker.allow_request()
+    breaker.record_success(0.3, probe)
+    assert breaker.state == BreakerState.CLOSED
+    assert [(t["from"], t["to"]) for t in breaker.transitions] == [
+        ("closed", "open"),
+        ("open", "half_open"),
+        ("half_open", "open"),
+        ("open", "half_open"),
+        ("half_open", "closed"),
+    ]
+
+
+def test_only_the_admitted_probe_decides_half_open():
+    """A call admitted before the breaker opened cannot close it when it finishes late"""
+    clock = FakeClock()
+    breaker = make_breaker(clock, min_calls=1)
+    stale = breaker.allow_request()
+    breaker.allow_request()
+    breaker.record_failure(0.1, "down")
+    assert breaker.state == BreakerState.OPEN
+
+    clock.now = 31
+    probe = breaker.allow_request()
+    assert probe.probe is not None and stale.probe is None
+    breaker.record_success(0.2, stale)
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow_request() is None  # the probe slot is still taken
+    breaker.record_failure(0.1, "still down", probe)
+    assert breaker.state == BreakerState.OPEN
+
+    clock.now = 62
+    late_probe, probe = probe, breaker.allow_request()
+    breaker.record_success(0.2, late_probe)  # probe of the previous period
+    assert breaker.state == BreakerState.HALF_OPEN
+    breaker.record_success(0.2, probe)
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_released_probe_frees_its_slot():
+    clock = FakeClock()
+    breaker = make_breaker(clock, min_calls=1)
+    breaker.record_failure(0.1, "down", breaker.allow_request())
+    clock.now = 31
+    probe = breaker.allow_request()
+    assert breaker.allow_request() is None
+    breaker.release(probe)
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow_request() is not None
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 0.95) == 0.0
+    assert percentile(list(range(1, 101)), 0.95) == 95
+    assert percentile([3.0], 0.95) == 3.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,158 @@
+"""Test endpoint selection and failover against local stand-in Letta servers"""
+import pytest
+from pathlib import Path
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+pytest.importorskip("letta_client")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from services.endpoint_pool import EndpointPool, parse_endpoints
+from services.letta_service import LettaService
+
+EVENTS = [
+    {"message_type": "assistant_message", "id": "m1", "date": "2026-01-01T00:00:00Z", "content": "Hello"},
+    {"message_type": "stop_reason", "stop_reason": "end_turn"},
+]
+
+
+class StandIn:
+    """Letta stand-in with an injected time to first event, or failing with ``status``"""
+
+    def __init__(self, latency: float = 0.0, status: int = 200):
+        self.latency = latency
+        self.status = status
+        self.streams = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self.reply(stand_in.status, {"version": "test", "status": "ok"})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["content-length"]))
+                stand_in.streams += 1
+                if stand_in.status != 200:
+                    return self.reply(stand_in.status, {"detail": "unavailable"})
+                time.sleep(stand_in.latency)
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.end_headers()
+                for event in EVENTS:
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stand_ins(monkeypatch):
+    servers = {"down": StandIn(status=503), "slow": StandIn(latency=0.3), "fast": StandIn(latency=0.02)}
+    monkeypatch.setattr(settings, "letta_base_urls", ",".join(server.url for server in servers.values()))
+    yield servers
+    for server in servers.values():
+        server.server.shutdown()
+        server.server.server_close()
+
+
+def test_connect_builds_the_async_client(monkeypatch):
+    """The SSE gateway's async path streams through the client built by connect()"""
+    stand_in = StandIn()
+    monkeypatch.setattr(settings, "letta_base_urls", "")
+    monkeypatch.setattr(settings, "letta_base_url", stand_in.url)
+    try:
+        service = LettaService()
+        assert service.connect()
+        assert service.async_client is service.async_clients[stand_in.url]
+
+        async def turn():
+            return [event async for event in service.send_message_stream_async("hi")]
+
+        events = asyncio.run(turn())
+        assert [e["content"] for e in events if e["type"] == "assistant"] == ["Hello"]
+        assert events[-1]["type"] == "stop" and stand_in.streams == 1
+    finally:
+        stand_in.server.shutdown()
+        stand_in.server.server_close()
+
+
+def test_pool_ranks_by_latency_and_health():
+    now = [0.0]
+    pool = EndpointPool(["a", "b", "c"], failure_threshold=2, sample_ttl=60, clock=lambda: now[0])
+    assert pool.ranked() == ["a", "b", "c"]
+
+    pool.record_success("a", 2.0)
+    pool.record_success("b", 1.0)
+    pool.record_probe("c", 0.05)
+    assert pool.ranked() == ["c", "b", "a"]  # c is unmeasured: try it next
+
+    pool.record_success("c", 3.0)
+    pool.record_failure("b", "refused")
+    assert pool.ranked()[0] == "b"  # one failure is tolerated
+    pool.record_failure("b", "refused")
+    assert pool.ranked() == ["a", "c", "b"]
+
+    now[0] = 120.0  # samples expired: endpoints rank by probe latency again
+    pool.record_probe("b", 0.01)
+    assert pool.ranked() == ["a", "b", "c"] and pool.stats["b"].healthy
+    assert parse_endpoints("", "https://api.letta.com/") == ["https://api.letta.com"]
+
+
+def test_streams_fail_over_and_prefer_the_fastest(stand_ins):
+    service = LettaService()
+    assert service.connect()
+
+    # Nothing measured yet: the first endpoint fails before its first event
+    events = list(service.send_message_stream("hi"))
+    assert [e["content"] for e in events if e["type"] == "assistant"] == ["Hello"]
+    assert stand_ins["down"].streams == 1
+
+    service.probe_endpoints()
+    for _ in range(4):
+        assert list(service.send_message_stream("hi"))[0]["type"] == "assistant"
+
+    snapshot = service.get_status()["endpoints"]
+    assert snapshot[0]["url"] == stand_ins["fast"].url
+    assert snapshot[-1]["url"] == stand_ins["down"].url and not snapshot[-1]["healthy"]
+    assert stand_ins["fast"].streams >= 3 and stand_ins["down"].streams == 1
+    assert service.breaker.snapshot()["error_rate"] == 0.0
+
+
+def test_async_streams_fail_over(stand_ins):
+    stand_ins["slow"].status = 503
+    service = LettaService()
+    assert service.connect()
+
+    async def turn():
+        return [event async for event in service.send_message_stream_async("hi")]
+
+    events = asyncio.run(turn())
+    assert events[0] == {"type": "assistant", "content": "Hello", "partial": True, "message_id": "m1"}
+    assert stand_ins["down"].streams == stand_ins["slow"].streams == stand_ins["fast"].streams == 1
+
+    stand_ins["fast"].status = 503
+    events = asyncio.run(turn())
+    assert events[-1]["type"] == "error" and "503" in events[-1]["content"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
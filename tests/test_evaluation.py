@@ -0,0 +1,189 @@
+"""Test the post-interview evaluation pipeline against an in-memory Mongo"""
+import pytest
+from pathlib import Path
+import asyncio
+import sys
+from datetime import timedelta
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.evaluation import (
+    COMPLETED,
+    FAILED,
+    GRADED,
+    PENDING,
+    RUNNING,
+    AgentPool,
+    EvaluationPipeline,
+    LeaseLost,
+    job_progress,
+    new_job,
+    utcnow,
+)
+
+ANSWERS = [{"question": f"Q{n}?", "answer": f"A{n}"} for n in range(6)]
+
+
+class FakeGrader:
+    """Scores every answer 6 after a short delay, tracking concurrency"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, question, answer, candidate):
+        self.calls.append(question)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if question in self.fail:
+                raise RuntimeError("agent unavailable")
+            return 6.0, "fine"
+        finally:
+            self.in_flight -= 1
+
+
+async def summarize(job):
+    return f"{len(job['answers'])} answers"
+
+
+def pipeline(collection, grader, finalized, **kw):
+    async def finalize(job):
+        finalized.append(job["id"])
+        return "cand-1"
+    return EvaluationPipeline(collection, grader, summarize, finalize, sweep_seconds=0, **kw)
+
+
+async def wait_for(collection, job_id, status=COMPLETED):
+    for _ in range(200):
+        job = await collection.find_one({"id": job_id}, {"_id": 0})
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job['status']}")
+
+
+def test_jobs_are_graded_under_the_concurrency_cap():
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["test"].evaluations
+        grader, finalized = FakeGrader(), []
+        evaluations = pipeline(collection, grader, finalized, workers=2, concurrency=3)
+        await evaluations.start()
+        jobs = [await evaluations.submit(new_job(f"s{n}", ANSWERS)) for n in range(2)]
+        done = [await wait_for(collection, job["id"]) for job in jobs]
+        await evaluations.stop()
+        return grader, finalized, done
+
+    grader, finalized, done = asyncio.run(scenario())
+    assert len(grader.calls) == 12 and grader.peak == 3
+    assert len(finalized) == 2
+    for job in done:
+        assert job_progress(job) == {"total": 6, "graded": 6, "failed": 0}
+        assert job["overall_score"] == 6.0 and job["summary"] == "6 answers"
+        assert job["candidate_id"] == "cand-1" and job["lease_until"] is None
+
+
+def test_interrupted_job_resumes_from_the_first_ungraded_answer():
+    """A running job whose lease expired is picked up without regrading"""
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["test"].evaluations
+        job = new_job("s1", ANSWERS)
+        job["status"] = RUNNING
+        job["lease_until"] = utcnow() - timedelta(seconds=1)
+        for answer in job["answers"][:4]:
+            answer.update(status=GRADED, score=9.0, feedback="good", attempts=1)
+        await collection.insert_one(dict(job))
+
+        # A job still leased by a live worker is left alone
+        held = new_job("s2", ANSWERS)
+        held["status"] = RUNNING
+        held["lease_until"] = utcnow() + timedelta(minutes=5)
+        await collection.insert_one(dict(held))
+
+        grader, finalized = FakeGrader(), []
+        evaluations = pipeline(collection, grader, finalized)
+        resumed = await evaluations.start()
+        done = await wait_for(collection, job["id"])
+        await evaluations.stop()
+        return resumed, grader, done
+
+    resumed, grader, done = asyncio.run(scenario())
+    assert resumed == 1
+    assert grader.calls == ["Q4?", "Q5?"]
+    assert done["overall_score"] == pytest.approx((4 * 9 + 2 * 6) / 6, abs=0.01)
+
+
+def test_failed_answers_are_retried_then_skipped():
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["test"].evaluations
+        grader, finalized = FakeGrader(fail={"Q0?"}), []
+        evaluations = pipeline(collection, grader, finalized, max_attempts=2)
+        job = await evaluations.submit(new_job("s1", ANSWERS[:2]))
+        return grader, await evaluations.run(job["id"])
+
+    grader, done = asyncio.run(scenario())
+    assert grader.calls.count("Q0?") == 2
+    first, second = done["answers"]
+    assert first["status"] == FAILED and first["error"] == "agent unavailable"
+    assert second["status"] == GRADED
+    assert done["overall_score"] == 6.0
+
+
+def test_agent_pool_gives_each_call_its_own_reset_agent():
+    """Calls never share an agent at once, and each agent is reset after every call"""
+    events = []
+
+    async def reset(agent_id):
+        events.append(("reset", agent_id))
+
+    async def scenario():
+        agents = AgentPool(["e1", "e2"], reset=reset)
+        busy = set()
+
+        async def call(n):
+            async with agents.use() as agent_id:
+                assert agent_id not in busy
+                busy.add(agent_id)
+                events.append(("call", agent_id))
+                await asyncio.sleep(0.01)
+                busy.discard(agent_id)
+
+        await asyncio.gather(*(call(n) for n in range(6)))
+
+    asyncio.run(scenario())
+    calls = [agent_id for kind, agent_id in events if kind == "call"]
+    assert len(calls) == 6 and set(calls) == {"e1", "e2"}
+    assert sorted(agent_id for kind, agent_id in events if kind == "reset") == sorted(calls)
+
+
+def test_worker_stops_once_its_lease_is_taken():
+    """Writes need the claimed lease; a worker that lost it leaves the job alone"""
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["test"].evaluations
+        grader, finalized = FakeGrader(), []
+        evaluations = pipeline(collection, grader, finalized, concurrency=1)
+        job = await evaluations.submit(new_job("s1", ANSWERS[:3]))
+
+        async def steal(question, answer, candidate):
+            # Another worker reclaims the job while this one is grading
+            await collection.update_one({"id": job["id"]}, {"$set": {"lease_owner": "other"}})
+            return await grader(question, answer, candidate)
+
+        evaluations.grade = steal
+        with pytest.raises(LeaseLost):
+            await evaluations.run(job["id"])
+        return grader, finalized, await collection.find_one({"id": job["id"]}, {"_id": 0})
+
+    grader, finalized, stored = asyncio.run(scenario())
+    assert len(grader.calls) < 3 and finalized == []  # the job's other calls are cancelled
+    assert [answer["status"] for answer in stored["answers"]] == [PENDING] * 3
+    assert stored["lease_owner"] == "other" and stored["summary"] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,162 @@
+"""Test local extraction of candidate details"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.constants import InfoFields
+from utils.extraction import (
+    CandidateRecord,
+    InterviewMetrics,
+    extract_fields,
+    extract_phone,
+    extract_years_experience,
+    technical_answers,
+)
+
+
+def test_volunteered_details_are_extracted():
+    """One reply can fill several fields from explicit cues"""
+    fields = extract_fields(
+        "Hi, I'm Priya Sharma (priya.s@example.com, +91 98765 43210). "
+        "5 years of Python and Django, based in Pune, applying for backend engineer roles."
+    )
+    assert fields == {
+        InfoFields.FULL_NAME: "Priya Sharma",
+        InfoFields.EMAIL: "priya.s@example.com",
+        InfoFields.PHONE: "+91 98765 43210",
+        InfoFields.YEARS_EXPERIENCE: 5.0,
+        InfoFields.CURRENT_LOCATION: "Pune",
+        InfoFields.DESIRED_POSITIONS: ["backend engineer"],
+        InfoFields.TECH_STACK: ["Python", "Django"],
+    }
+
+
+@pytest.mark.parametrize("text,years", [
+    ("I have 3+ yrs of experience", 3.0),
+    ("I'm 25 years old with two years in QA", 2.0),
+    ("about six months", 0.5),
+    ("I'm a fresher", 0.0),
+    ("Graduated 4 years ago", None),
+])
+def test_years_of_experience(text, years):
+    assert extract_years_experience(text) == years
+
+
+def test_short_replies_answer_the_last_question():
+    """Bare answers are attributed to the field the agent just asked for"""
+    assert extract_fields("john doe", "Thanks! What is your full name?") == {InfoFields.FULL_NAME: "John Doe"}
+    assert extract_fields("Bengaluru", "Where are you currently located?") == {
+        InfoFields.CURRENT_LOCATION: "Bengaluru"
+    }
+    assert extract_fields("7", "How many years of experience do you have?") == {
+        InfoFields.YEARS_EXPERIENCE: 7.0
+    }
+    assert extract_fields("Bengaluru") == {}
+    assert extract_phone("I worked there from 2015-2020") is None
+
+
+@pytest.mark.parametrize("text,question", [
+    ("I am Python developer with 5 years experience", None),
+    ("I'm Senior Engineer at Google", None),
+    ("I'm Java", None),
+    ("yes", "Could you tell me your full name?"),
+    ("not sure yet", "Where are you currently located?"),
+    ("I don't know", "Which positions are you interested in?"),
+    ("Senior Engineer", "What is your name?"),
+])
+def test_titles_tech_and_non_answers_are_not_values(text, question):
+    fields = extract_fields(text, question)
+    assert InfoFields.FULL_NAME not in fields
+    assert InfoFields.CURRENT_LOCATION not in fields
+    assert InfoFields.DESIRED_POSITIONS not in fields
+
+
+def test_short_reply_guess_keeps_the_known_value():
+    """Explicit cues may correct a field; a short-reply guess may not"""
+    record = CandidateRecord()
+    record.update("My name is Priya Sharma and I'm based in Pune")
+    assert record.update("Python", "Sorry, what was your name?") == {InfoFields.TECH_STACK: ["Python"]}
+    assert record.update("Mumbai maybe", "Where are you located?") == {}
+    assert record.fields[InfoFields.FULL_NAME] == "Priya Sharma"
+    assert record.fields[InfoFields.CURRENT_LOCATION] == "Pune"
+    assert record.update("I moved to Mumbai", "Where are you located?") == {InfoFields.CURRENT_LOCATION: "Mumbai"}
+    assert extract_fields("My name is Taylor Swift")[InfoFields.FULL_NAME] == "Taylor Swift"
+
+
+def test_later_cues_do_not_overwrite_held_fields():
+    """Only a reply to the field's own question replaces a held value"""
+    record = CandidateRecord()
+    record.update("I have 5 years of experience and I'm based in Pune")
+    answer = "I spent 2 years migrating our services to Go and Kubernetes. I live in Berlin now."
+    changed = record.update(answer, "Tell me about a migration you led. What did you learn?")
+    assert changed == {InfoFields.TECH_STACK: ["Go", "Kubernetes"]}
+    assert record.fields[InfoFields.YEARS_EXPERIENCE] == 5.0
+    assert record.fields[InfoFields.CURRENT_LOCATION] == "Pune"
+    assert record.update("6 years", "How many years of experience do you have?") == {
+        InfoFields.YEARS_EXPERIENCE: 6.0
+    }
+    assert record.update("ada@example.com", allowed=[InfoFields.TECH_STACK]) == {}
+
+
+def test_record_from_history_reads_only_tech_after_the_stack():
+    messages = [
+        {"role": "assistant", "content": "Which technologies are in your tech stack?"},
+        {"role": "user", "content": "Python"},
+        {"role": "assistant", "content": "What did you build with it?"},
+        {"role": "user", "content": "A Django app over 2 years, from Berlin, ada@example.com"},
+    ]
+    record = CandidateRecord.from_messages(messages)
+    assert record.fields == {InfoFields.TECH_STACK: ["Python", "Django"]}
+
+
+def test_record_context_and_metrics():
+    """The record only shares new details and counts questions skipped"""
+    record = CandidateRecord()
+    record.update("My name is Ada Lovelace, ada@example.com, I know Python")
+    note = record.pending_context()
+    assert "- Email: ada@example.com" in note and "Still needed: phone" in note
+    assert record.pending_context() is None
+
+    record.update("Rust and Python too", "Which technologies do you use?")
+    assert record.fields[InfoFields.TECH_STACK] == ["Python", "Rust"]
+    assert "Tech stack: Python, Rust" in record.pending_context()
+
+    metrics = InterviewMetrics()
+    metrics.record_turn({"prompt_tokens": 900, "completion_tokens": 100, "total_tokens": 1000})
+    summary = metrics.summary(record)
+    assert summary["questions_skipped"] == 2
+    assert summary["tokens_saved_estimate"] == 2000
+
+
+def test_record_rebuilt_from_history():
+    messages = [
+        {"role": "assistant", "content": "What's your email address?"},
+        {"role": "user", "content": "sam@example.com"},
+    ]
+    record = CandidateRecord.from_messages(messages)
+    assert record.fields == {InfoFields.EMAIL: "sam@example.com"}
+    assert record.asked == {InfoFields.EMAIL}
+    assert record.pending_context() is None
+
+
+def test_technical_answers_follow_the_tech_stack():
+    messages = [
+        {"role": "assistant", "content": "What's your email address?"},
+        {"role": "user", "content": "sam@example.com"},
+        {"role": "assistant", "content": "Which technologies are in your tech stack?"},
+        {"role": "user", "content": "Python"},
+        {"role": "assistant", "content": "Great. How does the GIL affect threads?"},
+        {"role": "user", "content": "Only one thread runs bytecode at a time."},
+        {"role": "assistant", "content": "Thanks for your time."},
+        {"role": "user", "content": "Bye"},
+    ]
+    assert technical_answers(messages) == [{
+        "question": "Great. How does the GIL affect threads?",
+        "answer": "Only one thread runs bytecode at a time.",
+    }]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
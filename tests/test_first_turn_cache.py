@@ -0,0 +1,79 @@
+"""Test the cached opening turn"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.first_turn_cache import FirstTurnCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(clock, texts):
+    calls = []
+
+    def generate(key):
+        calls.append(key)
+        text = texts.get(key)
+        return (text, 1.5) if text else None
+
+    return FirstTurnCache(generate, ttl_seconds=60, clock=clock), calls
+
+
+def test_opening_is_generated_once_and_served_instantly():
+    clock = FakeClock()
+    key = ("agent-1", "v1")
+    cache, calls = make_cache(clock, {key: "Hi! What's your full name?"})
+
+    assert cache.get(key) is None
+    assert cache.ensure(key)
+    assert cache.ensure(key)
+    assert calls == [key]
+    assert cache.get(key) == "Hi! What's your full name?"
+
+    summary = cache.summary()
+    assert summary["misses"] == 1 and summary["served"] == 1
+    assert summary["turn_one_ttft_uncached_seconds"] == 1.5
+    assert summary["turn_one_ttft_cached_seconds"] < 0.01
+
+
+def test_stale_opening_is_served_until_refreshed():
+    clock = FakeClock()
+    key = ("agent-1", "v1")
+    cache, calls = make_cache(clock, {key: "Hello!"})
+    cache.ensure(key)
+
+    clock.now += 120
+    assert not cache.is_fresh(key)
+    assert cache.get(key) == "Hello!"
+    cache.ensure(key)
+    assert len(calls) == 2 and cache.is_fresh(key)
+
+
+def test_new_config_version_replaces_old_opening():
+    clock = FakeClock()
+    old, new = ("agent-1", "v1"), ("agent-1", "v2")
+    cache, _ = make_cache(clock, {old: "Old greeting", new: "New greeting"})
+    cache.ensure(old)
+    cache.ensure(new)
+
+    assert cache.get(old) is None
+    assert cache.get(new) == "New greeting"
+
+
+def test_failed_generation_caches_nothing():
+    clock = FakeClock()
+    cache, _ = make_cache(clock, {})
+    assert cache.ensure(("agent-1", "v1")) is False
+    assert cache.summary()["entries"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
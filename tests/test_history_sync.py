@@ -0,0 +1,135 @@
+"""Test incremental Letta history sync into Mongo"""
+import pytest
+from pathlib import Path
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from services.history_sync import HistorySyncer, RateLimiter, load_history
+
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeMessages:
+    """Letta message listing: the most recent ``limit`` messages between the cursors"""
+
+    def __init__(self, fail_on_call=None):
+        self.history = {}
+        self.calls = []
+        self.fail_on_call = fail_on_call
+
+    def add(self, agent_id, count):
+        history = self.history.setdefault(agent_id, [])
+        for _ in range(count):
+            n = len(history)
+            history.append(SimpleNamespace(
+                id=f"{agent_id}-m{n:03d}",
+                message_type="user_message" if n % 2 == 0 else "assistant_message",
+                content=f"text {n}",
+                date=EPOCH + timedelta(seconds=n),
+            ))
+
+    async def list(self, agent_id, after=None, before=None, limit=10):
+        self.calls.append((agent_id, after, before))
+        if self.fail_on_call == len(self.calls):
+            raise ConnectionError("connection reset")
+        if agent_id not in self.history:
+            raise LookupError(f"Agent not found: {agent_id}")
+        history = self.history[agent_id]
+        ids = [message.id for message in history]
+        start = ids.index(after) + 1 if after else 0
+        end = ids.index(before) if before else len(history)
+        return list(reversed(history[start:end][-limit:]))  # newest first
+
+
+def syncer_and_client(**options):
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    messages = FakeMessages()
+    client = SimpleNamespace(agents=SimpleNamespace(messages=messages))
+    return db, messages, client, HistorySyncer(db.letta_messages, db.letta_history_cursors, **options)
+
+
+def test_later_syncs_fetch_only_newer_messages():
+    """The first sync walks the whole history; the next ones stop at the cursor"""
+    async def scenario():
+        db, messages, client, syncer = syncer_and_client(page_size=10, rate=1000)
+        messages.add("a", 25)
+        first = await syncer.sync_agent(client, "a")
+        assert (first["messages"], first["pages"], first["cursor"]) == (25, 3, "a-m024")
+
+        messages.calls.clear()
+        assert (await syncer.sync_agent(client, "a"))["messages"] == 0
+        assert messages.calls == [("a", "a-m024", None)]
+
+        messages.add("a", 3)
+        assert (await syncer.sync_agent(client, "a"))["messages"] == 3
+        assert await db.letta_messages.count_documents({"agent_id": "a"}) == 28
+        history = await load_history(db.letta_messages, "a", limit=2)
+        assert [(item["role"], item["content"]) for item in history] == [
+            ("user", "text 26"), ("assistant", "text 27")
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_walk_resumes_from_its_checkpoint():
+    async def scenario():
+        db, messages, client, syncer = syncer_and_client(page_size=10, rate=1000)
+        messages.add("a", 25)
+        messages.fail_on_call = 2
+        with pytest.raises(ConnectionError):
+            await syncer.sync_agent(client, "a")
+
+        result = await syncer.sync_agent(client, "a")
+        assert messages.calls[2] == ("a", None, "a-m015")  # continues below the first page
+        assert result["cursor"] == "a-m024"
+        assert await db.letta_messages.count_documents({"agent_id": "a"}) == 25
+        state = await db.letta_history_cursors.find_one({"agent_id": "a"})
+        assert state["walk_before"] is None and state["pending_cursor"] is None
+
+    asyncio.run(scenario())
+
+
+def test_agents_sync_concurrently_under_the_rate_limit():
+    """Every list call takes a token; one failing agent does not stop the rest"""
+    async def scenario():
+        db, messages, client, syncer = syncer_and_client(page_size=5, concurrency=3, rate=50, burst=1)
+        for agent_id in ("a", "b", "c"):
+            messages.add(agent_id, 12)
+        started = time.perf_counter()
+        report = await syncer.sync_all(client, ["a", "b", "c", "missing"])
+        return report, time.perf_counter() - started
+
+    report, seconds = asyncio.run(scenario())
+    assert (report["agents"], report["failed"], report["messages"]) == (4, 1, 36)
+    assert report["results"][3] == {"agent_id": "missing", "error": "Agent not found: missing"}
+    # 3 pages per agent plus the failed call, one token each at 50 per second
+    assert report["pages"] == 9 and seconds >= 9 / 50
+
+
+def test_rate_limiter_allows_a_burst_then_paces():
+    now = [0.0]
+
+    async def scenario():
+        limiter = RateLimiter(rate=2, burst=2, clock=lambda: now[0])
+        await limiter.acquire()
+        await limiter.acquire()
+        assert limiter.waited == 0
+        now[0] = 0.25
+        task = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        now[0] = 0.5
+        await task
+        return limiter.waited
+
+    assert asyncio.run(scenario()) == pytest.approx(0.25)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+"""Test the submission table behind idempotent message submission"""
+import pytest
+from pathlib import Path
+import asyncio
+import sys
+import threading
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.idempotency import IdempotencyConflict, SubmissionTable, fingerprint, turn_key
+
+
+def test_duplicates_attach_until_the_turn_expires():
+    """A duplicate replays the recorded turn; after the TTL the key is new again"""
+    now = [0.0]
+    table = SubmissionTable(ttl=10, clock=lambda: now[0])
+    submission, created = table.claim("k1", fingerprint("hi"))
+    assert created
+    submission.publish("a")
+
+    duplicate, created = table.claim("k1", fingerprint("hi"))
+    assert duplicate is submission and not created
+    follower = duplicate.follow()
+    assert next(follower) == "a"
+    submission.publish("b")
+    table.finish(submission)
+    assert list(follower) == ["b"]
+    assert table.summary() == {"in_flight": 0, "completed": 1, "started": 1, "suppressed_duplicates": 1}
+
+    with pytest.raises(IdempotencyConflict):
+        table.claim("k1", fingerprint("something else"))
+
+    now[0] = 11
+    assert table.claim("k1", fingerprint("hi"))[1] is True
+
+
+def test_failed_turns_are_forgotten_and_errors_reach_followers():
+    """A retry after a failure runs the turn again; attached followers see the error"""
+    table = SubmissionTable()
+    submission, _ = table.claim("k1", "f")
+    follower = table.claim("k1", "f")[0].follow()
+    submission.publish({"type": "reasoning"})
+    table.finish(submission, error=ConnectionError("down"))
+
+    assert next(follower) == {"type": "reasoning"}
+    with pytest.raises(ConnectionError):
+        next(follower)
+    retry, created = table.claim("k1", "f")
+    assert created and retry is not submission
+
+
+def test_async_followers_are_woken_from_other_threads():
+    """An event loop follower receives events published by a worker thread"""
+    table = SubmissionTable()
+    submission, _ = table.claim("k1", "f")
+
+    def produce():
+        for event in ("a", "b", "c"):
+            submission.publish(event)
+        table.finish(submission)
+
+    async def follow():
+        threading.Timer(0.05, produce).start()
+        return [event async for event in submission.follow_async()]
+
+    assert asyncio.run(asyncio.wait_for(follow(), timeout=2)) == ["a", "b", "c"]
+
+
+def test_turn_key_changes_once_the_agent_replied():
+    messages = [{"role": "assistant", "content": "Hi"}, {"role": "user", "content": "Python"}]
+    key = turn_key("s1", messages, "Python")
+    assert turn_key("s1", messages[:1], "Python") == key
+    assert turn_key("s1", messages + [{"role": "assistant", "content": "Nice"}], "Python") != key
+    assert turn_key("s2", messages, "Python") != key
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
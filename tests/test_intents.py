@@ -0,0 +1,73 @@
+"""Test local intent classification"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.constants import Intent
+from utils.helpers import is_exit_keyword
+from utils.intents import IntentStats, answer_locally, classify_intent
+
+
+@pytest.mark.parametrize("text,intent", [
+    ("bye", Intent.EXIT),
+    ("OK, thanks! Goodbye.", Intent.EXIT),
+    ("that's all, see you", Intent.EXIT),
+    ("I will attend the meeting", Intent.OTHER),
+    ("I had to stop using Java at my last job", Intent.OTHER),
+    ("Hi there!", Intent.GREETING),
+    ("hello, can you repeat the question please?", Intent.REPEAT),
+    ("Sorry, what was the question?", Intent.REPEAT),
+    ("help", Intent.HELP),
+    ("How does this work?", Intent.HELP),
+    ("  ...  ", Intent.EMPTY),
+    ("thanks", Intent.ACKNOWLEDGE),
+    ("Thank you so much!", Intent.ACKNOWLEDGE),
+    ("thanks, I worked with Django", Intent.OTHER),
+    ("hi, thank you", Intent.GREETING),
+    ("My name is Hi Lo", Intent.OTHER),
+])
+def test_classify_intent(text, intent):
+    """Whole-message intents match on word tokens plus filler only"""
+    assert classify_intent(text) == intent
+
+
+def test_is_exit_keyword_word_boundaries():
+    """Exit keywords no longer match inside other words"""
+    assert is_exit_keyword("Okay, bye!")
+    assert not is_exit_keyword("I attend every standup")
+    assert not is_exit_keyword("weekend plans")
+
+
+def test_answer_locally_respects_enabled_intents():
+    """Only enabled intents bypass the agent; repeat needs a previous question"""
+    history = [{"role": "assistant", "content": "What is your email address?"}]
+    intent, reply = answer_locally("could you repeat that?", history, ["repeat"])
+    assert intent == Intent.REPEAT and "What is your email address?" in reply
+    assert answer_locally("repeat", [], ["repeat"])[1] is None
+    assert answer_locally("hello", history, ["exit"]) == (Intent.GREETING, None)
+
+
+def test_acknowledgement_is_answered_locally():
+    """'thanks' gets a local reply pointing back at an open question"""
+    history = [{"role": "assistant", "content": "What is your email address?"}]
+    intent, reply = answer_locally("thank you", history, ["acknowledge"])
+    assert intent == Intent.ACKNOWLEDGE and "answer the question above" in reply
+    assert answer_locally("thanks!", [], ["acknowledge"]) == (Intent.ACKNOWLEDGE, "You're welcome! 😊")
+    assert answer_locally("thanks", history, ["exit"]) == (Intent.ACKNOWLEDGE, None)
+
+
+def test_intent_stats_estimates_latency_saved():
+    stats = IntentStats()
+    stats.record_agent(Intent.OTHER, 2.0)
+    stats.record_agent(Intent.OTHER, 4.0)
+    stats.record_local(Intent.EXIT, 0.001)
+    summary = stats.summary()
+    assert summary["bypass_rate"] == pytest.approx(1 / 3)
+    assert summary["latency_saved_seconds"] == pytest.approx(2.999)
+    assert summary["by_intent"] == {"other": 2, "exit": 1}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
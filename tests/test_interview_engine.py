@@ -0,0 +1,183 @@
+"""Test the hybrid scripted/LLM interview engine"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.constants import ConversationStage, FIELD_QUESTIONS, InfoFields, REQUIRED_FIELDS
+from services.question_bank import Question, QuestionBank
+from services.interview_engine import (
+    BANKED_QUESTION_REPLY,
+    DEFERRED_REPLY,
+    INTERVIEW_MODES,
+    STAGE_INSTRUCTIONS,
+    InterviewEngine,
+)
+
+ANSWERS = [
+    "Hello!",
+    "Priya Sharma",
+    "priya@example.com",
+    "+91 98765 43210",
+    "6 years",
+    "Backend Engineer",
+    "Pune",
+    "Python, Django and PostgreSQL",
+]
+
+
+def run(engine, answers, agent_replies=()):
+    """Feed ``answers``; the agent's turns reply with ``agent_replies`` in order"""
+    agent_replies = iter(agent_replies)
+    steps = []
+    question = None
+    for answer in answers:
+        step = engine.handle(answer, question)
+        steps.append(step)
+        question = step.reply if step.reply is not None else next(agent_replies, "What is a Python generator?")
+    return steps
+
+
+def test_details_are_collected_without_the_agent():
+    """Greeting, details and tech stack are scripted; the hand-off carries them all"""
+    engine = InterviewEngine()
+    steps = run(engine, ANSWERS)
+
+    assert [step.reply for step in steps[1:7]] == [
+        FIELD_QUESTIONS[field] for field in (
+            InfoFields.EMAIL, InfoFields.PHONE, InfoFields.YEARS_EXPERIENCE,
+            InfoFields.DESIRED_POSITIONS, InfoFields.CURRENT_LOCATION, InfoFields.TECH_STACK,
+        )
+    ]
+    handoff = steps[-1]
+    assert handoff.reply is None
+    assert handoff.stage == ConversationStage.TECHNICAL_QUESTIONS
+    assert "Full name: Priya Sharma" in handoff.context
+    assert "Tech stack: Python, Django, PostgreSQL" in handoff.context
+    assert STAGE_INSTRUCTIONS[ConversationStage.TECHNICAL_QUESTIONS] in handoff.context
+    assert engine.local_turns == 7
+    assert engine.agent_turns == 1
+
+
+def test_llm_calls_are_halved():
+    """A full interview needs half the agent turns of the all-agent mode"""
+    answers = ANSWERS + [f"Technical answer {n}" for n in range(5)] + ["Thanks!"]
+    hybrid = InterviewEngine()
+    agent = InterviewEngine(scripted_stages=INTERVIEW_MODES["agent"])
+    run(hybrid, answers)
+    run(agent, answers, agent_replies=[FIELD_QUESTIONS[field] for field in REQUIRED_FIELDS])
+
+    assert agent.agent_turns == len(answers)
+    assert hybrid.agent_turns <= agent.agent_turns / 2
+    assert hybrid.stage == agent.stage == ConversationStage.CONCLUSION
+
+
+def test_conclusion_is_announced_once():
+    engine = InterviewEngine(technical_turns=2)
+    steps = run(engine, ANSWERS + ["First answer", "Second answer", "Bye then"])
+
+    conclusion = STAGE_INSTRUCTIONS[ConversationStage.CONCLUSION]
+    assert steps[-3].stage == ConversationStage.TECHNICAL_QUESTIONS
+    assert steps[-2].stage == ConversationStage.CONCLUSION
+    assert conclusion in steps[-2].context
+    assert steps[-1].context is None
+
+
+def test_technical_answers_only_add_to_the_tech_stack():
+    """Profile cues in technical answers never reach the record or the agent"""
+    engine = InterviewEngine()
+    run(engine, ANSWERS)
+    step = engine.handle(
+        "I spent 2 years migrating services to Go. I live in Berlin now.",
+        "Tell me about your experience with migrations."
+    )
+    assert engine.record.fields[InfoFields.YEARS_EXPERIENCE] == 6.0
+    assert engine.record.fields[InfoFields.CURRENT_LOCATION] == "Pune"
+    assert engine.record.fields[InfoFields.TECH_STACK] == ["Python", "Django", "PostgreSQL", "Go"]
+    assert "Berlin" not in step.context
+
+
+def test_volunteered_details_skip_questions():
+    engine = InterviewEngine()
+    first = engine.handle("Hi, I'm Priya Sharma, my email is priya@example.com")
+    assert first.reply.endswith(FIELD_QUESTIONS[InfoFields.PHONE])
+    assert engine.stage == ConversationStage.INFO_COLLECTION
+
+
+def test_unreadable_answer_is_asked_again_then_left_to_agent():
+    engine = InterviewEngine()
+    run(engine, ["Hello", "Priya Sharma"])
+    retry = engine.handle("I'd rather not say", FIELD_QUESTIONS[InfoFields.EMAIL])
+    assert "couldn't quite catch" in retry.reply
+    assert engine.stage == ConversationStage.INFO_COLLECTION
+
+    moved_on = engine.handle("no thanks", retry.reply)
+    assert moved_on.reply == FIELD_QUESTIONS[InfoFields.PHONE]
+    assert engine.given_up == [InfoFields.EMAIL]
+
+
+def test_resume_from_history():
+    messages = [
+        {'role': 'user', 'content': 'Hello'},
+        {'role': 'assistant', 'content': FIELD_QUESTIONS[InfoFields.FULL_NAME]},
+        {'role': 'user', 'content': 'Priya Sharma'},
+        {'role': 'assistant', 'content': FIELD_QUESTIONS[InfoFields.EMAIL]},
+    ]
+    engine = InterviewEngine.from_messages(messages)
+    assert engine.stage == ConversationStage.INFO_COLLECTION
+    assert engine.is_scripted
+    step = engine.handle("priya@example.com", messages[-1]['content'])
+    assert step.reply == FIELD_QUESTIONS[InfoFields.PHONE]
+
+
+def test_deferred_turns_are_replayed_to_the_agent():
+    engine = InterviewEngine()
+    steps = run(engine, ANSWERS)
+    assert engine.defer("Generators yield lazily", steps[-1].context) == DEFERRED_REPLY
+    engine.defer("Also, I have used asyncio")
+
+    context = engine.take_queued("Latest note")
+    assert "Full name: Priya Sharma" in context
+    assert "- Generators yield lazily\n- Also, I have used asyncio" in context
+    assert context.endswith("Latest note")
+    assert engine.queued == []
+    assert engine.take_queued(None) is None
+
+
+def test_degraded_agent_mode_collects_details_locally():
+    """Details are scripted while the agent is down, then it takes over again"""
+    engine = InterviewEngine(scripted_stages=INTERVIEW_MODES["agent"])
+    assert not engine.is_scripted
+    engine.degraded = True
+    steps = run(engine, ANSWERS[:3])
+    assert all(step.reply is not None for step in steps)
+    assert engine.record.fields[InfoFields.EMAIL] == "priya@example.com"
+
+    engine.degraded = False
+    assert engine.handle("+91 98765 43210", FIELD_QUESTIONS[InfoFields.PHONE]).reply is None
+
+
+def test_degraded_technical_stage_asks_banked_questions():
+    """Without the agent, banked questions are asked locally and the answers queued"""
+    bank = QuestionBank(Question(f"py-{n}", "Python", "senior", f"Python question {n}?") for n in range(3))
+    engine = InterviewEngine(question_bank=bank, technical_turns=3)
+    run(engine, ANSWERS[:-1])
+    engine.degraded = True
+
+    step = engine.handle(ANSWERS[-1], FIELD_QUESTIONS[InfoFields.TECH_STACK])
+    assert step.stage == ConversationStage.TECHNICAL_QUESTIONS
+    assert step.reply == f"{BANKED_QUESTION_REPLY}\n\n{engine.prefetched[0].text}"
+    step = engine.handle("Lazy iterators", engine.prefetched[0].text)
+    assert step.reply.endswith(engine.prefetched[1].text)
+    assert engine.technical_answers == 1
+
+    engine.degraded = False
+    step = engine.handle("With a decorator", engine.prefetched[1].text)
+    assert step.reply is None and engine.technical_answers == 2
+    context = engine.take_queued(step.context)
+    assert "Python question 0?" in context and f"Lazy iterators (answering: {engine.prefetched[0].text})" in context
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
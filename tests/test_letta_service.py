@@ -0,0 +1,332 @@
+"""Test Letta service behaviour without a live Letta server"""
+import pytest
+from pathlib import Path
+import asyncio
+import sys
+import threading
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from types import SimpleNamespace
+
+from config.settings import settings
+from services.agent_router import AgentRouter, parse_variants
+from services.letta_service import LettaService, agent_config_version
+
+
+def test_warmup_attaches_after_agent_info(monkeypatch):
+    """Warm-up marks the service ready once agent info is fetched"""
+    service = LettaService()
+    monkeypatch.setattr(service, "connect", lambda: setattr(service, "is_connected", True) or True)
+    monkeypatch.setattr(service, "get_agent_info", lambda: {"id": "agent-1", "name": "Scout"})
+
+    assert service.is_ready() is False
+    service.start_warmup(refresh_interval=60, retry_interval=0.01)
+    try:
+        assert service.wait_until_ready(timeout=2)
+        status = service.get_status()
+        assert status["ready"] is True
+        assert status["agent_info"]["id"] == "agent-1"
+        assert status["last_error"] is None
+    finally:
+        service.stop_warmup(timeout=2)
+
+
+def test_failed_refresh_keeps_ready_connection(monkeypatch):
+    """A transient refresh failure records the error without detaching"""
+    service = LettaService()
+    monkeypatch.setattr(service, "connect", lambda: setattr(service, "is_connected", True) or True)
+    monkeypatch.setattr(service, "get_agent_info", lambda: {"id": "agent-1"})
+    assert service.refresh() is True
+
+    def failing_info():
+        service.last_error = "timeout"
+        return None
+
+    monkeypatch.setattr(service, "get_agent_info", failing_info)
+    assert service.refresh() is False
+    assert service.is_ready() is True
+    assert service.get_status()["last_error"] == "timeout"
+
+
+def test_context_is_sent_as_system_message():
+    """Known-details notes go ahead of the user message as a system message"""
+    messages = LettaService._build_messages("hi", context="Email: a@b.co")
+    assert messages == [
+        {"role": "system", "content": "Email: a@b.co"},
+        {"role": "user", "content": "hi"},
+    ]
+    assert LettaService._build_messages("hi") == [{"role": "user", "content": "hi"}]
+    assert LettaService._build_messages(["Python", "also Go"]) == [{"role": "user", "content": [
+        {"type": "text", "text": "Python"}, {"type": "text", "text": "also Go"},
+    ]}]
+
+
+def test_cached_opening_seeds_first_turn(monkeypatch):
+    """The cached opening is written by the scratch agent and replayed to the interview agent"""
+    class OpeningMessages:
+        agents = []
+        resets = []
+
+        def create_stream(self, agent_id, **kwargs):
+            OpeningMessages.agents.append(agent_id)
+            yield SimpleNamespace(message_type="assistant_message", id="m1", content="Hi! ")
+            yield SimpleNamespace(message_type="assistant_message", id="m1", content="What's your name?")
+
+        def reset(self, agent_id, add_default_initial_messages=True):
+            OpeningMessages.resets.append(agent_id)
+
+    agent = SimpleNamespace(id="agent-1", name="Scout", system="Be kind", tools=[], created_at="now",
+                            llm_config=SimpleNamespace(model="gpt-4o"))
+    service = LettaService()
+    service.client = SimpleNamespace(agents=SimpleNamespace(
+        messages=OpeningMessages(), retrieve=lambda agent_id: agent
+    ))
+    service.is_connected = True
+    service.agent_info = service.get_agent_info()
+    assert service.agent_info["version"] == agent_config_version(agent)
+
+    monkeypatch.setattr(settings, "letta_opening_agent_id", "")
+    assert service.generate_opening() is None  # never on the shared interview agent
+    monkeypatch.setattr(settings, "letta_opening_agent_id", "agent-opening")
+    assert service.get_opening() is None
+    assert service.opening_cache.ensure(service.opening_key())
+    assert service.get_opening() == "Hi! What's your name?"
+    assert OpeningMessages.agents == OpeningMessages.resets == ["agent-opening"]
+    assert service.breaker.snapshot()["calls"] == 0
+
+    messages = LettaService._build_messages("Priya", context="note", opening=service.get_opening())
+    assert [m["role"] for m in messages] == ["system", "assistant", "user"]
+
+    agent.system = "Be very kind"
+    assert agent_config_version(agent) != service.agent_info["version"]
+
+
+def test_stream_failures_open_the_breaker(monkeypatch):
+    """Failed streams trip the breaker, after which calls are refused locally"""
+    class FailingMessages:
+        calls = 0
+
+        def create_stream(self, **kwargs):
+            FailingMessages.calls += 1
+            raise TimeoutError("read timed out")
+
+    class FakeClient:
+        class agents:
+            messages = FailingMessages()
+
+    service = LettaService()
+    service.client = FakeClient()
+    service.is_connected = True
+    for _ in range(service.breaker.min_calls):
+        events = list(service.send_message_stream("hi"))
+        assert events[0]["type"] == "error"
+
+    assert service.is_degraded()
+    events = list(service.send_message_stream("hi"))
+    assert events == [service._degraded_event()]
+    assert FailingMessages.calls == service.breaker.min_calls
+    assert service.get_status()["breaker"]["state"] == "open"
+
+
+def test_evaluation_agent_turns_bypass_the_breaker():
+    """Turns to a non-interview agent are neither gated nor counted by the breaker"""
+    class FailingMessages:
+        def create_stream(self, **kwargs):
+            raise TimeoutError("read timed out")
+
+    service = LettaService()
+    service.client = SimpleNamespace(agents=SimpleNamespace(messages=FailingMessages()))
+    service.is_connected = True
+    for _ in range(service.breaker.min_calls):
+        assert list(service.send_message_stream("grade this", agent_id="agent-eval"))[0]["type"] == "error"
+    assert not service.is_interview_agent("agent-eval")
+    assert service.breaker.snapshot()["calls"] == 0 and not service.is_degraded()
+
+    for _ in range(service.breaker.min_calls):
+        list(service.send_message_stream("hi"))
+    assert service.is_degraded()
+    events = list(service.send_message_stream("grade this", agent_id="agent-eval"))
+    assert events != [service._degraded_event()]
+
+
+def test_cancelled_turns_are_not_counted():
+    """Turns cancelled by a newer message neither trip the breaker nor count for the router"""
+    class SlowMessages:
+        async def create_stream(self, **kwargs):
+            await asyncio.sleep(1)
+            yield SimpleNamespace(message_type="assistant_message", id="m1", content="Hi")
+
+    service = LettaService()
+    service.async_client = SimpleNamespace(agents=SimpleNamespace(messages=SlowMessages()))
+    service.is_connected = True
+    turns = []
+    service.router.record_turn = lambda *args: turns.append(args)
+
+    async def consume():
+        async for _ in service.send_message_stream_async("hi"):
+            pass
+
+    async def scenario():
+        for _ in range(service.breaker.min_calls):
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(scenario())
+    assert service.breaker.snapshot()["calls"] == 0 and not service.is_degraded()
+    assert turns == []
+
+
+def test_streams_are_measured_per_variant(monkeypatch):
+    """A turn sent to a variant's agent is recorded against that variant"""
+    class Messages:
+        agents = []
+
+        def create_stream(self, agent_id, **kwargs):
+            Messages.agents.append(agent_id)
+            yield SimpleNamespace(message_type="assistant_message", id="m1", content="Hi")
+            yield SimpleNamespace(
+                message_type="usage_statistics", completion_tokens=5, prompt_tokens=95, total_tokens=100, step_count=1
+            )
+
+    service = LettaService()
+    service.client = SimpleNamespace(agents=SimpleNamespace(messages=Messages()))
+    service.is_connected = True
+    service.router = AgentRouter(parse_variants("control=agent-a,fast=agent-b", "agent-a"))
+
+    agent_id = service.assign_agent("session-1")
+    list(service.send_message_stream("hi", agent_id=agent_id))
+    assert Messages.agents == [agent_id]
+    variant = service.router.by_agent[agent_id].name
+    summary = service.router.report()["variants"][variant]
+    assert summary["turns"] == 1 and summary["tokens_per_turn"] == 100.0
+    assert summary["ttft_p50_seconds"] is not None
+
+
+def _dropping_stream(**kwargs):
+    """A turn whose connection drops halfway through the second message"""
+    yield SimpleNamespace(message_type="reasoning_message", id="r1", reasoning="Greet them", run_id="run-1", seq_id=1)
+    yield SimpleNamespace(message_type="assistant_message", id="m1", content="Hi! What's ", run_id="run-1", seq_id=2)
+    raise ConnectionError("connection reset by peer")
+
+
+def test_dropped_stream_resumes_from_history(monkeypatch):
+    """A mid-turn drop is finished from the message history, not re-run"""
+    monkeypatch.setattr(settings, "letta_resume_backoff", 0)
+    created, polls = [], []
+    history = [
+        SimpleNamespace(message_type="user_message", id="u1", content="hi", run_id="run-1"),
+        SimpleNamespace(message_type="reasoning_message", id="r1", reasoning="Greet them", run_id="run-1"),
+        SimpleNamespace(message_type="assistant_message", id="m1", content="Hi! What's your name?", run_id="run-1"),
+    ]
+
+    def create_stream(**kwargs):
+        created.append(kwargs)
+        return _dropping_stream()
+
+    def retrieve_run(run_id):
+        polls.append(run_id)
+        return SimpleNamespace(status="completed")
+
+    service = LettaService()
+    service.client = SimpleNamespace(
+        agents=SimpleNamespace(messages=SimpleNamespace(
+            create_stream=create_stream, list=lambda agent_id, limit: history
+        )),
+        runs=SimpleNamespace(retrieve=retrieve_run)
+    )
+    service.is_connected = True
+
+    events = list(service.send_message_stream("hi"))
+    assert len(created) == 1 and "background" not in created[0]
+    assert not any(event.get("error") for event in events)
+    assistant = [event for event in events if event["type"] == "assistant"]
+    assert assistant[-1]["content"] == "Hi! What's your name?"
+    assert assistant[-1]["message_id"] == "m1"
+    assert [event["type"] for event in events].count("reasoning") == 1
+    assert polls == ["run-1"]
+    assert service.get_status()["stream_resumes"] == {"resumed": 1, "failed": 0}
+
+
+def test_background_stream_replays_after_last_sequence(monkeypatch):
+    """Background runs resume from the server's buffer after the last seq id"""
+    monkeypatch.setattr(settings, "letta_resume_backoff", 0)
+    monkeypatch.setattr(settings, "letta_background_streams", True)
+    replays = []
+
+    def replay(run_id, starting_after):
+        replays.append((run_id, starting_after))
+        yield SimpleNamespace(message_type="assistant_message", id="m1", content="your name?", run_id=run_id, seq_id=3)
+        yield SimpleNamespace(message_type="stop_reason", stop_reason="end_turn", run_id=run_id, seq_id=4)
+
+    service = LettaService()
+    service.client = SimpleNamespace(
+        agents=SimpleNamespace(messages=SimpleNamespace(create_stream=lambda **kwargs: _dropping_stream())),
+        runs=SimpleNamespace(stream=replay)
+    )
+    service.is_connected = True
+
+    events = list(service.send_message_stream("hi"))
+    assert replays == [("run-1", 2)]
+    assistant = [event for event in events if event["type"] == "assistant"]
+    assert assistant[-1]["content"] == "Hi! What's your name?"
+    assert events[-1]["type"] == "stop"
+
+
+def test_resume_gives_up_after_configured_attempts(monkeypatch):
+    """A connection that never comes back ends the turn with an error event"""
+    monkeypatch.setattr(settings, "letta_resume_backoff", 0)
+    monkeypatch.setattr(settings, "letta_resume_attempts", 2)
+    reads = []
+
+    def unreachable(agent_id, limit):
+        reads.append(agent_id)
+        raise ConnectionError("connection refused")
+
+    service = LettaService()
+    service.client = SimpleNamespace(agents=SimpleNamespace(messages=SimpleNamespace(
+        create_stream=lambda **kwargs: _dropping_stream(), list=unreachable
+    )))
+    service.is_connected = True
+
+    events = list(service.send_message_stream("hi"))
+    assert events[-1]["type"] == "error"
+    assert len(reads) == 2
+    assert service.get_status()["stream_resumes"] == {"resumed": 0, "failed": 1}
+
+
+def test_resubmitted_message_follows_the_running_turn():
+    """Two submissions with one idempotency key produce one agent turn"""
+    release = threading.Event()
+    calls = []
+
+    def create_stream(**kwargs):
+        calls.append(kwargs)
+        yield SimpleNamespace(message_type="assistant_message", id="m1", content="Hello")
+        release.wait(2)
+        yield SimpleNamespace(message_type="assistant_message", id="m1", content=" there")
+
+    service = LettaService()
+    service.client = SimpleNamespace(agents=SimpleNamespace(messages=SimpleNamespace(create_stream=create_stream)))
+    service.is_connected = True
+
+    first = service.send_message_stream("hi", idempotency_key="k1")
+    assert next(first)["content"] == "Hello"
+    # The first consumer goes away mid-turn, as a Streamlit rerun does
+    first.close()
+    second = service.send_message_stream("hi", idempotency_key="k1")
+    assert next(second)["content"] == "Hello"
+    release.set()
+    assert [event["content"] for event in second] == ["Hello there"]
+
+    replay = list(service.send_message_stream("hi", idempotency_key="k1"))
+    assert replay[-1]["content"] == "Hello there"
+    assert len(calls) == 1
+    assert service.get_status()["submissions"]["suppressed_duplicates"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
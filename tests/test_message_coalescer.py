@@ -0,0 +1,87 @@
+"""Test coalescing of consecutive user messages into one agent turn"""
+import pytest
+from pathlib import Path
+import asyncio
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.message_coalescer import MessageCoalescer
+
+
+class Agent:
+    """Dispatch target recording turns; each turn takes ``seconds``"""
+
+    def __init__(self, seconds: float = 0.0):
+        self.seconds = seconds
+        self.turns = []
+        self.cancelled = []
+
+    async def dispatch(self, session_id, turn):
+        self.turns.append((session_id, list(turn.parts)))
+        try:
+            await asyncio.sleep(self.seconds)
+        except asyncio.CancelledError:
+            self.cancelled.append(list(turn.parts))
+            raise
+
+
+def test_burst_within_window_is_one_turn():
+    """Messages inside the window merge; sessions are coalesced separately"""
+    agent = Agent()
+
+    async def scenario():
+        coalescer = MessageCoalescer(agent.dispatch, window=0.05)
+        first = await coalescer.submit("s1", "Python")
+        second = await coalescer.submit("s1", "also Go")
+        await coalescer.submit("s2", "Rust")
+        await asyncio.sleep(0.02)
+        third = await coalescer.submit("s1", "and Docker")
+        assert first is second is third
+        await asyncio.sleep(0.15)
+        return coalescer.summary()
+
+    summary = asyncio.run(scenario())
+    assert sorted(agent.turns) == [("s1", ["Python", "also Go", "and Docker"]), ("s2", ["Rust"])]
+    assert summary == {"messages": 4, "turns": 2, "coalesced": 2, "cancelled": 0, "pending": 0}
+
+
+def test_messages_during_a_running_turn_wait_for_it():
+    """Messages sent while a turn runs become the next turn, merged"""
+    agent = Agent(seconds=0.3)
+
+    async def scenario():
+        coalescer = MessageCoalescer(agent.dispatch, window=0.01)
+        await coalescer.submit("s1", "Python")
+        await asyncio.sleep(0.05)
+        await coalescer.submit("s1", "also Go")
+        await asyncio.sleep(0.05)
+        await coalescer.submit("s1", "and Docker")
+        await asyncio.sleep(0.05)
+        assert len(agent.turns) == 1  # the first turn is still running
+        await asyncio.sleep(0.5)
+
+    asyncio.run(scenario())
+    assert [parts for _, parts in agent.turns] == [["Python"], ["also Go", "and Docker"]]
+    assert agent.cancelled == []
+
+
+def test_new_message_can_cancel_the_running_turn():
+    agent = Agent(seconds=0.1)
+
+    async def scenario():
+        coalescer = MessageCoalescer(agent.dispatch, window=0.01, cancel_running=True)
+        await coalescer.submit("s1", "Python")
+        await asyncio.sleep(0.03)
+        await coalescer.submit("s1", "also Go")
+        await asyncio.sleep(0.2)
+        return coalescer.summary()
+
+    summary = asyncio.run(scenario())
+    assert agent.cancelled == [["Python"]]
+    assert [parts for _, parts in agent.turns] == [["Python"], ["also Go"]]
+    assert summary["cancelled"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
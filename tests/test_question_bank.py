@@ -0,0 +1,71 @@
+"""Test the local technical question bank"""
+import random
+
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.constants import ConversationStage, TECH_STACK_CATEGORIES
+from services.interview_engine import PREFETCHED_INSTRUCTION, InterviewEngine
+from services.question_bank import LEVELS, QuestionSampler, get_question_bank
+
+
+def test_every_stack_item_has_questions_at_every_level():
+    bank = get_question_bank()
+    for items in TECH_STACK_CATEGORIES.values():
+        for tech in items:
+            for years in (1, 3, 7, 15):
+                assert bank.pool(tech, years), (tech, years)
+            assert {question.level for question in bank.pool(tech, 3)} == set(LEVELS)
+
+
+def test_pool_puts_the_candidates_level_first():
+    bank = get_question_bank()
+    assert bank.pool("Python", 1)[0].level == "junior"
+    assert bank.pool("python", 7)[0].level == "senior"
+    assert bank.pool("Python", None)[0].level == "mid"
+    assert bank.pool("COBOL", 3) == ()
+
+
+def test_sample_spreads_across_stack_without_repeats():
+    bank = get_question_bank()
+    sampler = QuestionSampler(bank, seed=7)
+    first = sampler.next(["Python", "Django", "PostgreSQL"], 6, 5)
+    assert len(first) == 5
+    assert [question.tech for question in first[:3]] == ["Python", "Django", "PostgreSQL"]
+    assert all(question.level == "senior" for question in first)
+
+    asked = {question.id for question in first}
+    rest = sampler.next(["Python", "Django", "PostgreSQL"], 6, 100)
+    assert not asked & {question.id for question in rest}
+    assert len(asked) + len(rest) == sum(len(bank.pool(tech, 6)) for tech in ("Python", "Django", "PostgreSQL"))
+    assert sampler.next(["Python", "Django", "PostgreSQL"], 6, 5) == []
+
+
+def test_sample_is_reproducible_with_a_seeded_rng():
+    bank = get_question_bank()
+    one = bank.sample(["Go", "Redis"], 3, 4, rng=random.Random(1))
+    two = bank.sample(["Go", "Redis"], 3, 4, rng=random.Random(1))
+    assert one == two
+
+
+def test_engine_prefetches_questions_at_hand_off():
+    engine = InterviewEngine(question_bank=get_question_bank(), technical_turns=3)
+    question = None
+    for answer in ["Hello", "Priya Sharma", "priya@example.com", "+91 98765 43210",
+                   "1 year", "Backend Engineer", "Pune", "Python and Redis"]:
+        step = engine.handle(answer, question)
+        question = step.reply
+
+    assert step.stage == ConversationStage.TECHNICAL_QUESTIONS
+    assert len(engine.prefetched) == 3
+    assert PREFETCHED_INSTRUCTION in step.context
+    for n, prefetched in enumerate(engine.prefetched, 1):
+        assert f"{n}. {prefetched.text}" in step.context
+    assert {prefetched.tech for prefetched in engine.prefetched} == {"Python", "Redis"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
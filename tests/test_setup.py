@@ -1,8 +1,11 @@
 """Test Phase 1 setup and configuration"""
 import pytest
 from pathlib import Path
+import subprocess
 import sys
 
+ROOT_DIR = Path(__file__).parent.parent
+
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 def test_imports():
@@ -51,5 +54,17 @@ def test_helpers():
     assert is_exit_keyword("bye") == True
     assert is_exit_keyword("hello") == False
 
+@pytest.mark.parametrize("tree", [ROOT_DIR, ROOT_DIR / "hf_deployment"])
+def test_settings_do_not_import_streamlit(tree):
+    """Both deployable trees build settings without loading Streamlit"""
+    probe = "import sys; import config.settings; print('streamlit' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=tree, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+def test_hf_profiling_matches_main_tree():
+    """The HF Space is uploaded on its own, so it carries a copy of utils/profiling.py"""
+    main = (ROOT_DIR / "utils" / "profiling.py").read_bytes()
+    assert (ROOT_DIR / "hf_deployment" / "utils" / "profiling.py").read_bytes() == main
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
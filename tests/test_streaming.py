@@ -0,0 +1,89 @@
+"""Test stream buffering and session stream logs"""
+import pytest
+from pathlib import Path
+import asyncio
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.stream_buffer import CoalescingEventBuffer
+from services.stream_hub import StreamHub
+
+
+def partial(message_id, content):
+    return {"type": "assistant", "content": content, "partial": True, "message_id": message_id}
+
+
+def test_partial_events_coalesce():
+    """Only the newest state of a pending partial message is kept"""
+    async def scenario():
+        buffer = CoalescingEventBuffer(maxsize=4)
+        for text in ("a", "ab", "abc"):
+            await buffer.put(partial("m1", text))
+        await buffer.put({"type": "stop", "content": ""})
+        buffer.close()
+        return [await buffer.get() for _ in range(3)], buffer.coalesced
+
+    events, coalesced = asyncio.run(scenario())
+    assert [e["content"] for e in events[:2]] == ["abc", ""]
+    assert events[2] is None
+    assert coalesced == 2
+
+
+def test_overflow_policies():
+    """drop_oldest discards, close flags the overflow, block refuses offers"""
+    async def scenario():
+        dropping = CoalescingEventBuffer(maxsize=2, overflow="drop_oldest")
+        closing = CoalescingEventBuffer(maxsize=2, overflow="close")
+        blocking = CoalescingEventBuffer(maxsize=2)
+        for n in range(3):
+            dropping.offer({"n": n})
+            closing.offer({"n": n})
+            blocking.offer({"n": n})
+        return dropping, closing, blocking, await dropping.get()
+
+    dropping, closing, blocking, first = asyncio.run(scenario())
+    assert first == {"n": 1} and dropping.dropped == 1
+    assert closing.overflowed and closing.closed
+    assert len(blocking) == 2 and not blocking.closed
+
+
+def test_session_stream_resume():
+    """Replay returns events after a sequence and reports evicted gaps"""
+    hub = StreamHub(history=3)
+    received = []
+    hub.subscribe("s1", lambda sid, seq, event: received.append(seq))
+    for n in range(5):
+        hub.get("s1").publish({"n": n})
+
+    assert received == [1, 2, 3, 4, 5]
+    replay, complete = hub.get("s1").replay(3)
+    assert [seq for seq, _ in replay] == [4, 5] and complete
+    _, complete = hub.get("s1").replay(1)
+    assert not complete
+
+
+def test_slow_subscriber_falls_back_to_snapshot():
+    """A lagging subscriber gets a snapshot instead of blocking the producer"""
+    async def scenario():
+        hub = StreamHub()
+        fast = hub.open_subscriber("s1", name="fast", maxsize=100)
+        slow = hub.open_subscriber("s1", name="slow", maxsize=2)
+        stream = hub.get("s1")
+        stream.publish({"type": "user", "content": "hi"})
+        for text in ("a", "ab", "abc", "abcd"):
+            stream.publish(partial("m1", text))
+        metrics = hub.metrics("s1")
+        seq, snapshot = await slow.get()
+        return fast, slow, metrics, seq, snapshot
+
+    fast, slow, metrics, seq, snapshot = asyncio.run(scenario())
+    assert len(fast.backlog) == 5
+    assert snapshot["type"] == "snapshot" and seq == 5
+    assert [e["content"] for e in snapshot["events"]] == ["hi", "abcd"]
+    assert slow.lag == 0 and slow.snapshots == 1
+    assert metrics["max_lag"] == 5 and metrics["snapshots"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
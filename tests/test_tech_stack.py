@@ -0,0 +1,58 @@
+"""Test tech stack extraction"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.helpers import extract_tech_stack, extract_tech_stack_batch, extract_tech_versions
+
+# (text, technologies that must be found, technologies that must not be)
+CASES = [
+    ("I mostly write JavaScript", {"JavaScript"}, {"Java"}),
+    ("Java and JavaScript", {"Java", "JavaScript"}, set()),
+    ("I'm good at SQL", set(), {"Go"}),
+    ("Backend in Go, some golang tooling", {"Go"}, set()),
+    ("I go to the office; I'd express concern", set(), {"Go", "Express"}),
+    ("APIs with Express.js and Node", {"Express", "Node.js"}, {"JavaScript"}),
+    ("k8s, Postgres and JS daily", {"Kubernetes", "PostgreSQL", "JavaScript"}, set()),
+    ("Deployed on Amazon Web Services and Google Cloud Platform", {"AWS", "GCP"}, set()),
+    ("C++, C# and cpp templates", {"C++", "C#"}, set()),
+    ("GitHub Actions and GitLab CI", {"Git"}, set()),
+    ("Spring Boot services; every spring I travel", {"Spring"}, set()),
+    ("mongo shell, DynamoDB streams", {"MongoDB", "DynamoDB"}, set()),
+    ("Rails developer, no rust here", set(), {"Rust", "Ruby"}),
+    ("Legacy PHP7 code", {"PHP"}, set()),
+    ("reactive programming", set(), {"React"}),
+]
+
+
+@pytest.mark.parametrize("text,expected,unexpected", CASES)
+def test_extraction_cases(text, expected, unexpected):
+    """Aliases resolve and partial words or English words do not match"""
+    found = {item for items in extract_tech_stack(text).values() for item in items}
+    assert expected <= found
+    assert not (unexpected & found)
+
+
+def test_return_shape_and_order():
+    """Categories keep their shape; unknown-category tech lands in "other" """
+    result = extract_tech_stack("Terraform, Docker, django, python")
+    assert list(result) == ["languages", "frameworks", "databases", "tools", "other"]
+    assert result["languages"] == ["Python"] and result["frameworks"] == ["Django"]
+    assert result["tools"] == ["Docker"] and result["other"] == ["Terraform"]
+
+
+def test_versions_and_batch():
+    """Versions are captured, durations are not versions"""
+    versions = extract_tech_versions("Python 3.11, java 17, python3 scripts and Go 5 years")
+    assert versions == {"Python": "3.11", "Java": "17"}
+    assert extract_tech_versions("Python 3, specifically Python 3.12") == {"Python": "3.12"}
+    assert extract_tech_versions("PostgreSQL v15.2") == {"PostgreSQL": "15.2"}
+    batch = extract_tech_stack_batch(["Flask", "Redis", ""])
+    assert [b["frameworks"] for b in batch] == [["Flask"], [], []]
+    assert batch[1]["databases"] == ["Redis"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
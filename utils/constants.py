@@ -9,6 +9,16 @@ class ConversationStage(Enum):
     TECHNICAL_QUESTIONS = "technical_questions"
     CONCLUSION = "conclusion"
 
+class Intent(Enum):
+    """Locally recognized intents of a whole user message"""
+    EXIT = "exit"
+    GREETING = "greeting"
+    HELP = "help"
+    REPEAT = "repeat"
+    ACKNOWLEDGE = "acknowledge"
+    EMPTY = "empty"
+    OTHER = "other"
+
 class ExitKeywords:
     """Keywords to end conversation"""
     KEYWORDS = [
@@ -43,3 +53,90 @@ TECH_STACK_CATEGORIES = {
     "databases": ["MongoDB", "PostgreSQL", "MySQL", "Redis", "Cassandra", "DynamoDB"],
     "tools": ["Docker", "Kubernetes", "Git", "Jenkins", "AWS", "Azure", "GCP"]
 }
+
+# Recognized technologies outside the categories above
+OTHER_TECH = ["Node.js", "C#", "Rust", "Kotlin", "Swift", "Scala", "GraphQL", "Kafka", "Terraform", "Elasticsearch"]
+
+# Alternate spellings, mapped to the canonical names above
+TECH_ALIASES = {
+    "JS": "JavaScript",
+    "ECMAScript": "JavaScript",
+    "TS": "TypeScript",
+    "golang": "Go",
+    "cpp": "C++",
+    "ReactJS": "React",
+    "React.js": "React",
+    "AngularJS": "Angular",
+    "Angular.js": "Angular",
+    "VueJS": "Vue",
+    "Vue.js": "Vue",
+    "Spring Boot": "Spring",
+    "ExpressJS": "Express",
+    "Express.js": "Express",
+    "Mongo": "MongoDB",
+    "Postgres": "PostgreSQL",
+    "psql": "PostgreSQL",
+    "k8s": "Kubernetes",
+    "GitHub": "Git",
+    "GitLab": "Git",
+    "Amazon Web Services": "AWS",
+    "Microsoft Azure": "Azure",
+    "Google Cloud": "GCP",
+    "Google Cloud Platform": "GCP",
+    "NodeJS": "Node.js",
+    "Node": "Node.js",
+    "csharp": "C#",
+}
+
+# Names that are also ordinary English words only match with this exact casing
+CASE_SENSITIVE_TECH = {"Go", "Express", "Spring", "React", "Angular", "Rust", "Swift", "TS", "Node"}
+
+# Phrases that make up a whole message of each intent (matched on word tokens)
+INTENT_PHRASES = {
+    Intent.EXIT: ExitKeywords.KEYWORDS + [
+        "good bye", "see you", "see ya", "that's all", "that is all", "i'm done", "i am done",
+        "end the interview", "end interview", "stop the interview", "log off", "cya"
+    ],
+    Intent.GREETING: [
+        "hi", "hello", "hey", "hiya", "howdy", "greetings", "good morning", "good afternoon",
+        "good evening", "hi there", "hello there", "hey there"
+    ],
+    Intent.HELP: [
+        "help", "help me", "i need help", "what can you do", "how does this work",
+        "what do i do", "what should i do", "how do i start", "instructions"
+    ],
+    Intent.REPEAT: [
+        "repeat", "repeat that", "repeat the question", "repeat please", "say that again",
+        "come again", "pardon", "what was the question", "can you repeat that",
+        "could you repeat that", "can you repeat the question", "could you repeat the question",
+        "sorry what", "i didn't catch that", "one more time"
+    ],
+    Intent.ACKNOWLEDGE: [
+        "thanks", "thank you", "thx", "ty", "cheers", "many thanks", "thanks a lot",
+        "thank you so much", "appreciate it", "much appreciated"
+    ],
+}
+
+# Politeness and filler words ignored when matching a whole-message intent
+INTENT_FILLER = {
+    "ok", "okay", "so", "um", "uh", "well", "please", "thanks", "thank", "you", "now",
+    "then", "and", "again", "sorry", "alright", "oh", "for", "today", "very", "much", "bot"
+}
+
+# Scripted information-collection questions, in the order they are asked
+FIELD_QUESTIONS = {
+    InfoFields.FULL_NAME: "Could you please tell me your full name?",
+    InfoFields.EMAIL: "Thank you! Now, what's your email address?",
+    InfoFields.PHONE: "Perfect! Could you share your phone number?",
+    InfoFields.YEARS_EXPERIENCE: "Got it! How many years of experience do you have?",
+    InfoFields.DESIRED_POSITIONS: "Excellent! What position(s) are you interested in?",
+    InfoFields.CURRENT_LOCATION: "Great! Where are you currently located?",
+    InfoFields.TECH_STACK: (
+        "Perfect! Now, let's talk about your technical skills.\n\n"
+        "Could you please list your tech stack? Include:\n"
+        "- Programming languages (e.g., Python, JavaScript)\n"
+        "- Frameworks (e.g., React, Django)\n"
+        "- Databases (e.g., MongoDB, PostgreSQL)\n"
+        "- Tools (e.g., Docker, AWS)"
+    ),
+}
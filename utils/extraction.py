@@ -0,0 +1,398 @@
+"""Local extraction of candidate details from free-text replies
+
+Each user message is parsed as it arrives and the results are merged into
+a CandidateRecord keyed by InfoFields. Fields the record already holds are
+passed to the agent so it can skip asking for them again.
+
+Extraction is deliberately conservative: a value is only taken from an
+explicit cue ("my email is...", "based in Pune", "5 years of experience"),
+or from a short reply to a question that asked for exactly that field.
+Such a short-reply guess never replaces a value the record already holds,
+and non-answers ("yes", "not sure yet") are never taken as values. A held
+value only changes when the candidate answers a question asking for it.
+"""
+import re
+from typing import Any, Collection, Dict, List, Optional, Set
+
+from utils.constants import InfoFields, REQUIRED_FIELDS
+from utils.helpers import extract_tech_stack, validate_email, validate_phone
+
+EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# Digits with at most one separator between them, so "...43210. 5 years" stops at the period
+PHONE = re.compile(r"(?<![\w+])\+?\(?\d(?:(?:[ .-]|\) ?)?\d){7,16}(?!\w)")
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+}
+_NUMBER = r"(\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r"|a|an|half a)"
+YEARS = re.compile(
+    _NUMBER + r"\s*\+?\s*(?:-\s*\d+\s*)?(years?|yrs?|months?)\b(?!\s+(?:old|of age|ago))",
+    re.IGNORECASE
+)
+NO_EXPERIENCE = re.compile(r"\b(?:fresher|fresh graduate|no (?:work |professional )?experience)\b", re.IGNORECASE)
+
+_CAPITALIZED = r"[A-Z][\w.'-]*(?:(?:,\s*|\s+)[A-Z][\w.'-]*){0,3}"
+# Cues are case-insensitive; the place itself must be capitalized
+LOCATION = re.compile(
+    r"\b(?i:based (?:in|out of)|located in|(?:i )?live in|living in|reside in|residing in|"
+    r"currently in|i'?m from|i am from|moved to)\s+(" + _CAPITALIZED + ")"
+)
+NAME = re.compile(
+    r"\b(?i:my name is|my name's|name's|i am|i'm|this is|call me)\s+([A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+){0,3})"
+)
+POSITIONS = re.compile(
+    r"\b(?:applying for|apply for|interested in|looking for|position of|roles? (?:of|as)|work as|job as)\s+"
+    r"(?:an?\s+|the\s+)?([^.!?\n]+)",
+    re.IGNORECASE
+)
+POSITION_SPLIT = re.compile(r"\s*(?:,|/|\band\b|\bor\b)\s*", re.IGNORECASE)
+POSITION_SUFFIX = re.compile(r"\s+(?:roles?|positions?|jobs?|openings?)$", re.IGNORECASE)
+
+# Capitalized words that follow "I'm ..." without being a name
+NOT_NAMES = {"Based", "Located", "Currently", "From", "Interested", "Looking", "Applying", "Working",
+             "A", "An", "The", "Not", "Sorry", "Fine", "Good", "Great", "Ready", "Here", "Happy"}
+
+# Words of a job title; "I'm Senior Engineer" or "I am Python developer" is not a name
+JOB_TITLE_WORDS = {
+    "senior", "junior", "lead", "principal", "staff", "chief", "head", "intern", "trainee",
+    "engineer", "developer", "programmer", "architect", "manager", "analyst", "scientist",
+    "designer", "consultant", "administrator", "admin", "tester", "specialist", "student",
+    "graduate", "fresher", "freelancer", "software", "backend", "frontend", "fullstack",
+    "full-stack", "devops", "sre", "qa", "cto", "ceo",
+}
+
+# Replies that answer a question without giving a value
+NON_ANSWER = re.compile(
+    r"(?:yes|yeah|yep|yup|sure|ok(?:ay)?|no|nope|nah|maybe|none|n/?a|skip|later|idk|dunno|"
+    r"not (?:sure|yet|really|decided)(?: yet)?|(?:i )?(?:don'?t|do not) know(?: yet)?|"
+    r"no idea|undecided|prefer not to say|rather not say)",
+    re.IGNORECASE
+)
+
+# Question keywords -> the field a short reply is answering, checked in order
+QUESTION_FIELDS = [
+    (re.compile(r"\be-?mail\b", re.IGNORECASE), InfoFields.EMAIL),
+    (re.compile(r"\b(?:phone|mobile|contact number)\b", re.IGNORECASE), InfoFields.PHONE),
+    (re.compile(r"\b(?:years|experience)\b", re.IGNORECASE), InfoFields.YEARS_EXPERIENCE),
+    (re.compile(r"\b(?:positions?|roles?)\b", re.IGNORECASE), InfoFields.DESIRED_POSITIONS),
+    (re.compile(r"\b(?:located|location|where)\b", re.IGNORECASE), InfoFields.CURRENT_LOCATION),
+    (re.compile(r"\bname\b", re.IGNORECASE), InfoFields.FULL_NAME),
+    (re.compile(r"\b(?:tech stack|technologies|skills)\b", re.IGNORECASE), InfoFields.TECH_STACK),
+]
+
+FIELD_LABELS = {
+    InfoFields.FULL_NAME: "Full name",
+    InfoFields.EMAIL: "Email",
+    InfoFields.PHONE: "Phone",
+    InfoFields.YEARS_EXPERIENCE: "Years of experience",
+    InfoFields.DESIRED_POSITIONS: "Desired positions",
+    InfoFields.CURRENT_LOCATION: "Current location",
+    InfoFields.TECH_STACK: "Tech stack",
+}
+
+# Short replies to a direct question are taken whole, up to this many words
+SHORT_REPLY_WORDS = 6
+
+
+def extract_email(text: str) -> Optional[str]:
+    for match in EMAIL.finditer(text):
+        if validate_email(match.group()):
+            return match.group()
+    return None
+
+
+def extract_phone(text: str) -> Optional[str]:
+    for match in PHONE.finditer(text):
+        if validate_phone(match.group()):
+            return match.group().strip()
+    return None
+
+
+def _number(value: str) -> float:
+    value = value.lower()
+    if value in ("a", "an"):
+        return 1.0
+    if value == "half a":
+        return 0.5
+    return float(NUMBER_WORDS.get(value, value))
+
+
+def extract_years_experience(text: str, bare_number: bool = False) -> Optional[float]:
+    """Years of experience mentioned in ``text`` (the largest, if several)
+
+    With ``bare_number`` a reply that is just a number ("5", "3.5") counts
+    too, for answers to a question about experience.
+    """
+    found = []
+    for match in YEARS.finditer(text):
+        amount = _number(match.group(1))
+        found.append(amount / 12 if match.group(2).lower().startswith("month") else amount)
+    if found:
+        return round(max(found), 1)
+    if NO_EXPERIENCE.search(text):
+        return 0.0
+    if bare_number:
+        bare = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*\+?\s*[.!]?\s*", text)
+        if bare:
+            return float(bare.group(1))
+    return None
+
+
+def extract_location(text: str) -> Optional[str]:
+    match = LOCATION.search(text)
+    return match.group(1).strip(" ,.") if match else None
+
+
+def looks_like_name(words: List[str], following: str = "") -> bool:
+    """False for job titles and technologies that follow "I am ..." like a name"""
+    if not words or words[0] in NOT_NAMES:
+        return False
+    if any(word.lower() in JOB_TITLE_WORDS for word in words):
+        return False
+    rest = following.split()
+    if rest and rest[0].lower().strip(",.!") in JOB_TITLE_WORDS:
+        return False
+    tech = {item.lower() for items in extract_tech_stack(" ".join(words)).values() for item in items}
+    return len(tech) < len(words)
+
+
+def extract_name(text: str) -> Optional[str]:
+    for match in NAME.finditer(text):
+        words = [word for word in match.group(1).split() if word not in NOT_NAMES]
+        if match.group(1).split()[0] not in NOT_NAMES and looks_like_name(words, text[match.end():]):
+            return " ".join(words)
+    return None
+
+
+def split_positions(text: str) -> List[str]:
+    positions = []
+    for part in POSITION_SPLIT.split(text.strip(" .!")):
+        part = POSITION_SUFFIX.sub("", part.strip()).strip()
+        if part and len(part.split()) <= 5 and part not in positions:
+            positions.append(part)
+    return positions
+
+
+def extract_positions(text: str) -> List[str]:
+    match = POSITIONS.search(text)
+    return split_positions(match.group(1)) if match else []
+
+
+def expected_field(question: Optional[str]) -> Optional[str]:
+    """Field the agent's last message asked for, judged by its last question"""
+    if not question:
+        return None
+    questions = [part for part in re.split(r"(?<=\?)", question) if part.strip().endswith("?")]
+    target = questions[-1] if questions else question
+    for pattern, field in QUESTION_FIELDS:
+        if pattern.search(target):
+            return field
+    return None
+
+
+def _short_reply(text: str) -> Optional[str]:
+    cleaned = re.sub(r"^(?:it'?s|i'?m|i am|my \w+ is)\s+", "", text.strip(), flags=re.IGNORECASE).strip(" .!")
+    if not cleaned or len(cleaned.split()) > SHORT_REPLY_WORDS or re.search(r"[?@]", cleaned):
+        return None
+    if NON_ANSWER.fullmatch(cleaned.strip(" ,.!")):
+        return None
+    return cleaned
+
+
+def extract_fields(text: str, question: Optional[str] = None, known: Collection[str] = ()) -> Dict[str, Any]:
+    """All candidate fields found in one reply
+
+    ``question`` is the agent's previous message; a short reply to a
+    question about a single field is taken as that field's value, unless
+    the field is already in ``known``.
+    """
+    expected = expected_field(question)
+    fields: Dict[str, Any] = {}
+    email = extract_email(text)
+    if email:
+        fields[InfoFields.EMAIL] = email
+    phone = extract_phone(text)
+    if phone:
+        fields[InfoFields.PHONE] = phone
+    years = extract_years_experience(text, bare_number=expected == InfoFields.YEARS_EXPERIENCE)
+    if years is not None:
+        fields[InfoFields.YEARS_EXPERIENCE] = years
+    location = extract_location(text)
+    name = extract_name(text)
+    positions = extract_positions(text)
+    tech = [item for items in extract_tech_stack(text).values() for item in items]
+
+    short = _short_reply(text) if expected and expected not in known else None
+    if short:
+        if expected == InfoFields.CURRENT_LOCATION and not location:
+            location = short
+        elif expected == InfoFields.FULL_NAME and not name and not tech:
+            guess = short.title() if short.islower() else short
+            name = guess if looks_like_name(guess.split()) else None
+        elif expected == InfoFields.DESIRED_POSITIONS and not positions:
+            positions = split_positions(short)
+    if location:
+        fields[InfoFields.CURRENT_LOCATION] = location
+    if name:
+        fields[InfoFields.FULL_NAME] = name
+    if positions:
+        fields[InfoFields.DESIRED_POSITIONS] = positions
+    if tech:
+        fields[InfoFields.TECH_STACK] = tech
+    return fields
+
+
+def technical_answers(messages: List[Dict]) -> List[Dict[str, str]]:
+    """(question, answer) pairs from the technical part of a transcript
+
+    The technical part starts after the candidate declares their tech
+    stack; without that question, every assistant question that does not
+    ask for a profile field counts.
+    """
+    pairs = []
+    question = None
+    for message in messages:
+        content = (message.get('content') or '').strip()
+        if message.get('role') == 'assistant':
+            question = content if '?' in content else None
+            if expected_field(content) == InfoFields.TECH_STACK:
+                pairs = []
+        elif message.get('role') == 'user' and question and content:
+            if expected_field(question) is None:
+                pairs.append({"question": question, "answer": content})
+            question = None
+    return pairs
+
+
+class CandidateRecord:
+    """Candidate details accumulated over an interview, keyed by InfoFields"""
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.asked: Set[str] = set()  # fields the agent has asked for directly
+        self._shared: Dict[str, Any] = {}
+
+    @classmethod
+    def from_messages(cls, messages: List[Dict]) -> "CandidateRecord":
+        """Rebuild a record from a restored chat history
+
+        Everything recovered is treated as already known to the agent,
+        since it saw those messages itself. Once the tech stack question
+        has been answered only the tech stack is read from later replies.
+        """
+        record = cls()
+        question = None
+        allowed = None
+        for message in messages:
+            if message.get('role') == 'assistant':
+                question = message.get('content')
+            elif message.get('role') == 'user':
+                record.update(message.get('content', ''), question, allowed)
+                if expected_field(question) == InfoFields.TECH_STACK:
+                    allowed = (InfoFields.TECH_STACK,)
+        record._shared = dict(record.fields)
+        return record
+
+    def update(
+        self,
+        text: str,
+        question: Optional[str] = None,
+        allowed: Optional[Collection[str]] = None
+    ) -> Dict[str, Any]:
+        """Merge the fields found in one reply; returns the ones that changed
+
+        Missing fields are filled from any cue, but a field the record
+        already holds is only replaced by a reply to a question asking for
+        it (a corrected email), so an aside like "I spent 2 years on that"
+        does not overwrite the experience given earlier. The tech stack
+        grows as more technologies are mentioned. ``allowed`` limits the
+        fields that may change at all.
+        """
+        expected = expected_field(question)
+        if expected:
+            self.asked.add(expected)
+        changed = {}
+        for field, value in extract_fields(text, question, known=self.fields).items():
+            if allowed is not None and field not in allowed:
+                continue
+            if field == InfoFields.TECH_STACK:
+                known = self.fields.get(field, [])
+                value = known + [item for item in value if item not in known]
+            elif field in self.fields and field != expected:
+                continue
+            if self.fields.get(field) != value:
+                self.fields[field] = value
+                changed[field] = value
+        return changed
+
+    @property
+    def missing(self) -> List[str]:
+        return [field for field in REQUIRED_FIELDS if field not in self.fields]
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.missing
+
+    @property
+    def skipped_questions(self) -> List[str]:
+        """Captured fields the agent never had to ask for"""
+        return [field for field in REQUIRED_FIELDS if field in self.fields and field not in self.asked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.fields)
+
+    def pending_context(self, force: bool = False) -> Optional[str]:
+        """Known-details note for the agent, or None if nothing is new
+
+        The agent keeps earlier notes in its memory, so one is only
+        produced after a field has been added or changed since the last,
+        unless ``force`` is set (e.g. the agent has not seen the turns the
+        details came from).
+        """
+        if not force and self.fields == self._shared:
+            return None
+        self._shared = dict(self.fields)
+        lines = ["Candidate details already captured from the conversation. Do not ask for these again:"]
+        for field in REQUIRED_FIELDS:
+            if field in self.fields:
+                value = self.fields[field]
+                if isinstance(value, list):
+                    value = ", ".join(value)
+                lines.append(f"- {FIELD_LABELS[field]}: {value}")
+        if self.missing:
+            lines.append("Still needed: " + ", ".join(FIELD_LABELS[field].lower() for field in self.missing) + ".")
+        return "\n".join(lines)
+
+
+class InterviewMetrics:
+    """Agent turns and token usage for one interview
+
+    Each question the agent did not need to ask saves roughly one agent
+    turn, so the savings are estimated from the record's skipped questions
+    and the mean tokens of the turns actually taken.
+    """
+
+    def __init__(self):
+        self.agent_turns = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+
+    def record_turn(self, usage: Optional[Dict[str, int]] = None) -> None:
+        self.agent_turns += 1
+        usage = usage or {}
+        self.prompt_tokens += usage.get('prompt_tokens', 0) or 0
+        self.completion_tokens += usage.get('completion_tokens', 0) or 0
+        self.total_tokens += usage.get('total_tokens', 0) or 0
+
+    def summary(self, record: CandidateRecord) -> Dict[str, Any]:
+        skipped = len(record.skipped_questions)
+        mean_tokens = self.total_tokens / self.agent_turns if self.agent_turns else 0.0
+        return {
+            "agent_turns": self.agent_turns,
+            "total_tokens": self.total_tokens,
+            "fields_known": len(record.fields),
+            "questions_skipped": skipped,
+            "tokens_saved_estimate": round(skipped * mean_tokens),
+        }
@@ -6,9 +6,9 @@ from datetime import datetime
 from utils.constants import ExitKeywords
 
 def is_exit_keyword(text: str) -> bool:
-    """Check if user input contains exit keywords"""
-    text_lower = text.lower().strip()
-    return any(keyword in text_lower for keyword in ExitKeywords.KEYWORDS)
+    """Check if user input contains exit keywords as whole words"""
+    from utils.intents import tokenize
+    return any(token in ExitKeywords.KEYWORDS for token in tokenize(text))
 
 def validate_email(email: str) -> bool:
     """Validate email format"""
@@ -22,27 +22,24 @@ def validate_phone(phone: str) -> bool:
     # Check if it's 10-15 digits
     return bool(re.match(r'^\+?\d{10,15}$', cleaned))
 
+def normalize_key(value: str) -> str:
+    """Case- and whitespace-insensitive form of a lookup value"""
+    return " ".join(value.split()).lower()
+
 def extract_tech_stack(text: str) -> Dict[str, List[str]]:
-    """Extract tech stack from user input"""
-    # This is a simple extraction - can be enhanced with NLP
-    from utils.constants import TECH_STACK_CATEGORIES
-    
-    extracted = {
-        "languages": [],
-        "frameworks": [],
-        "databases": [],
-        "tools": [],
-        "other": []
-    }
-    
-    text_lower = text.lower()
-    
-    for category, items in TECH_STACK_CATEGORIES.items():
-        for item in items:
-            if item.lower() in text_lower:
-                extracted[category].append(item)
-    
-    return extracted
+    """Extract tech stack from user input, grouped by category"""
+    from utils.tech_stack import get_matcher
+    return get_matcher().extract(text)
+
+def extract_tech_stack_batch(texts: List[str]) -> List[Dict[str, List[str]]]:
+    """Extract tech stacks from many transcripts"""
+    from utils.tech_stack import get_matcher
+    return get_matcher().extract_many(texts)
+
+def extract_tech_versions(text: str) -> Dict[str, str]:
+    """Versions mentioned alongside technologies, e.g. {"Python": "3.11"}"""
+    from utils.tech_stack import get_matcher
+    return get_matcher().versions(text)
 
 def save_candidate_data(candidate_data: Dict, filepath: str) -> bool:
     """Save candidate data to JSON file"""
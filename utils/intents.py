@@ -0,0 +1,177 @@
+"""Local intent classification for whole user messages
+
+Trivial turns ("bye", "hi", "can you repeat that?") do not need an LLM
+round trip. A message is given an intent only if it is made up entirely of
+that intent's phrases plus politeness filler, matched on word tokens, so
+"end" never fires inside "attend" and "stop" inside a real answer ("I had
+to stop using Java because...") is left to the agent.
+"""
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.constants import INTENT_FILLER, INTENT_PHRASES, Intent
+
+TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Longer messages are always real answers; skip matching them at all
+MAX_INTENT_TOKENS = 12
+
+# When a message mixes intents, the first one listed wins
+INTENT_PRIORITY = (Intent.EXIT, Intent.REPEAT, Intent.HELP, Intent.GREETING, Intent.ACKNOWLEDGE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower().replace("’", "'"))
+
+
+class IntentClassifier:
+    """Whole-message intent matcher over precompiled phrase tables"""
+
+    def __init__(
+        self,
+        phrases: Dict[Intent, Iterable[str]] = INTENT_PHRASES,
+        filler: Iterable[str] = INTENT_FILLER,
+        max_tokens: int = MAX_INTENT_TOKENS
+    ):
+        self.phrases: Dict[Tuple[str, ...], Intent] = {}
+        for intent, items in phrases.items():
+            for phrase in items:
+                self.phrases.setdefault(tuple(tokenize(phrase)), intent)
+        self.longest = max(len(key) for key in self.phrases)
+        self.filler: Set[str] = set(filler)
+        self.max_tokens = max_tokens
+
+    def classify(self, text: str) -> Intent:
+        tokens = tokenize(text)
+        if not tokens:
+            return Intent.EMPTY
+        if len(tokens) > self.max_tokens:
+            return Intent.OTHER
+        # covers[i]: intents of one way to read tokens[i:] entirely as
+        # phrases and filler, or None if there is no such reading
+        covers: List[Optional[Set[Intent]]] = [None] * len(tokens) + [set()]
+        for position in range(len(tokens) - 1, -1, -1):
+            # Longest phrase first, so "see you" is not read as filler "you"
+            for size in range(min(self.longest, len(tokens) - position), 0, -1):
+                intent = self.phrases.get(tuple(tokens[position:position + size]))
+                rest = covers[position + size]
+                if intent is not None and rest is not None:
+                    covers[position] = rest | {intent}
+                    break
+            else:
+                if tokens[position] in self.filler and covers[position + 1] is not None:
+                    covers[position] = covers[position + 1]
+        found = covers[0]
+        if not found:
+            return Intent.OTHER
+        for intent in INTENT_PRIORITY:
+            if intent in found:
+                return intent
+        return Intent.OTHER
+
+
+class IntentStats:
+    """Process-wide counters for locally answered and agent turns
+
+    ``latency_saved_seconds`` estimates the time saved as the bypassed turns
+    multiplied by the mean duration of the turns that did reach the agent,
+    minus the time spent answering locally.
+    """
+
+    def __init__(self):
+        self.turns = 0
+        self.by_intent: Dict[str, int] = {}
+        self.bypassed = 0
+        self.local_seconds = 0.0
+        self.agent_turns = 0
+        self.agent_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_local(self, intent: Intent, seconds: float) -> None:
+        with self._lock:
+            self.turns += 1
+            self.bypassed += 1
+            self.local_seconds += seconds
+            self.by_intent[intent.value] = self.by_intent.get(intent.value, 0) + 1
+
+    def record_agent(self, intent: Intent, seconds: float) -> None:
+        with self._lock:
+            self.turns += 1
+            self.agent_turns += 1
+            self.agent_seconds += seconds
+            self.by_intent[intent.value] = self.by_intent.get(intent.value, 0) + 1
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            mean_agent = self.agent_seconds / self.agent_turns if self.agent_turns else 0.0
+            return {
+                "turns": self.turns,
+                "bypassed": self.bypassed,
+                "bypass_rate": self.bypassed / self.turns if self.turns else 0.0,
+                "by_intent": dict(self.by_intent),
+                "mean_agent_turn_seconds": mean_agent,
+                "latency_saved_seconds": max(0.0, self.bypassed * mean_agent - self.local_seconds),
+            }
+
+
+def local_reply(intent: Intent, messages: List[Dict]) -> Optional[str]:
+    """Canned answer for an intent, or None if the agent should answer"""
+    if intent == Intent.EXIT:
+        return (
+            "Thank you for your time! Your information has been recorded. "
+            "Our team will review your profile and get back to you soon.\n\n"
+            "Have a great day! 👋"
+        )
+    if intent == Intent.HELP:
+        return (
+            "I'm TalentScout's screening assistant. I'll ask for a few details "
+            "(name, contact information, experience, desired positions and "
+            "location), then your tech stack, and then a few technical questions "
+            "about it.\n\nJust answer in your own words. You can ask me to "
+            "repeat a question at any time, or say 'bye' to finish."
+        )
+    if intent == Intent.REPEAT:
+        for message in reversed(messages):
+            if message.get('role') == 'assistant' and message.get('content', '').strip():
+                return f"Sure, here it is again:\n\n{message['content']}"
+        return None
+    if intent == Intent.GREETING:
+        return "Hello! 👋 Whenever you're ready, tell me a little about yourself, starting with your full name."
+    if intent == Intent.ACKNOWLEDGE:
+        last = messages[-1] if messages else {}
+        if last.get('role') == 'assistant' and '?' in last.get('content', ''):
+            return "You're welcome! Whenever you're ready, just answer the question above."
+        return "You're welcome! 😊"
+    if intent == Intent.EMPTY:
+        return "It looks like that message was empty. Could you type your answer again?"
+    return None
+
+
+_default_classifier: Optional[IntentClassifier] = None
+intent_stats = IntentStats()
+
+
+def classify_intent(text: str) -> Intent:
+    """Classify with the built-in phrase tables (compiled on first use)"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = IntentClassifier()
+    return _default_classifier.classify(text)
+
+
+def answer_locally(text: str, messages: List[Dict], enabled: Iterable[str]) -> Tuple[Intent, Optional[str]]:
+    """Classify ``text`` and return (intent, reply) if it is answered locally
+
+    ``enabled`` lists the intent values allowed to bypass the agent; empty
+    messages always do. The reply is None when the agent should answer.
+    """
+    started = time.perf_counter()
+    intent = classify_intent(text)
+    reply = None
+    if intent == Intent.EMPTY or intent.value in {value.strip() for value in enabled}:
+        reply = local_reply(intent, messages)
+    if reply is not None:
+        intent_stats.record_local(intent, time.perf_counter() - started)
+    return intent, reply
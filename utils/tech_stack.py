@@ -0,0 +1,149 @@
+"""Tech stack extraction from free text
+
+All known names and aliases are loaded into a character trie, which is
+compiled once into a single regular expression over lowercased text.
+Scanning a transcript is then one left-to-right pass of the ``re`` engine,
+whose cost does not grow with the number of known technologies, and at
+each position the longest name wins (so "JavaScript" is never also read
+as "Java").
+
+A name only matches as a whole word: it may not be preceded by a letter
+or digit, and may only be followed by a version ("Python 3.11",
+"python3") or a non-word character, so "Go" does not fire inside "good".
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils.constants import CASE_SENSITIVE_TECH, OTHER_TECH, TECH_ALIASES, TECH_STACK_CATEGORIES
+
+# A trailing number is a version unless it reads as a duration ("Python 5 years")
+VERSION = (
+    r"(?:v?(?P<attached>\d+(?:\.\d+)*)"
+    r"|[ \t]+v?(?P<spaced>\d+(?:\.\d+)*(?:\.x)?)(?![ \t]*\+?[ \t]*(?:years?|yrs?|months?)\b))?"
+)
+
+
+class TechMatch(NamedTuple):
+    name: str
+    category: str
+    version: Optional[str]
+    start: int
+    end: int
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation for ``words`` with shared prefixes factored out"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional suffix: the longest name is tried first
+        return "(?:" + body + ")?" if "" in node else body
+
+    return emit(trie)
+
+
+class TechStackMatcher:
+    """Compiled matcher for TECH_STACK_CATEGORIES, OTHER_TECH and aliases"""
+
+    def __init__(
+        self,
+        categories: Dict[str, List[str]] = TECH_STACK_CATEGORIES,
+        other: List[str] = OTHER_TECH,
+        aliases: Dict[str, str] = TECH_ALIASES,
+        case_sensitive: Iterable[str] = CASE_SENSITIVE_TECH
+    ):
+        self.categories = list(categories) + ["other"]
+        # lowercased spelling -> (canonical name, category, exact spelling or None)
+        self.lookup: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self.rank: Dict[str, int] = {}
+        case_sensitive = set(case_sensitive)
+        canonical = {}
+        for category, items in [*categories.items(), ("other", other)]:
+            for item in items:
+                canonical[item] = category
+                self.rank[item] = len(self.rank)
+        for spelling, name in [*((item, item) for item in canonical), *aliases.items()]:
+            if name not in canonical:
+                raise ValueError(f"Alias {spelling!r} points to unknown technology {name!r}")
+            exact = spelling if spelling in case_sensitive else None
+            self.lookup[spelling.lower()] = (name, canonical[name], exact)
+        # No leading lookbehind: a literal first character lets ``re`` skip
+        # ahead quickly, so the left word boundary is checked in find()
+        self.pattern = re.compile(
+            r"(?P<name>" + _trie_pattern(self.lookup) + ")" + VERSION + r"(?![a-z0-9_])"
+        )
+
+    def find(self, text: str) -> List[TechMatch]:
+        """Every technology mention in ``text``, in order of appearance"""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters change length when lowercased; keep offsets aligned
+            lowered = "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+        matches = []
+        search = self.pattern.search
+        position = 0
+        while True:
+            found = search(lowered, position)
+            if found is None:
+                return matches
+            start, end = found.span()
+            name, category, exact = self.lookup[found.group("name")]
+            if (start and _is_word_char(lowered[start - 1])) or (
+                exact is not None and text[start:found.end("name")] != exact
+            ):
+                position = start + 1
+                continue
+            version = found.group("attached") or found.group("spaced")
+            matches.append(TechMatch(name, category, version, start, end))
+            position = end
+
+    def extract(self, text: str) -> Dict[str, List[str]]:
+        """Technologies in ``text`` grouped by category, including "other" """
+        found = {match.name: match.category for match in self.find(text)}
+        extracted = {category: [] for category in self.categories}
+        for name in sorted(found, key=self.rank.__getitem__):
+            extracted[found[name]].append(name)
+        return extracted
+
+    def versions(self, text: str) -> Dict[str, str]:
+        """Version of each technology that has one
+
+        The first version mentioned is kept, so "Python 3.11 ... python3"
+        stays 3.11; a later mention only replaces it to refine it ("Python
+        3, specifically 3.12").
+        """
+        versions: Dict[str, str] = {}
+        for match in self.find(text):
+            known = versions.get(match.name)
+            if match.version and (known is None or match.version.startswith(known + ".")):
+                versions[match.name] = match.version
+        return versions
+
+    def extract_many(self, texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+        """``extract`` over many transcripts with the same compiled pattern"""
+        extract = self.extract
+        return [extract(text) for text in texts]
+
+
+_default_matcher: Optional[TechStackMatcher] = None
+
+
+def get_matcher() -> TechStackMatcher:
+    """Shared matcher for the built-in tables, compiled on first use"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = TechStackMatcher()
+    return _default_matcher